@@ -16,7 +16,32 @@ class NautobotPluginChatopsMerakiConfig(PluginConfig):
     required_settings = []
     min_version = "1.3.0"
     max_version = "1.9999"
-    default_settings = {}
+    default_settings = {
+        "resolution_cache_ttl": 300,
+        "resolution_cache_maxsize": 256,
+        "bulk_concurrency": 5,
+        "rate_limit_per_org": 10,
+        "rate_limit_shared": True,
+        "shared_cache_ttl": 300,
+        "prefetch_interval": 0,
+        "prefetch_orgs": [],
+        "keep_raw_inventory": False,
+        "dashboard_base_url": "https://api.meraki.com/api/v1",
+        "coalesce_window": 2,
+        "picker_page_size": 25,
+        "prefetch_full_interval": 3600,
+        "stream_results": True,
+        "stream_chunk_size": 500,
+        "stream_flush_interval": 5,
+        "message_budget": 0,
+        "action_batch_poll_interval": 2,
+        "action_batch_timeout": 30,
+        "client_index_interval": 0,
+        "client_index_ttl": 3600,
+        "client_index_max_results": 1000,
+        "topology_max_age": 3600,
+        "topology_ttl": 86400,
+    }
     caching_config = {}
 
 
@@ -0,0 +1,354 @@
+"""Asynchronous utilities for Meraki SDK."""
+
+import asyncio
+import contextvars
+import threading
+
+import meraki.aio
+
+from .cache import TTLCache
+from .inventory import Inventory
+from .metrics import api_call, endpoint_name, register_orgs, span
+from .records import Device, Network, Organization, SwitchPort
+
+# Default number of dashboard requests an AsyncMerakiClient keeps in flight at once.
+DEFAULT_CONCURRENCY = 8
+# Most actions an Action Batch may hold, and most asynchronous batches an organization may have running at once.
+ACTION_BATCH_SIZE = 100
+MAX_RUNNING_ACTION_BATCHES = 5
+
+
+def batch_finished(batch):
+    """Return whether an Action Batch completed or failed."""
+    return batch["status"]["completed"] or batch["status"]["failed"]
+
+
+class AsyncMerakiClient:  # pylint: disable=too-many-instance-attributes
+    """Asynchronous Meraki client class, backed by the SDK's AsyncDashboardAPI.
+
+    It implements the same queries as :class:`~nautobot_plugin_chatops_meraki.utils.MerakiClient` as coroutines, so
+    independent lookups and per-device fan-outs can run concurrently. At most ``concurrency`` requests are in flight
+    at any time. Passing the ``cache`` of a MerakiClient shares its name resolutions with this client.
+
+    The aiohttp session is bound to the running event loop, so the client must be used as an async context manager::
+
+        async with AsyncMerakiClient(api_key) as client:
+            statuses = await client.for_each_device(client.get_meraki_switchports_status, org_name, switch_names)
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        concurrency=DEFAULT_CONCURRENCY,
+        cache=None,
+        scheduler=None,
+        base_url=meraki.DEFAULT_BASE_URL,
+    ):  # pylint: disable=too-many-arguments
+        """Class constructor."""
+        self.api_key = api_key
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.cache = cache if cache is not None else TTLCache()
+        self.scheduler = scheduler
+        self.dashboard = None
+        self._semaphore = None
+        self._loading = {}
+
+    async def __aenter__(self):
+        """Open the dashboard session on the running event loop."""
+        self.dashboard = meraki.aio.AsyncDashboardAPI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            suppress_logging=True,
+            maximum_concurrent_requests=self.concurrency,
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        """Close the dashboard session."""
+        await self.dashboard.__aexit__(exc_type, exc, traceback)
+
+    async def _call(self, org_id, method, *args, **kwargs):
+        """Await a dashboard call once a concurrency slot is free and the organization's request budget allows it."""
+        async with self._semaphore:
+            if self.scheduler is not None:
+                with span("wait"):
+                    await self.scheduler.acquire_async(org_id)
+            with api_call(endpoint_name(method)):
+                return await method(*args, **kwargs)
+
+    async def _resolve(self, scope, kind, loader, name):
+        """Resolve a name within a cached scope, refetching the scope once when the name is not found."""
+        inventory = self.cache.get(scope)
+        if inventory is not None and name in inventory:
+            return inventory.get_by_name(name)
+        # A miss drops the cached scope, and concurrent resolutions in it share a single download of the inventory.
+        self.cache.invalidate(scope)
+        task = self._loading.get(scope)
+        if task is None:
+            task = asyncio.ensure_future(self._load(scope, kind, loader))
+            self._loading[scope] = task
+            task.add_done_callback(lambda _: self._loading.pop(scope, None))
+        return (await task).get_by_name(name)
+
+    async def _load(self, scope, kind, loader):
+        """Download and index the inventory of a scope, then cache it."""
+        inventory = Inventory(await loader(), kind=kind)
+        self.cache.set(scope, inventory)
+        return inventory
+
+    async def org_name_to_id(self, org_name):
+        """Translate Org Name to Org Id."""
+        with span("resolve_org"):
+            return (await self._resolve(("orgs",), "organization", self.get_meraki_orgs, org_name))["id"]
+
+    async def name_to_serial(self, org_name, device_name):
+        """Translate Name to Serial."""
+        with span("resolve_serial"):
+            device = await self._resolve(
+                ("devices", org_name.lower()), "device", lambda: self.get_meraki_devices(org_name), device_name
+            )
+        return device["serial"]
+
+    async def netname_to_id(self, org_name, net_name):
+        """Translate Network Name to Network ID."""
+        with span("resolve_network"):
+            network = await self._resolve(
+                ("networks", org_name.lower()), "network", lambda: self.get_meraki_networks_by_org(org_name), net_name
+            )
+        return network["id"]
+
+    async def get_meraki_orgs(self):
+        """Query the Meraki Dashboard API for a list of defined organizations."""
+        orgs = await self._call(None, self.dashboard.organizations.getOrganizations)
+        register_orgs(orgs)
+        return [Organization.from_api(org) for org in orgs]
+
+    async def get_meraki_org_admins(self, org_name):
+        """Query the Meraki Dashboard API for the admins of a organization."""
+        org_id = await self.org_name_to_id(org_name)
+        return await self._call(org_id, self.dashboard.organizations.getOrganizationAdmins, org_id)
+
+    async def get_meraki_devices(self, org_name):
+        """Query the Meraki Dashboard API for a list of devices in the given organization."""
+        org_id = await self.org_name_to_id(org_name)
+        entries = await self._call(org_id, self.dashboard.organizations.getOrganizationDevices, org_id, total_pages=-1)
+        return [Device.from_api(dev) for dev in entries]
+
+    async def get_meraki_networks_by_org(self, org_name):
+        """Query the Meraki Dashboard API for a list of Networks."""
+        org_id = await self.org_name_to_id(org_name)
+        entries = await self._call(org_id, self.dashboard.organizations.getOrganizationNetworks, org_id, total_pages=-1)
+        return [Network.from_api(net) for net in entries]
+
+    async def get_meraki_switchports(self, org_name, device_name):
+        """Query the Meraki Dashboard API for a list of Switchports for a Switch."""
+        entries = await self._call(
+            await self.org_name_to_id(org_name),
+            self.dashboard.switch.getDeviceSwitchPorts,
+            await self.name_to_serial(org_name, device_name),
+        )
+        return [SwitchPort.from_api(port) for port in entries]
+
+    async def get_meraki_switchports_status(self, org_name, device_name):
+        """Query Meraki for Port Status for a Switch."""
+        return await self._call(
+            await self.org_name_to_id(org_name),
+            self.dashboard.switch.getDeviceSwitchPortsStatuses,
+            await self.name_to_serial(org_name, device_name),
+        )
+
+    async def get_meraki_firewall_performance(self, org_name, device_name):
+        """Query Meraki with a firewall to return device performance."""
+        return await self._call(
+            await self.org_name_to_id(org_name),
+            self.dashboard.appliance.getDeviceAppliancePerformance,
+            await self.name_to_serial(org_name, device_name),
+        )
+
+    async def get_meraki_network_ssids(self, org_name, net_name):
+        """Query Meraki for a Networks SSIDs."""
+        return await self._call(
+            await self.org_name_to_id(org_name),
+            self.dashboard.wireless.getNetworkWirelessSsids,
+            await self.netname_to_id(org_name, net_name),
+        )
+
+    async def get_meraki_camera_recent(self, org_name, device_name):
+        """Query Meraki Recent Cameras."""
+        return await self._call(
+            await self.org_name_to_id(org_name),
+            self.dashboard.camera.getDeviceCameraAnalyticsRecent,
+            await self.name_to_serial(org_name, device_name),
+        )
+
+    async def get_meraki_device_clients(self, org_name, device_name):
+        """Query Meraki for Clients."""
+        return await self._call(
+            await self.org_name_to_id(org_name),
+            self.dashboard.devices.getDeviceClients,
+            await self.name_to_serial(org_name, device_name),
+        )
+
+    async def get_meraki_device_lldpcdp(self, org_name, device_name):
+        """Query Meraki for LLDP and CDP neighbors."""
+        return await self._call(
+            await self.org_name_to_id(org_name),
+            self.dashboard.devices.getDeviceLldpCdp,
+            await self.name_to_serial(org_name, device_name),
+        )
+
+    async def update_meraki_switch_port(self, org_name, device_name, port, **kwargs):
+        """Update SwitchPort Configuration."""
+        return await self._call(
+            await self.org_name_to_id(org_name),
+            self.dashboard.switch.updateDeviceSwitchPort,
+            await self.name_to_serial(org_name, device_name),
+            port,
+            **kwargs,
+        )
+
+    async def port_cycle(self, org_name, device_name, ports):
+        """Cycle a port, or a list of ports, on a switch."""
+        return await self._call(
+            await self.org_name_to_id(org_name),
+            self.dashboard.switch.cycleDeviceSwitchPorts,
+            await self.name_to_serial(org_name, device_name),
+            [ports] if isinstance(ports, str) else list(ports),
+        )
+
+    async def run_action_batches(
+        self, actions, org_id=None, batch_size=ACTION_BATCH_SIZE, poll_interval=2.0, timeout=30.0
+    ):  # pylint: disable=too-many-arguments
+        """Submit actions as asynchronous Action Batches of ``batch_size`` actions, and poll them until they complete.
+
+        No more than MAX_RUNNING_ACTION_BATCHES batches run at once; the next ones are submitted as earlier ones
+        complete. Returns a ``(actions, batch)`` pair per batch, in order, with the last known state of the batch:
+        a batch the dashboard rejected carries the error in its ``status``, one still running after ``timeout``
+        seconds is returned as last polled, and one left unsubmitted by then is None.
+        """
+        chunks = []
+        for start in range(0, len(actions), batch_size):
+            end = start + batch_size
+            chunks.append(actions[start:end])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        slots = asyncio.Semaphore(MAX_RUNNING_ACTION_BATCHES)
+
+        async def run(chunk):
+            async with slots:
+                if loop.time() >= deadline:
+                    return None
+                batch = await self._submit_action_batch(org_id, chunk)
+                while not batch_finished(batch) and loop.time() < deadline:
+                    await asyncio.sleep(poll_interval)
+                    batch = await self._call(
+                        org_id, self.dashboard.organizations.getOrganizationActionBatch, org_id, batch["id"]
+                    )
+                return batch
+
+        return list(zip(chunks, await asyncio.gather(*(run(chunk) for chunk in chunks))))
+
+    async def _submit_action_batch(self, org_id, actions):
+        """Submit an asynchronous Action Batch, returning a failed batch when the dashboard rejects it."""
+        try:
+            return await self._call(
+                org_id,
+                self.dashboard.organizations.createOrganizationActionBatch,
+                org_id,
+                actions,
+                confirmed=True,
+                synchronous=False,
+            )
+        except meraki.AsyncAPIError as error:
+            return {"status": {"completed": False, "failed": True, "errors": [str(error)]}}
+
+    async def for_each_device(self, method, org_name, device_names, *args, **kwargs):
+        """Run a per-device query concurrently for several devices.
+
+        Returns a dict of device name to result. A device whose query failed maps to the raised exception, so one
+        failing device does not abort the others.
+        """
+        results = await asyncio.gather(
+            *(method(org_name, device_name, *args, **kwargs) for device_name in device_names), return_exceptions=True
+        )
+        return dict(zip(device_names, results))
+
+    async def for_each_serial(
+        self, method, serials, *args, org_id=None, progress=None, on_result=None, serial_args=None, **kwargs
+    ):  # pylint: disable=too-many-arguments
+        """Call a per-serial dashboard endpoint concurrently for several devices of an organization.
+
+        Returns a dict of serial to result, where a failed call maps to the raised exception. ``progress``, when
+        given, is called with the number of completed devices each time a result arrives, and ``on_result`` with the
+        serial and its result, so results can be used before the slowest device answers. ``serial_args`` maps a
+        serial to arguments of its own, passed right after the serial.
+        """
+        serial_args = serial_args or {}
+
+        async def call(serial):
+            try:
+                return serial, await self._call(org_id, method, serial, *serial_args.get(serial, ()), *args, **kwargs)
+            except Exception as exc:  # pylint: disable=broad-except
+                return serial, exc
+
+        results = {}
+        for done, future in enumerate(asyncio.as_completed([call(serial) for serial in serials]), 1):
+            serial, result = await future
+            results[serial] = result
+            if on_result is not None:
+                on_result(serial, result)
+            if progress is not None:
+                progress(done)
+        return results
+
+
+def run_sync(coro):
+    """Run a coroutine to completion from synchronous code and return its result.
+
+    Subcommands run in plain RQ worker threads without an event loop, so ``asyncio.run()`` is used directly. When
+    called from a thread that already runs a loop, the coroutine runs on a fresh loop in a helper thread instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    outcome = {}
+    # Carry the caller's context (such as the command being accounted for) over to the helper thread.
+    context = contextvars.copy_context()
+
+    def runner():
+        try:
+            outcome["result"] = asyncio.run(coro)
+        except BaseException as exc:  # pylint: disable=broad-except
+            outcome["error"] = exc
+
+    thread = threading.Thread(target=context.run, args=(runner,))
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def run_with_async_client(
+    api_key,
+    func,
+    *args,
+    concurrency=DEFAULT_CONCURRENCY,
+    cache=None,
+    scheduler=None,
+    base_url=meraki.DEFAULT_BASE_URL,
+    **kwargs,
+):  # pylint: disable=too-many-arguments
+    """Call ``await func(client, *args, **kwargs)`` with an open AsyncMerakiClient, from synchronous code."""
+
+    async def runner():
+        async with AsyncMerakiClient(
+            api_key=api_key, concurrency=concurrency, cache=cache, scheduler=scheduler, base_url=base_url
+        ) as client:
+            return await func(client, *args, **kwargs)
+
+    return run_sync(runner())
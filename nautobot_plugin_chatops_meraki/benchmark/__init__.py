@@ -0,0 +1 @@
+"""Benchmark harness running the Meraki subcommands against a local mock Meraki Dashboard."""
@@ -0,0 +1,387 @@
+"""Run the Meraki subcommands against a MockDashboard and measure what each one costs."""
+
+import contextlib
+import time
+import tracemalloc
+from collections import namedtuple
+from unittest import mock
+
+from nautobot_chatops.dispatchers import Dispatcher
+from nautobot_chatops.workers import get_commands_registry
+
+from .. import helpers
+
+# Importing the worker registers the ``meraki`` subcommands.
+from .. import worker  # noqa: F401 pylint: disable=unused-import
+from ..utils import CLIENT_POOL
+from .mock_dashboard import DashboardData, MockDashboard
+
+BENCHMARK_API_KEY = "benchmark"
+
+# A subcommand invocation: ``args`` builds its positional arguments from the DashboardData being served.
+Scenario = namedtuple("Scenario", ["label", "subcommand", "args"])
+
+SCENARIOS = [
+    Scenario("get-organizations", "get-organizations", lambda data: []),
+    Scenario("get-admins", "get-admins", lambda data: [data.orgs[0]["name"]]),
+    Scenario("get-devices", "get-devices", lambda data: [data.orgs[0]["name"], "all"]),
+    Scenario("get-networks", "get-networks", lambda data: [data.orgs[0]["name"]]),
+    Scenario("get-switchports (picker)", "get-switchports", lambda data: [data.orgs[0]["name"]]),
+    Scenario("get-switchports (search)", "get-switchports", lambda data: [data.orgs[0]["name"], "switch-00001"]),
+    Scenario("get-switchports", "get-switchports", lambda data: [data.orgs[0]["name"], data.last("switch")["name"]]),
+    Scenario(
+        "get-switchports-status",
+        "get-switchports-status",
+        lambda data: [data.orgs[0]["name"], data.last("switch")["name"]],
+    ),
+    Scenario(
+        "get-switchports-status-bulk",
+        "get-switchports-status-bulk",
+        lambda data: [data.orgs[0]["name"], "network", data.network_name(data.last("switch")["networkId"])],
+    ),
+    Scenario("get-org-switchports", "get-org-switchports", lambda data: [data.orgs[0]["name"], "errors"]),
+    Scenario("get-firewall-performance (picker)", "get-firewall-performance", lambda data: [data.orgs[0]["name"]]),
+    Scenario(
+        "get-firewall-performance",
+        "get-firewall-performance",
+        lambda data: [data.orgs[0]["name"], data.last("appliance")["name"]],
+    ),
+    Scenario(
+        "get-wlan-ssids",
+        "get-wlan-ssids",
+        lambda data: [data.orgs[0]["name"], data.network_name(data.last("wireless")["networkId"])],
+    ),
+    Scenario("get-camera-recent (picker)", "get-camera-recent", lambda data: [data.orgs[0]["name"]]),
+    Scenario(
+        "get-camera-recent", "get-camera-recent", lambda data: [data.orgs[0]["name"], data.last("camera")["name"]]
+    ),
+    Scenario("get-clients", "get-clients", lambda data: [data.orgs[0]["name"], data.last("switch")["name"]]),
+    Scenario(
+        "get-clients (csv)",
+        "get-clients",
+        lambda data: [data.orgs[0]["name"], data.last("switch")["name"], "mac,ip,vlan", "csv"],
+    ),
+    Scenario(
+        "locate-client (mac)",
+        "locate-client",
+        lambda data: [data.orgs[0]["name"], data.device_clients(data.last("switch")["serial"])[0]["mac"].upper()],
+    ),
+    Scenario(
+        "locate-client (ip)",
+        "locate-client",
+        lambda data: [data.orgs[0]["name"], data.device_clients(data.last("switch")["serial"])[0]["ip"]],
+    ),
+    Scenario(
+        "find-client",
+        "find-client",
+        lambda data: [data.orgs[0]["name"], data.device_clients(data.last("switch")["serial"])[0]["mac"][:14]],
+    ),
+    Scenario(
+        "get-topology (upstream)",
+        "get-topology",
+        lambda data: [data.orgs[0]["name"], "upstream", data.last("switch")["name"]],
+    ),
+    Scenario("get-topology (dot)", "get-topology", lambda data: [data.orgs[0]["name"], "dot"]),
+    Scenario("get-neighbors", "get-neighbors", lambda data: [data.orgs[0]["name"], data.last("switch")["name"]]),
+    Scenario(
+        "configure-basic-access-port",
+        "configure-basic-access-port",
+        lambda data: [data.orgs[0]["name"], data.last("switch")["name"], "1", "True", "10", "benchmark"],
+    ),
+    Scenario(
+        "configure-ports-bulk",
+        "configure-ports-bulk",
+        lambda data: [data.orgs[0]["name"], f"{data.last('switch')['name']},1-48,20,true"],
+    ),
+    Scenario("cycle-port", "cycle-port", lambda data: [data.orgs[0]["name"], data.last("switch")["name"], "1"]),
+    Scenario(
+        "cycle-ports",
+        "cycle-ports",
+        lambda data: [
+            data.orgs[0]["name"],
+            ";".join([f"{dev['name']}:1-4,12" for dev in data.devices if dev["productType"] == "switch"][-4:]),
+        ],
+    ),
+]
+
+
+class BenchmarkDispatcher(Dispatcher):  # pylint: disable=too-many-public-methods
+    """Dispatcher recording what a subcommand sends instead of posting it to a chat platform.
+
+    Tables go through the default ``send_large_table`` rendering, so the cost of drawing them is measured as well.
+    """
+
+    platform_name = "Benchmark"
+    platform_slug = "benchmark"
+
+    def __init__(self, context=None):
+        """Class constructor."""
+        super().__init__(context)
+        self.messages = []
+        self.table_rows = 0
+        self.table_bytes = 0
+        self.prompts = 0
+        self.menu_choices = 0
+        self.first_table_at = None
+
+    def send_large_table(self, header, rows, title=None):
+        """Render a table like the Slack and Webex dispatchers and record its size, and when the first one was sent."""
+        rows = list(rows)
+        self.table_rows += len(rows)
+        super().send_large_table(header, rows, title=title)
+        if self.first_table_at is None:
+            self.first_table_at = time.perf_counter()
+
+    def send_snippet(self, text, title=None, ephemeral=None):
+        """Record a snippet."""
+        self.table_bytes += len(text.encode())
+        self.messages.append(("snippet", title))
+
+    def send_markdown(self, message, ephemeral=None):
+        """Record a message."""
+        self.messages.append(("markdown", message))
+
+    def send_blocks(self, blocks, callback_id=None, modal=False, ephemeral=None, title=None):
+        """Record a list of blocks."""
+        self.messages.append(("blocks", len(blocks)))
+
+    def send_error(self, message):
+        """Record an error message."""
+        self.messages.append(("error", message))
+
+    def send_warning(self, message):
+        """Record a warning message."""
+        self.messages.append(("warning", message))
+
+    def prompt_from_menu(
+        self, action_id, help_text, choices, default=(None, None), confirm=False, offset=0
+    ):  # pylint: disable=too-many-arguments
+        """Record a menu prompt and the number of choices it offered."""
+        self.prompts += 1
+        self.menu_choices += len(choices)
+
+    def prompt_for_text(self, action_id, help_text, label, title="Your attention please!"):
+        """Record a text prompt."""
+        self.prompts += 1
+
+    def multi_input_dialog(self, command, sub_command, dialog_title, dialog_list):
+        """Record a dialog prompt."""
+        self.prompts += 1
+
+    def static_url(self, path):
+        """Return the static file path as is."""
+        return path
+
+    def command_response_header(self, command, subcommand, args, description="information", image_element=None):
+        """Return a single placeholder block."""
+        return [{"command": command, "subcommand": subcommand, "args": args}]
+
+    def markdown_block(self, text):
+        """Return a markdown block."""
+        return {"text": text}
+
+    def image_element(self, url, alt_text=""):
+        """Return an image element."""
+        return {"url": url}
+
+    @classmethod
+    def platform_lookup(cls, item_type, item_name):
+        """Return no ID, as there is no chat platform to look items up on."""
+        return None
+
+    def ask_permission_to_send_image(self, filename, action_id):
+        """Record an image permission prompt."""
+        self.prompts += 1
+
+    def send_image(self, image_path):
+        """Record an image."""
+        self.messages.append(("image", image_path))
+
+    def send_busy_indicator(self):
+        """Do nothing, as there is no chat to show it in."""
+
+    def user_mention(self):
+        """Return a placeholder mention."""
+        return "@benchmark"
+
+    def actions_block(self, block_id, actions):
+        """Return a block of action elements."""
+        return {"block_id": block_id, "actions": actions}
+
+    def markdown_element(self, text):
+        """Return a markdown element."""
+        return {"text": text}
+
+    def select_element(self, action_id, choices, default=(None, None), confirm=False):
+        """Return a selection menu element."""
+        return {"action_id": action_id, "choices": choices}
+
+    def text_element(self, text):
+        """Return a plain text element."""
+        return {"text": text}
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))]
+
+
+@contextlib.contextmanager
+def benchmark_settings(base_url, rate_limit_per_org=10, overrides=None):
+    """Point the worker at the mock dashboard, with in-process pacing and without Redis.
+
+    ``overrides`` are further plugin settings to benchmark with, such as ``{"resolution_cache_ttl": 0}``.
+    """
+    settings = {
+        "dashboard_base_url": base_url,
+        "rate_limit_per_org": rate_limit_per_org,
+        "rate_limit_shared": False,
+        "shared_cache_ttl": 0,
+        "coalesce_window": 0,
+        "action_batch_poll_interval": 0,
+        **(overrides or {}),
+    }
+    helpers.get_scheduler.cache_clear()
+    helpers.get_shared_cache.cache_clear()
+    helpers.get_coalescer.cache_clear()
+    helpers.get_client_index_store.cache_clear()
+    helpers.get_topology_store.cache_clear()
+    with mock.patch.dict(helpers.PLUGIN_SETTINGS, settings), mock.patch.object(
+        helpers, "MERAKI_DASHBOARD_API_KEY", BENCHMARK_API_KEY
+    ):
+        try:
+            yield
+        finally:
+            CLIENT_POOL.close(BENCHMARK_API_KEY)
+            helpers.get_scheduler.cache_clear()
+            helpers.get_shared_cache.cache_clear()
+            helpers.get_coalescer.cache_clear()
+            helpers.get_client_index_store.cache_clear()
+            helpers.get_topology_store.cache_clear()
+
+
+def run_once(server, handler, args, trace_memory=False):
+    """Run a subcommand once and return what it cost."""
+    dispatcher = BenchmarkDispatcher()
+    before = server.snapshot()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        status = handler(dispatcher, *args)
+        error = None
+    except Exception as exc:  # pylint: disable=broad-except
+        status, error = None, f"{type(exc).__name__}: {exc}"
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    after = server.snapshot()
+    return {
+        "seconds": elapsed,
+        "api_calls": after["requests"] - before["requests"],
+        "throttled": after["throttled"] - before["throttled"],
+        "operations": dict(after["operations"] - before["operations"]),
+        "peak_bytes": peak,
+        "first_row_seconds": None if dispatcher.first_table_at is None else dispatcher.first_table_at - start,
+        "table_rows": dispatcher.table_rows,
+        "table_bytes": dispatcher.table_bytes,
+        "menu_choices": dispatcher.menu_choices,
+        "status": status,
+        "error": error,
+    }
+
+
+def run_scenario(server, data, scenario, repeat=5):
+    """Benchmark a scenario: one run with empty caches, ``repeat`` runs reusing the client, then a traced run.
+
+    Wall times come from untraced runs only, as tracing allocations slows Python code down severalfold.
+    """
+    handler = get_commands_registry()["meraki"]["subcommands"][scenario.subcommand]["worker"]
+    args = scenario.args(data)
+    CLIENT_POOL.close(BENCHMARK_API_KEY)
+    helpers.get_client_index_store.cache_clear()
+    helpers.get_topology_store.cache_clear()
+    cold = run_once(server, handler, args)
+    warm = [run_once(server, handler, args) for _ in range(repeat)]
+    CLIENT_POOL.close(BENCHMARK_API_KEY)
+    traced = run_once(server, handler, args, trace_memory=True)
+    warm_seconds = [run["seconds"] for run in warm]
+    errors = [run["error"] for run in [cold, *warm] if run["error"]]
+    return {
+        "scenario": scenario.label,
+        "devices": len(data.devices),
+        "cold_calls": cold["api_calls"],
+        "cold_operations": cold["operations"],
+        "warm_calls": sum(run["api_calls"] for run in warm) / len(warm) if warm else 0,
+        "throttled": cold["throttled"] + sum(run["throttled"] for run in warm),
+        "cold_ms": cold["seconds"] * 1000,
+        "first_row_ms": None if cold["first_row_seconds"] is None else cold["first_row_seconds"] * 1000,
+        "p50_ms": percentile(warm_seconds, 50) * 1000,
+        "p95_ms": percentile(warm_seconds, 95) * 1000,
+        "p99_ms": percentile(warm_seconds, 99) * 1000,
+        "peak_mib": traced["peak_bytes"] / 2**20,
+        "table_rows": cold["table_rows"],
+        "table_kib": cold["table_bytes"] / 1024,
+        "menu_choices": cold["menu_choices"],
+        "errors": errors,
+        "summary": cold["status"][1] if isinstance(cold["status"], tuple) else "",
+    }
+
+
+def run_benchmark(
+    devices=100, repeat=5, latency=0.0, throttle_ratio=0.0, rate_limit_per_org=10, only=None, settings=None
+):  # pylint: disable=too-many-arguments
+    """Benchmark every scenario (or those whose label or subcommand is in ``only``) at one inventory size."""
+    data = DashboardData(devices=devices)
+    scenarios = [
+        scenario for scenario in SCENARIOS if not only or scenario.label in only or scenario.subcommand in only
+    ]
+    with MockDashboard(data, latency=latency, throttle_ratio=throttle_ratio) as server:
+        with benchmark_settings(server.url, rate_limit_per_org=rate_limit_per_org, overrides=settings):
+            return [run_scenario(server, data, scenario, repeat=repeat) for scenario in scenarios]
+
+
+def unbenchmarked_subcommands():
+    """Return the ``meraki`` subcommands no scenario exercises, so new ones are not silently left out."""
+    covered = {scenario.subcommand for scenario in SCENARIOS}
+    return sorted(set(get_commands_registry()["meraki"]["subcommands"]) - covered)
+
+
+REPORT_COLUMNS = [
+    ("Scenario", "scenario", "{}"),
+    ("Devices", "devices", "{}"),
+    ("Calls cold", "cold_calls", "{}"),
+    ("Calls warm", "warm_calls", "{:.1f}"),
+    ("429s", "throttled", "{}"),
+    ("Cold ms", "cold_ms", "{:.1f}"),
+    ("First row ms", "first_row_ms", "{:.1f}"),
+    ("p50 ms", "p50_ms", "{:.1f}"),
+    ("p95 ms", "p95_ms", "{:.1f}"),
+    ("p99 ms", "p99_ms", "{:.1f}"),
+    ("Peak MiB", "peak_mib", "{:.2f}"),
+    ("Rows", "table_rows", "{}"),
+    ("Table KiB", "table_kib", "{:.1f}"),
+    ("Choices", "menu_choices", "{}"),
+    ("Errors", "errors", "{}"),
+]
+
+
+def format_report(results):
+    """Return the benchmark results as a plain text table, with a dash for values that do not apply."""
+
+    def cell(result, key, fmt):
+        if result[key] is None:
+            return "-"
+        return fmt.format(len(result[key]) if key == "errors" else result[key])
+
+    header = [title for title, _, _ in REPORT_COLUMNS]
+    rows = [[cell(result, key, fmt) for _, key, fmt in REPORT_COLUMNS] for result in results]
+    widths = [max(len(cell) for cell in column) for column in zip(header, *rows)]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in [header, *rows]]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
@@ -0,0 +1,646 @@
+"""Local stand-in for the Meraki Dashboard API serving a synthetic organization."""
+
+import base64
+import bisect
+import functools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+# Share of each device type in the synthetic inventory, in the order device indexes cycle through them.
+DEVICE_MIX = (
+    ("switch", "MS225-48LP", 6),
+    ("wireless", "MR46", 2),
+    ("appliance", "MX250", 1),
+    ("camera", "MV12W", 1),
+)
+PORTS_PER_SWITCH = 48
+SSIDS_PER_NETWORK = 15
+DEFAULT_PAGE_SIZE = 1000
+# Array filters of the organization devices endpoint, and the device field each one matches.
+DEVICE_FILTERS = {"productTypes[]": "productType", "models[]": "model", "networkIds[]": "networkId", "tags[]": "tags"}
+# Query parameters of the organization-wide switch port endpoints, and the device field each one filters on.
+SWITCH_FILTERS = {"networkIds[]": "networkId", "serials[]": "serial"}
+
+
+class DashboardData:  # pylint: disable=too-many-instance-attributes
+    """Deterministic synthetic inventory of a single organization.
+
+    Organizations, networks and devices are generated up front; per-device responses (switch ports, clients,
+    neighbors...) are built on request from the device index, so even the 100k devices scale stays small in memory.
+    """
+
+    def __init__(self, devices=100, devices_per_network=20, clients_per_device=10, organizations=1):
+        """Class constructor."""
+        self.orgs = [{"id": str(100000 + index), "name": f"Benchmark Org {index}"} for index in range(organizations)]
+        self.org_id = self.orgs[0]["id"]
+        self.clients_per_device = clients_per_device
+        cycle = [(product, model) for product, model, share in DEVICE_MIX for _ in range(share)]
+        self.devices = []
+        for index in range(devices):
+            product, model = cycle[index % len(cycle)]
+            self.devices.append(
+                {
+                    "name": f"{product}-{index:06d}",
+                    "serial": f"Q2{product[0].upper()}X-{index // 10000:04d}-{index % 10000:04d}",
+                    "mac": f"0c:8d:db:{index >> 16 & 255:02x}:{index >> 8 & 255:02x}:{index & 255:02x}",
+                    "networkId": f"L_{index // devices_per_network:06d}",
+                    "model": model,
+                    "productType": product,
+                    "tags": [f"floor{index % 5}"],
+                    "lanIp": f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}",
+                    "firmware": f"{product}-15-21",
+                    "address": "",
+                    "notes": "",
+                }
+            )
+        self.devices.sort(key=lambda dev: dev["serial"])
+        self.serials = [dev["serial"] for dev in self.devices]
+        self.by_serial = {dev["serial"]: dev for dev in self.devices}
+        self.networks = [
+            {
+                "id": f"L_{index:06d}",
+                "organizationId": self.org_id,
+                "name": f"Network {index:06d}",
+                "productTypes": [product for product, _, _ in DEVICE_MIX],
+                "timeZone": "America/Los_Angeles",
+                "tags": [f"region{index % 3}"],
+                "notes": f"Synthetic network {index}",
+            }
+            for index in range(max(1, -(-devices // devices_per_network)))
+        ]
+        self.network_ids = [net["id"] for net in self.networks]
+        self.admins = [
+            {"id": str(index), "name": f"Admin {index}", "email": f"admin{index}@example.com", "orgAccess": "full"}
+            for index in range(10)
+        ]
+        self.changes = []
+        self.action_batches = {}
+
+    def rename_device(self, serial, name):
+        """Rename a device, recording the change in the configuration change log."""
+        device = self.by_serial[serial]
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self.changes.append(
+            {
+                "ts": now,
+                "networkId": device["networkId"],
+                "page": "Device details",
+                "label": "Device name",
+                "oldValue": device["name"],
+                "newValue": name,
+            }
+        )
+        device.update(name=name, configurationUpdatedAt=now)
+
+    def last(self, product):
+        """Return the last device of a product type, the worst case for any scan of the inventory."""
+        return next(dev for dev in reversed(self.devices) if dev["productType"] == product)
+
+    def network_name(self, network_id):
+        """Return the name of a network."""
+        return f"Network {network_id[2:]}"
+
+    def switch_ports(self, _serial):
+        """Return the port configuration of a switch."""
+        return [
+            {
+                "portId": str(port),
+                "name": f"Port {port}",
+                "tags": [],
+                "enabled": True,
+                "poeEnabled": port % 2 == 0,
+                "type": "access" if port < PORTS_PER_SWITCH - 4 else "trunk",
+                "vlan": 10 + port % 4,
+                "voiceVlan": 100,
+                "allowedVlans": "all",
+                "isolationEnabled": False,
+                "rstpEnabled": True,
+                "stpGuard": "disabled",
+                "linkNegotiation": "Auto negotiate",
+                "portScheduleId": None,
+                "udld": "Alert only",
+                "accessPolicyType": "Open",
+            }
+            for port in range(1, PORTS_PER_SWITCH + 1)
+        ]
+
+    def switch_port(self, serial, port_id):
+        """Return the configuration of one port of a switch."""
+        return self.switch_ports(serial)[int(port_id) - 1]
+
+    def switch_port_statuses(self, _serial):
+        """Return the status of every port of a switch."""
+        return [
+            {
+                "portId": str(port),
+                "enabled": True,
+                "status": "Connected" if port % 3 else "Disconnected",
+                "isUplink": port > PORTS_PER_SWITCH - 4,
+                "errors": [] if port % 7 else ["Port disconnected"],
+                "warnings": [],
+                "speed": "1 Gbps" if port % 3 else "",
+                "duplex": "full" if port % 3 else "",
+                "usageInKb": {"total": port * 1024, "sent": port * 512, "recv": port * 512},
+                "clientCount": port % 3,
+                "powerUsageInWh": 55.9 if port % 2 == 0 else 0,
+                "trafficInKbps": {"total": 2.2, "sent": 1.2, "recv": 1.0},
+            }
+            for port in range(1, PORTS_PER_SWITCH + 1)
+        ]
+
+    def device_clients(self, serial):
+        """Return the clients seen by a device."""
+        index = bisect.bisect_left(self.serials, serial)
+        return [
+            {
+                "id": f"k{index:06d}{client:03d}",
+                "usage": {"sent": 138.0, "recv": 61.0},
+                "description": f"client-{index}-{client}",
+                "mac": f"22:33:44:{index >> 8 & 255:02x}:{index & 255:02x}:{client:02x}",
+                "ip": f"172.16.{index & 255}.{client + 1}",
+                "user": None,
+                "vlan": 10,
+                "switchport": str(client % PORTS_PER_SWITCH + 1),
+                "mdnsName": None,
+                "dhcpHostname": f"host-{index}-{client}",
+            }
+            for client in range(self.clients_per_device)
+        ]
+
+    def network_clients(self, network_id):
+        """Return the clients of every device of a network, with the device they were last seen on."""
+        return [
+            dict(client, recentDeviceSerial=dev["serial"], recentDeviceName=dev["name"], status="Online")
+            for dev in self.devices
+            if dev["networkId"] == network_id
+            for client in self.device_clients(dev["serial"])
+        ]
+
+    def client_search(self, mac):
+        """Return the organization-wide record of a client MAC address, or None when no device saw it."""
+        octets = mac.lower().split(":")
+        if len(octets) != 6 or octets[:3] != ["22", "33", "44"]:
+            return None
+        index, client = int(octets[3] + octets[4], 16), int(octets[5], 16)
+        if index >= len(self.devices) or client >= self.clients_per_device:
+            return None
+        dev = self.devices[index]
+        entry = self.device_clients(dev["serial"])[client]
+        return {
+            "clientId": entry["id"],
+            "mac": entry["mac"],
+            "manufacturer": "Benchmark",
+            "records": [
+                {
+                    "network": {"id": dev["networkId"], "name": self.network_name(dev["networkId"])},
+                    "description": entry["description"],
+                    "ip": entry["ip"],
+                    "vlan": entry["vlan"],
+                    "switchport": entry["switchport"],
+                    "recentDeviceSerial": dev["serial"],
+                    "recentDeviceName": dev["name"],
+                    "status": "Online",
+                }
+            ],
+        }
+
+    @functools.cached_property
+    def wiring(self):
+        """Return the links of every device, as a dict of serial to ``(local_port, neighbor, remote_port)`` tuples.
+
+        Each network is wired as a tree: its first appliance is the root, with the other appliances on its ports 2 and
+        up and the switches on its port 1, as a binary tree of switches uplinked on their last port. Wireless access
+        points and cameras are spread over the switch ports from port 1.
+        """
+        links = defaultdict(list)
+
+        def link(dev, port, other, other_port):
+            links[dev["serial"]].append((str(port), other, str(other_port)))
+            links[other["serial"]].append((str(other_port), dev, str(port)))
+
+        by_network = defaultdict(lambda: defaultdict(list))
+        for dev in self.devices:
+            by_network[dev["networkId"]][dev["productType"]].append(dev)
+        for products in by_network.values():
+            appliances, switches = products["appliance"], products["switch"]
+            root = appliances[0] if appliances else None
+            for port, appliance in enumerate(appliances[1:], 2):
+                link(appliance, 1, root, port)
+            for index, switch in enumerate(switches):
+                if index:
+                    parent = switches[(index - 1) // 2]
+                    link(switch, PORTS_PER_SWITCH, parent, PORTS_PER_SWITCH - 1 - index % 2)
+                elif root is not None:
+                    link(switch, PORTS_PER_SWITCH, root, 1)
+            if switches:
+                for index, dev in enumerate(products["wireless"] + products["camera"]):
+                    link(dev, 0, switches[index % len(switches)], 1 + index // len(switches))
+        return links
+
+    def lldp_cdp(self, serial):
+        """Return the LLDP and CDP neighbors of a device."""
+        ports = {}
+        for port, neighbor, remote_port in self.wiring.get(serial, []):
+            ports[port] = {
+                "cdp": {
+                    "sourcePort": port,
+                    "deviceId": neighbor["mac"].replace(":", ""),
+                    "portId": f"Port {remote_port}",
+                    "address": neighbor["lanIp"],
+                },
+                "lldp": {
+                    "sourcePort": port,
+                    "systemName": neighbor["name"],
+                    "portId": remote_port,
+                    "managementAddress": neighbor["lanIp"],
+                },
+            }
+        return {"sourceMac": self.by_serial[serial]["mac"], "ports": ports}
+
+    def ssids(self, network_id):
+        """Return the SSIDs of a network."""
+        return [
+            {
+                "number": number,
+                "name": f"{self.network_name(network_id)} SSID {number}",
+                "enabled": number < 3,
+                "splashPage": "None",
+                "authMode": "psk",
+                "bandSelection": "Dual band operation",
+                "visible": True,
+                "availableOnAllAps": True,
+            }
+            for number in range(SSIDS_PER_NETWORK)
+        ]
+
+    def camera_recent(self, _serial):
+        """Return the recent analytics of a camera."""
+        return [
+            {
+                "zoneId": zone,
+                "startTs": "2018-08-15T18:32:38.123Z",
+                "endTs": "2018-08-15T18:33:38.123Z",
+                "entrances": zone * 3,
+                "averageCount": zone,
+            }
+            for zone in range(4)
+        ]
+
+    def appliance_performance(self, _serial):
+        """Return the performance score of an appliance."""
+        return {"perfScore": 10}
+
+
+def _matches(value, accepted):
+    """Return whether a device field, or any item of a list field such as tags, is among the accepted values."""
+    return bool(accepted.intersection(value)) if isinstance(value, list) else value in accepted
+
+
+def _cursor(offset):
+    """Return the opaque cursor of the page starting at ``offset``, so clients have to follow the links issued."""
+    return base64.urlsafe_b64encode(f"offset:{offset}".encode()).decode()
+
+
+def _page(entries, query):
+    """Return the page of ``entries`` requested by ``perPage`` and ``startingAfter``, and the cursor of the next one.
+
+    Raises:
+        ValueError: ``startingAfter`` is not a cursor issued by a previous page.
+    """
+    per_page = int(query.get("perPage", [DEFAULT_PAGE_SIZE])[0])
+    start = 0
+    if "startingAfter" in query:
+        prefix, _, offset = base64.urlsafe_b64decode(query["startingAfter"][0].encode()).decode().partition(":")
+        if prefix != "offset":
+            raise ValueError(f"invalid startingAfter {query['startingAfter'][0]!r}")
+        start = int(offset)
+    end = start + per_page
+    return entries[start:end], _cursor(end) if end < len(entries) else None
+
+
+class MockDashboard:  # pylint: disable=too-many-instance-attributes
+    """Threaded HTTP server answering the Dashboard API endpoints used by the plugin from a DashboardData.
+
+    ``latency`` adds a random delay of 0.5 to 1.5 times its value (in seconds) to every response, and a share
+    ``throttle_ratio`` of the requests is answered with HTTP 429 and ``Retry-After: 0``, so the client retries
+    immediately while the extra round trip still shows up in the statistics. ``stats`` counts the requests served,
+    in total and per API operation, and the throttled ones. The organization devices endpoint honors the
+    ``productTypes``, ``models``, ``networkIds``, ``tags`` and ``configurationUpdatedAfter`` filters, the
+    organization-wide switch port endpoints the ``networkIds`` and ``serials`` filters, the network clients endpoint
+    the ``ip`` and ``mac`` filters, and changes made through :meth:`DashboardData.rename_device` show in the
+    configuration change log. Action batches fail as a whole when an action targets an unknown switch port, and
+    otherwise complete by the time they are first polled.
+
+    Use it as a context manager; ``url`` is the base URL to give to the Dashboard API::
+
+        with MockDashboard(DashboardData(devices=10000)) as server:
+            client = MerakiClient(api_key="benchmark", base_url=server.url)
+    """
+
+    def __init__(self, data, latency=0.0, throttle_ratio=0.0, seed=0):
+        """Class constructor."""
+        self.data = data
+        self.latency = latency
+        self.throttle_ratio = throttle_ratio
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.stats = {"requests": 0, "throttled": 0, "operations": Counter()}
+        self.routes = [
+            ("GET", r"/organizations", "getOrganizations", self._organizations),
+            ("GET", r"/organizations/(\w+)/admins", "getOrganizationAdmins", self._admins),
+            ("GET", r"/organizations/(\w+)/devices", "getOrganizationDevices", self._devices),
+            ("GET", r"/organizations/(\w+)/networks", "getOrganizationNetworks", self._networks),
+            (
+                "GET",
+                r"/organizations/(\w+)/configurationChanges",
+                "getOrganizationConfigurationChanges",
+                self._configuration_changes,
+            ),
+            (
+                "GET",
+                r"/organizations/(\w+)/switch/ports/bySwitch",
+                "getOrganizationSwitchPortsBySwitch",
+                self._org_switch_ports,
+            ),
+            (
+                "GET",
+                r"/organizations/(\w+)/switch/ports/statuses/bySwitch",
+                "getOrganizationSwitchPortsStatusesBySwitch",
+                self._org_port_statuses,
+            ),
+            ("GET", r"/organizations/(\w+)/clients/search", "getOrganizationClientsSearch", self._client_search),
+            ("POST", r"/organizations/(\w+)/actionBatches", "createOrganizationActionBatch", self._create_batch),
+            ("GET", r"/organizations/(\w+)/actionBatches/(\w+)", "getOrganizationActionBatch", self._action_batch),
+            ("GET", r"/networks/(\w+)/clients", "getNetworkClients", self._network_clients),
+            ("GET", r"/networks/(\w+)/wireless/ssids", "getNetworkWirelessSsids", self._ssids),
+            ("GET", r"/devices/([\w-]+)/switch/ports", "getDeviceSwitchPorts", self._switch_ports),
+            ("GET", r"/devices/([\w-]+)/switch/ports/statuses", "getDeviceSwitchPortsStatuses", self._port_statuses),
+            ("PUT", r"/devices/([\w-]+)/switch/ports/(\w+)", "updateDeviceSwitchPort", self._update_port),
+            ("POST", r"/devices/([\w-]+)/switch/ports/cycle", "cycleDeviceSwitchPorts", self._cycle_ports),
+            ("GET", r"/devices/([\w-]+)/clients", "getDeviceClients", self._device_clients),
+            ("GET", r"/devices/([\w-]+)/lldpCdp", "getDeviceLldpCdp", self._lldp_cdp),
+            ("GET", r"/devices/([\w-]+)/camera/analytics/recent", "getDeviceCameraAnalyticsRecent", self._camera),
+            ("GET", r"/devices/([\w-]+)/appliance/performance", "getDeviceAppliancePerformance", self._performance),
+        ]
+        self._routes = [(method, re.compile(f"{pattern}$"), op, func) for method, pattern, op, func in self.routes]
+
+    @property
+    def url(self):
+        """Return the base URL of the mock Dashboard API."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def start(self):
+        """Start serving on a free local port in a background thread."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _handler_class(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        """Start the server."""
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        """Stop the server."""
+        self.stop()
+
+    def reset_stats(self):
+        """Reset the request statistics."""
+        with self._lock:
+            self.stats = {"requests": 0, "throttled": 0, "operations": Counter()}
+
+    def snapshot(self):
+        """Return a copy of the request statistics."""
+        with self._lock:
+            return dict(self.stats, operations=Counter(self.stats["operations"]))
+
+    def handle(self, method, target, body):
+        """Return the ``(status, headers, payload)`` answering a request."""
+        url = urlsplit(target)
+        path = re.sub(r"^/api/v1", "", url.path)
+        for route_method, pattern, operation, func in self._routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                break
+        else:
+            return 404, {}, {"errors": [f"No mock for {method} {path}"]}
+        with self._lock:
+            self.stats["requests"] += 1
+            throttled = self._random.random() < self.throttle_ratio
+            delay = self.latency * self._random.uniform(0.5, 1.5)
+            if throttled:
+                self.stats["throttled"] += 1
+            else:
+                self.stats["operations"][operation] += 1
+        if delay:
+            time.sleep(delay)
+        if throttled:
+            return 429, {"Retry-After": "0"}, {"errors": ["API rate limit exceeded for organization"]}
+        return func(*match.groups(), query=parse_qs(url.query), path=path, body=body)
+
+    @staticmethod
+    def _ok(payload):
+        return 200, {}, payload
+
+    def _paged(self, entries, query, path, build=None):
+        """Answer a paginated endpoint, with a Link header to the next page like the dashboard.
+
+        ``build``, when given, turns the entries of the page into the response items.
+        """
+        try:
+            page, next_cursor = _page(entries, query)
+        except ValueError as error:
+            return 400, {}, {"errors": [str(error)]}
+        if build is not None:
+            page = [build(entry) for entry in page]
+        headers = {}
+        if next_cursor:
+            params = {key: values for key, values in query.items() if key not in ("perPage", "startingAfter")}
+            params.update(perPage=query.get("perPage", [DEFAULT_PAGE_SIZE]), startingAfter=[next_cursor])
+            # The SDK prefixes links that do not point at meraki.com with its base URL, so link relative to it.
+            headers["Link"] = f"<{path}?{urlencode(params, doseq=True)}>; rel=next"
+        return 200, headers, page
+
+    def _organizations(self, **_):
+        return self._ok(self.data.orgs)
+
+    def _admins(self, org_id, **_):
+        return self._ok(self.data.admins if org_id == self.data.org_id else [])
+
+    def _devices(self, org_id, query, path, **_):
+        if org_id != self.data.org_id:
+            return self._ok([])
+        entries = self.data.devices
+        filters = {field: set(query[param]) for param, field in DEVICE_FILTERS.items() if param in query}
+        if filters:
+            entries = [dev for dev in entries if all(_matches(dev[field], values) for field, values in filters.items())]
+        if "configurationUpdatedAfter" in query:
+            after = query["configurationUpdatedAfter"][0]
+            entries = [dev for dev in entries if dev.get("configurationUpdatedAt", "") > after]
+        return self._paged(entries, query, path)
+
+    def _configuration_changes(self, org_id, query, **_):
+        if org_id != self.data.org_id:
+            return self._ok([])
+        since = query.get("t0", [""])[0]
+        return self._ok([change for change in reversed(self.data.changes) if change["ts"] >= since])
+
+    def _org_switches(self, org_id, query, path, build):
+        """Answer an organization-wide switch port endpoint, listing ``ports`` built per switch by serial."""
+        if org_id != self.data.org_id:
+            return self._ok([])
+        filters = {field: set(query[param]) for param, field in SWITCH_FILTERS.items() if param in query}
+        switches = [
+            dev
+            for dev in self.data.devices
+            if dev["productType"] == "switch" and all(dev[field] in values for field, values in filters.items())
+        ]
+
+        def switch(dev):
+            return {
+                "name": dev["name"],
+                "serial": dev["serial"],
+                "mac": dev["mac"],
+                "model": dev["model"],
+                "network": {"id": dev["networkId"], "name": self.data.network_name(dev["networkId"])},
+                "ports": build(dev["serial"]),
+            }
+
+        return self._paged(switches, query, path, build=switch)
+
+    def _org_switch_ports(self, org_id, query, path, **_):
+        return self._org_switches(org_id, query, path, self.data.switch_ports)
+
+    def _org_port_statuses(self, org_id, query, path, **_):
+        return self._org_switches(org_id, query, path, self.data.switch_port_statuses)
+
+    def _create_batch(self, org_id, body, **_):
+        if len(body.get("actions", [])) > 100:
+            return 400, {}, {"errors": ["An action batch can contain at most 100 actions"]}
+        errors = []
+        for action in body.get("actions", []):
+            match = re.match(r"/devices/([\w-]+)/switch/ports/(\w+)$", action["resource"])
+            if (
+                not match
+                or match.group(1) not in self.data.by_serial
+                or not 0 < int(match.group(2)) <= PORTS_PER_SWITCH
+            ):
+                errors.append(f"Resource {action['resource']} not found")
+        batch = {
+            "id": str(len(self.data.action_batches) + 1),
+            "organizationId": org_id,
+            "confirmed": body.get("confirmed", False),
+            "synchronous": body.get("synchronous", False),
+            # Batches are atomic: an invalid action fails the whole batch.
+            "status": {"completed": False, "failed": bool(errors), "errors": errors, "createdResources": []},
+            "actions": body.get("actions", []),
+        }
+        self.data.action_batches[batch["id"]] = batch
+        return 201, {}, batch
+
+    def _action_batch(self, org_id, batch_id, **_):
+        batch = self.data.action_batches.get(batch_id)
+        if batch is None or batch["organizationId"] != org_id:
+            return 404, {}, {"errors": ["Action batch not found"]}
+        # Batches complete by the time they are first polled.
+        if batch["confirmed"] and not batch["status"]["failed"]:
+            batch["status"]["completed"] = True
+        return self._ok(batch)
+
+    def _networks(self, org_id, query, path, **_):
+        if org_id != self.data.org_id:
+            return self._ok([])
+        return self._paged(self.data.networks, query, path)
+
+    def _network_clients(self, network_id, query, path, **_):
+        entries = self.data.network_clients(network_id)
+        # Like the dashboard, the address filters match part of the address.
+        for field in ("ip", "mac"):
+            if field in query:
+                entries = [entry for entry in entries if query[field][0].lower() in entry[field]]
+        return self._paged(entries, query, path)
+
+    def _client_search(self, org_id, query, **_):
+        record = self.data.client_search(query.get("mac", [""])[0]) if org_id == self.data.org_id else None
+        if record is None:
+            return 404, {}, {"errors": ["Client not found"]}
+        return self._ok(record)
+
+    def _ssids(self, network_id, **_):
+        return self._ok(self.data.ssids(network_id))
+
+    def _device(self, serial, build):
+        if serial not in self.data.by_serial:
+            return 404, {}, {"errors": ["Device not found"]}
+        return self._ok(build(serial))
+
+    def _switch_ports(self, serial, **_):
+        return self._device(serial, self.data.switch_ports)
+
+    def _port_statuses(self, serial, **_):
+        return self._device(serial, self.data.switch_port_statuses)
+
+    def _update_port(self, serial, port_id, body, **_):
+        return self._device(serial, lambda serial: dict(self.data.switch_port(serial, port_id), **body))
+
+    def _cycle_ports(self, serial, body, **_):
+        return self._device(serial, lambda _: {"ports": body.get("ports", [])})
+
+    def _device_clients(self, serial, **_):
+        return self._device(serial, self.data.device_clients)
+
+    def _lldp_cdp(self, serial, **_):
+        return self._device(serial, self.data.lldp_cdp)
+
+    def _camera(self, serial, **_):
+        return self._device(serial, self.data.camera_recent)
+
+    def _performance(self, serial, **_):
+        return self._device(serial, self.data.appliance_performance)
+
+
+def _handler_class(dashboard):
+    """Return a request handler class bound to a MockDashboard."""
+
+    class Handler(BaseHTTPRequestHandler):
+        """Serve every request from the MockDashboard, keeping connections alive like the dashboard does."""
+
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately, which Nagle's algorithm would delay by a delayed ACK each time.
+        disable_nagle_algorithm = True
+
+        def _respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else {}
+            status, headers, payload = dashboard.handle(self.command, self.path, body)
+            content = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = do_PUT = do_POST = _respond  # pylint: disable=invalid-name
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            """Keep the benchmark output quiet."""
+
+    return Handler
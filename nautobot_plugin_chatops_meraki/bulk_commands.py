@@ -0,0 +1,528 @@
+"""Meraki subcommands reading or changing the ports of many switches at once."""
+
+import csv
+import re
+
+from nautobot_chatops.choices import CommandStatusChoices
+from nautobot_chatops.workers import subcommand_of
+
+from .async_utils import batch_finished
+from .helpers import (
+    LOGGER,
+    PLUGIN_SETTINGS,
+    get_client,
+    meraki_logo,
+    network_selected,
+    progress_reporter,
+    prompt_for_network,
+    prompt_for_organization,
+    run_async,
+    table_stream,
+)
+from .inventory import MerakiLookupError
+from .metrics import instrumented
+
+
+BULK_FILTER_TYPES = [
+    ("network", "network"),
+    ("tag", "tag"),
+    ("model", "model"),
+]
+
+PORT_FILTER_TYPES = [
+    ("all", "all"),
+    ("status", "status"),
+    ("errors", "errors"),
+    ("poe", "poe"),
+    ("vlan", "vlan"),
+]
+
+# Values accepted by the port filters offered as a menu; the VLAN filter takes a typed VLAN ID instead.
+PORT_FILTER_VALUES = {
+    "status": ["connected", "disconnected", "disabled"],
+    "poe": ["enabled", "disabled"],
+}
+
+# Columns of the lines of a bulk port change that does not start with a header line.
+PORT_CHANGE_COLUMNS = ["switch", "ports", "vlan", "enabled", "name"]
+PORT_STATUS_FIELDS = ("portId", "enabled", "status", "errors", "warnings", "speed", "duplex", "clientCount")
+
+
+def filter_switches(client, org_name, filter_type, filter_value):
+    """Return the switches of an organization in a network, carrying a tag, or of a model."""
+    switches = client.get_device_inventory(org_name, "switch")
+    if filter_type == "network":
+        return switches.in_network(client.netname_to_id(org_name, filter_value))
+    if filter_type == "tag":
+        return [dev for dev in switches if filter_value in (dev.get("tags") or [])]
+    return [dev for dev in switches if (dev.get("model") or "").lower() == filter_value.lower()]
+
+
+def prompt_for_switch_filter(dispatcher, command, org, filter_type, query=None):
+    """Prompt the user to select the network, tag or model that selects switches."""
+    if filter_type == "network":
+        return prompt_for_network(dispatcher, command, org, query=query)
+    switches = get_client().get_device_inventory(org, "switch")
+    if filter_type == "tag":
+        values = sorted({tag for dev in switches for tag in dev.get("tags") or []})
+    else:
+        values = sorted({dev["model"] for dev in switches})
+    dispatcher.prompt_from_menu(command, f"Select a {filter_type.title()}", [(value, value) for value in values])
+    return False
+
+
+def port_status_row(name, entry):
+    """Return the table row of a port status of the named switch, with its errors and warnings one per line."""
+    values = (entry[field] for field in PORT_STATUS_FIELDS)
+    return (name, *("\n".join(value) if isinstance(value, list) else value for value in values))
+
+
+@subcommand_of("meraki")
+@instrumented
+def get_switchports_status_bulk(dispatcher, org_name=None, filter_type=None, filter_value=None):
+    """Gathers switch ports status from every switch in a network, with a tag or of a model."""
+    LOGGER.info("ORG NAME: %s", org_name)
+    LOGGER.info("FILTER: %s %s", filter_type, filter_value)
+    if not org_name:
+        return prompt_for_organization(dispatcher, "meraki get-switchports-status-bulk")
+    if filter_type not in dict(BULK_FILTER_TYPES):
+        dispatcher.prompt_from_menu(
+            f"meraki get-switchports-status-bulk '{org_name}'", "Select how to pick switches", BULK_FILTER_TYPES
+        )
+        return False
+    if not filter_value or (filter_type == "network" and not network_selected(org_name, filter_value)):
+        return prompt_for_switch_filter(
+            dispatcher,
+            f"meraki get-switchports-status-bulk '{org_name}' {filter_type}",
+            org_name,
+            filter_type,
+            query=filter_value,
+        )
+    client = get_client()
+    switches = filter_switches(client, org_name, filter_type, filter_value)
+    if len(switches) == 0:
+        dispatcher.send_markdown(f"There are NO switches matching {filter_type} {filter_value}!")
+        return (
+            CommandStatusChoices.STATUS_SUCCEEDED,
+            f"There are NO switches matching {filter_type} {filter_value}!",
+        )
+    dispatcher.send_markdown(f"Collecting switch port status from {len(switches)} switches...")
+    blocks = [
+        *dispatcher.command_response_header(
+            "meraki",
+            "get-switchports-status-bulk",
+            [("Org Name", org_name), ("Filter", f"{filter_type} {filter_value}"), ("Switches", str(len(switches)))],
+            "Switchport Details",
+            meraki_logo(dispatcher),
+        ),
+    ]
+    dispatcher.send_blocks(blocks)
+    names = {dev["serial"]: dev["name"] or dev["serial"] for dev in switches}
+    failed = []
+    progress = progress_reporter(dispatcher, len(switches), "switches")
+    stream = table_stream(
+        dispatcher,
+        ["Switch", "Port", "Enabled", "Status", "Errors", "Warnings", "Speed", "Duplex", "Client Count"],
+        title="Switch ports",
+    )
+
+    def on_result(serial, ports):
+        if isinstance(ports, Exception):
+            failed.append((names[serial], str(ports)))
+            return
+        stream.extend(port_status_row(names[serial], entry) for entry in ports)
+        stream.batch_done()
+
+    with stream:
+        run_async(
+            lambda aio_client: aio_client.for_each_serial(
+                aio_client.dashboard.switch.getDeviceSwitchPortsStatuses,
+                list(names),
+                org_id=client.org_name_to_id(org_name),
+                progress=progress,
+                on_result=on_result,
+            )
+        )
+    summary = f"{stream.count} ports of {len(switches) - len(failed)} switches."
+    if stream.chunks > 1:
+        dispatcher.send_markdown(f"Done: {summary}")
+    if failed:
+        dispatcher.send_large_table(["Switch", "Error"], failed, title="Switches that could not be queried")
+        return (
+            CommandStatusChoices.STATUS_SUCCEEDED,
+            f"{len(failed)} of {len(switches)} switches could not be queried.",
+        )
+    return CommandStatusChoices.STATUS_SUCCEEDED, summary
+
+
+def port_matches(filter_type, filter_value, status, config):
+    """Return whether a switch port, given its status and configuration, passes a port filter."""
+    config = config or {}
+    if filter_type == "status":
+        if filter_value == "disabled":
+            return not status["enabled"]
+        return status["enabled"] and (status.get("status") or "").lower() == filter_value
+    if filter_type == "errors":
+        return bool(status.get("errors"))
+    if filter_type == "poe":
+        return bool(config.get("poeEnabled")) == (filter_value == "enabled")
+    if filter_type == "vlan":
+        return str(config.get("vlan")) == filter_value
+    return True
+
+
+@subcommand_of("meraki")
+@instrumented
+def get_org_switchports(dispatcher, org_name=None, filter_type=None, filter_value=None):
+    """Gathers the status of every switch port of an organization, filtered by status, errors, PoE or VLAN."""
+    LOGGER.info("ORG NAME: %s", org_name)
+    LOGGER.info("FILTER: %s %s", filter_type, filter_value)
+    if not org_name:
+        return prompt_for_organization(dispatcher, "meraki get-org-switchports")
+    if filter_type not in dict(PORT_FILTER_TYPES):
+        dispatcher.prompt_from_menu(
+            f"meraki get-org-switchports '{org_name}'", "Select which ports to list", PORT_FILTER_TYPES
+        )
+        return False
+    filter_value = (filter_value or "").lower()
+    if filter_type in PORT_FILTER_VALUES and filter_value not in PORT_FILTER_VALUES[filter_type]:
+        dispatcher.prompt_from_menu(
+            f"meraki get-org-switchports '{org_name}' {filter_type}",
+            f"Select the {filter_type.title()} of the ports",
+            [(value, value) for value in PORT_FILTER_VALUES[filter_type]],
+        )
+        return False
+    if filter_type == "vlan" and not filter_value.isdigit():
+        dispatcher.prompt_for_text(f"meraki get-org-switchports '{org_name}' vlan", "Enter a VLAN ID", "VLAN")
+        return False
+    description = f"{filter_type} {filter_value}".strip()
+    client = get_client()
+    dispatcher.send_markdown(f"Collecting the switch ports of {org_name}...")
+    blocks = [
+        *dispatcher.command_response_header(
+            "meraki",
+            "get-org-switchports",
+            [("Org Name", org_name), ("Filter", description)],
+            "Switchport Details",
+            meraki_logo(dispatcher),
+        ),
+    ]
+    dispatcher.send_blocks(blocks)
+    switches = set()
+    ports = 0
+    stream = table_stream(
+        dispatcher,
+        ["Switch", "Network", "Port", "Enabled", "Status", "VLAN", "PoE", "Errors", "Warnings", "Speed"],
+        title="Switch ports",
+    )
+    with stream:
+        for switch, status, config in client.iter_meraki_org_switchports(org_name):
+            if switch["serial"] not in switches:
+                # The rows of the previous switch are complete.
+                stream.batch_done()
+                switches.add(switch["serial"])
+            ports += 1
+            if not port_matches(filter_type, filter_value, status, config):
+                continue
+            config = config or {}
+            stream.add(
+                (
+                    switch.get("name") or switch["serial"],
+                    (switch.get("network") or {}).get("name", ""),
+                    status["portId"],
+                    status["enabled"],
+                    status.get("status", ""),
+                    config.get("vlan", ""),
+                    config.get("poeEnabled", ""),
+                    "\n".join(status.get("errors") or []),
+                    "\n".join(status.get("warnings") or []),
+                    status.get("speed", ""),
+                )
+            )
+    summary = f"{stream.count} of {ports} ports on {len(switches)} switches match {description}."
+    if not stream.count:
+        dispatcher.send_markdown(f"There are NO switch ports matching {description}!")
+    elif stream.chunks > 1:
+        dispatcher.send_markdown(f"Done: {summary}")
+    return CommandStatusChoices.STATUS_SUCCEEDED, summary
+
+
+def parse_bool(value):
+    """Parse a yes/no value typed by a user."""
+    if value.lower() in ("true", "yes", "1", "on", "enabled"):
+        return True
+    if value.lower() in ("false", "no", "0", "off", "disabled"):
+        return False
+    raise ValueError(f"{value!r} is not a yes or no value")
+
+
+# Port settings a bulk port change can set, by column name: the API field and the parser of the typed value.
+PORT_CHANGE_SETTINGS = {
+    "name": ("name", str),
+    "enabled": ("enabled", parse_bool),
+    "type": ("type", str.lower),
+    "vlan": ("vlan", int),
+    "voice-vlan": ("voiceVlan", int),
+    "poe": ("poeEnabled", parse_bool),
+}
+
+
+def expand_ports(ports):
+    """Expand a list of ports such as ``1-4,48`` into port IDs.
+
+    Only numbers joined by a dash are ranges; other port IDs, such as the ``1_MA-MOD-4X10G_1`` uplinks of modules,
+    are kept as they are.
+    """
+    port_ids = []
+    for token in ports.split(","):
+        token = token.strip()
+        match = re.fullmatch(r"(\d+)-(\d+)", token)
+        if match is None:
+            port_ids.append(token)
+        elif int(match[1]) <= int(match[2]):
+            port_ids.extend(str(port) for port in range(int(match[1]), int(match[2]) + 1))
+        else:
+            raise ValueError(f"{token!r} is not a port range")
+    return port_ids
+
+
+def parse_port_changes(text):
+    """Parse port changes typed as CSV lines into ``(switch_name, port, settings)`` changes.
+
+    Lines, separated by new lines or semicolons, list ``switch,ports,vlan,enabled,name`` unless the first line is a
+    header naming the columns, among ``switch``, ``ports`` and the keys of PORT_CHANGE_SETTINGS. Empty values are
+    left unchanged.
+
+    Raises:
+        ValueError: when a line cannot be parsed, with its line number.
+    """
+    rows = list(csv.reader([line for line in re.split(r"[\n;]", text) if line.strip()], skipinitialspace=True))
+    columns = PORT_CHANGE_COLUMNS
+    if rows and rows[0][0].strip().lower() == "switch":
+        columns = [cell.strip().lower() for cell in rows.pop(0)]
+        unknown = [column for column in columns if column not in ("switch", "ports", *PORT_CHANGE_SETTINGS)]
+        if unknown:
+            raise ValueError(
+                f"Unknown column {', '.join(unknown)}; choose among switch, ports, {', '.join(PORT_CHANGE_SETTINGS)}."
+            )
+    changes = []
+    for number, row in enumerate(rows, 1):
+        fields = {column: cell.strip() for column, cell in zip(columns, row) if cell.strip()}
+        try:
+            if "switch" not in fields or "ports" not in fields:
+                raise ValueError("a switch and its ports are required")
+            port_settings = {
+                key: parse(fields[column]) for column, (key, parse) in PORT_CHANGE_SETTINGS.items() if column in fields
+            }
+            if not port_settings:
+                raise ValueError("no setting to change")
+            changes.extend((fields["switch"], port, port_settings) for port in expand_ports(fields["ports"]))
+        except ValueError as error:
+            raise ValueError(f"Line {number}: {error}.") from error
+    return changes
+
+
+def batch_result(batch):
+    """Return the outcome of the port changes of an Action Batch, given its last known state."""
+    if batch is None:
+        return "not submitted"
+    if batch["status"]["failed"]:
+        return "failed: " + "; ".join(batch["status"]["errors"])
+    if batch["status"]["completed"]:
+        return "applied"
+    return f"pending in batch {batch['id']}"
+
+
+def report_pending_batches(dispatcher, results):
+    """Warn about the Action Batches still running, which the command no longer waits for, and list their IDs.
+
+    Returns the sentence appended to the command's result, empty when every batch finished.
+    """
+    pending = [batch["id"] for _, batch in results if batch is not None and not batch_finished(batch)]
+    if not pending:
+        return ""
+    dispatcher.send_warning(
+        f"Action batches {', '.join(pending)} are still running. Check their state in the dashboard or with the "
+        "getOrganizationActionBatch API call."
+    )
+    return f" Action batches still running: {', '.join(pending)}."
+
+
+@subcommand_of("meraki")
+@instrumented
+def configure_ports_bulk(dispatcher, org_name=None, changes=None):
+    """Apply switch port changes listed as CSV lines, in Action Batches of up to 100 ports."""
+    LOGGER.info("ORG NAME: %s", org_name)
+    if not org_name:
+        return prompt_for_organization(dispatcher, "meraki configure-ports-bulk")
+    if not changes:
+        dispatcher.prompt_for_text(
+            f"meraki configure-ports-bulk '{org_name}'",
+            "Enter one change per line, or separated by semicolons, as switch,ports,vlan,enabled,name. Ports can "
+            "be ranges such as 1-24,48. Start with a header line, such as switch,ports,voice-vlan,poe, to set other "
+            f"settings among {', '.join(PORT_CHANGE_SETTINGS)}.",
+            "Port changes",
+        )
+        return False
+    try:
+        port_changes = parse_port_changes(changes)
+    except ValueError as error:
+        dispatcher.send_warning(str(error))
+        return CommandStatusChoices.STATUS_FAILED, str(error)
+    client = get_client()
+    switches = client.get_device_inventory(org_name, "switch")
+    unknown = sorted({name for name, _, _ in port_changes if name not in switches})
+    if unknown:
+        message = f"There are NO switches named {', '.join(unknown)}!"
+        dispatcher.send_warning(message)
+        return CommandStatusChoices.STATUS_FAILED, message
+    try:
+        for name in {name.lower(): name for name, _, _ in port_changes}.values():
+            switches.get_by_name(name)
+    except MerakiLookupError as error:
+        dispatcher.send_warning(str(error))
+        return CommandStatusChoices.STATUS_FAILED, str(error)
+    dispatcher.send_markdown(f"Applying {len(port_changes)} port changes...")
+    actions = client.switch_port_actions(org_name, port_changes)
+    results = run_async(
+        lambda aio_client: aio_client.run_action_batches(
+            actions,
+            org_id=client.org_name_to_id(org_name),
+            poll_interval=PLUGIN_SETTINGS.get("action_batch_poll_interval", 2),
+            timeout=PLUGIN_SETTINGS.get("action_batch_timeout", 30),
+        )
+    )
+    outcomes = [batch_result(batch) for batch_actions, batch in results for _ in batch_actions]
+    blocks = [
+        *dispatcher.command_response_header(
+            "meraki",
+            "configure-ports-bulk",
+            [("Org Name", org_name), ("Ports", str(len(port_changes))), ("Action Batches", str(len(results)))],
+            "Configured Ports",
+            meraki_logo(dispatcher),
+        ),
+    ]
+    dispatcher.send_blocks(blocks)
+    dispatcher.send_large_table(
+        ["Switch", "Port", "Changes", "Result"],
+        [
+            (name, port, ", ".join(f"{key}={value}" for key, value in port_settings.items()), outcome)
+            for (name, port, port_settings), outcome in zip(port_changes, outcomes)
+        ],
+    )
+    applied = outcomes.count("applied")
+    return (
+        CommandStatusChoices.STATUS_SUCCEEDED,
+        f"{applied} of {len(port_changes)} port changes applied in {len(results)} action batches."
+        + report_pending_batches(dispatcher, results),
+    )
+
+
+def parse_port_targets(text):
+    """Parse ``switch:ports`` targets, separated by new lines or semicolons, into a dict of switch name to port IDs.
+
+    Ports can be lists and ranges such as ``1-4,48``; the ports of a switch named several times are merged.
+
+    Raises:
+        ValueError: when a target cannot be parsed.
+    """
+    targets = {}
+    for target in re.split(r"[\n;]", text):
+        if not target.strip():
+            continue
+        name, _, ports = target.rpartition(":")
+        if not name.strip() or not ports.strip():
+            raise ValueError(f"{target.strip()!r} is not a switch:ports target")
+        port_ids = targets.setdefault(name.strip(), [])
+        port_ids.extend(port for port in expand_ports(ports) if port not in port_ids)
+    return targets
+
+
+def group_ports_by_switch(switches, ports_by_name):
+    """Return the name and the ports of each switch by serial, merging the names a switch was given in any case.
+
+    Raises:
+        MerakiLookupError: when a name is unknown or shared by several switches.
+    """
+    names_by_serial = {}
+    ports_by_serial = {}
+    for name, ports in ports_by_name.items():
+        switch = switches.get_by_name(name)
+        names_by_serial[switch["serial"]] = switch["name"]
+        serial_ports = ports_by_serial.setdefault(switch["serial"], [])
+        serial_ports.extend(port for port in ports if port not in serial_ports)
+    return names_by_serial, ports_by_serial
+
+
+def cycle_result_rows(results, names_by_serial, ports_by_serial):
+    """Return the rows of the table telling which ports were cycled on each switch, or why they were not."""
+    rows = []
+    for serial, ports in ports_by_serial.items():
+        result = results[serial]
+        if isinstance(result, Exception):
+            rows.append((names_by_serial[serial], ", ".join(ports), f"failed: {result}"))
+        else:
+            rows.append((names_by_serial[serial], ", ".join(result.get("ports") or ports), "cycled"))
+    return rows
+
+
+@subcommand_of("meraki")
+@instrumented
+def cycle_ports(dispatcher, org_name=None, targets=None):
+    """Cycle ports on several switches at once, given as switch:ports targets such as sw01:1-4,12;sw02:48."""
+    LOGGER.info("ORG NAME: %s", org_name)
+    if not org_name:
+        return prompt_for_organization(dispatcher, "meraki cycle-ports")
+    if not targets:
+        dispatcher.prompt_for_text(
+            f"meraki cycle-ports '{org_name}'",
+            "Enter the ports to cycle as switch:ports, one switch per line or separated by semicolons. Ports can be "
+            "ranges such as 1-4,48.",
+            "Ports to cycle",
+        )
+        return False
+    try:
+        ports_by_name = parse_port_targets(targets)
+    except ValueError as error:
+        dispatcher.send_warning(str(error))
+        return CommandStatusChoices.STATUS_FAILED, str(error)
+    client = get_client()
+    switches = client.get_device_inventory(org_name, "switch")
+    unknown = sorted(name for name in ports_by_name if name not in switches)
+    if unknown:
+        message = f"There are NO switches named {', '.join(unknown)}!"
+        dispatcher.send_warning(message)
+        return CommandStatusChoices.STATUS_FAILED, message
+    # One call per switch, with all of its ports, however its name was spelled in the targets.
+    try:
+        names_by_serial, ports_by_serial = group_ports_by_switch(switches, ports_by_name)
+    except MerakiLookupError as error:
+        dispatcher.send_warning(str(error))
+        return CommandStatusChoices.STATUS_FAILED, str(error)
+    port_count = sum(len(ports) for ports in ports_by_serial.values())
+    dispatcher.send_markdown(f"Cycling {port_count} ports on {len(ports_by_serial)} switches...")
+    results = run_async(
+        lambda aio_client: aio_client.for_each_serial(
+            aio_client.dashboard.switch.cycleDeviceSwitchPorts,
+            list(ports_by_serial),
+            org_id=client.org_name_to_id(org_name),
+            progress=progress_reporter(dispatcher, len(ports_by_serial), "switches"),
+            serial_args={serial: (ports,) for serial, ports in ports_by_serial.items()},
+        )
+    )
+    blocks = [
+        *dispatcher.command_response_header(
+            "meraki",
+            "cycle-ports",
+            [("Org Name", org_name), ("Switches", str(len(ports_by_serial))), ("Ports", str(port_count))],
+            "cycled ports",
+            meraki_logo(dispatcher),
+        ),
+    ]
+    dispatcher.send_blocks(blocks)
+    rows = cycle_result_rows(results, names_by_serial, ports_by_serial)
+    dispatcher.send_large_table(["Switch", "Ports", "Result"], rows)
+    return (
+        CommandStatusChoices.STATUS_SUCCEEDED,
+        f"Ports cycled on {sum(1 for row in rows if row[2] == 'cycled')} of {len(ports_by_serial)} switches.",
+    )
@@ -0,0 +1,306 @@
+"""Caching helpers for Meraki Dashboard lookups."""
+
+import contextlib
+import contextvars
+import json
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+# Delete a lock only if it is still owned by the caller.
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_FETCHES = contextvars.ContextVar("nautobot_plugin_chatops_meraki_fetches", default=None)
+
+
+class TTLCache:
+    """Thread-safe, size-bounded cache whose entries expire after a time to live.
+
+    Entries are evicted in least-recently-used order once ``maxsize`` is reached. Keys are tuples whose second
+    element, when present, identifies the organization, which allows every entry of an organization to be dropped
+    at once.
+    """
+
+    def __init__(self, ttl=300, maxsize=256, timer=time.monotonic):
+        """Class constructor."""
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key, default=None):
+        """Return the cached value for a key, or ``default`` when it is absent or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return default
+            expires, value = entry
+            if expires <= self._timer():
+                del self._data[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entries when the cache is full."""
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = (self._timer() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, key):
+        """Drop a single entry."""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.stats["invalidations"] += 1
+
+    def invalidate_org(self, org_key):
+        """Drop every entry scoped to the given organization."""
+        with self._lock:
+            for key in [key for key in self._data if len(key) > 1 and key[1] == org_key]:
+                del self._data[key]
+                self.stats["invalidations"] += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self.stats["invalidations"] += len(self._data)
+            self._data.clear()
+
+    def hit_ratio(self):
+        """Return the ratio of lookups answered from the cache."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def __len__(self):
+        """Return the number of stored entries, including any not yet purged after expiring."""
+        return len(self._data)
+
+    def __contains__(self, key):
+        """Return whether a live entry exists for the key, without touching the statistics."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > self._timer()
+
+
+class _Flight:  # pylint: disable=too-few-public-methods
+    """A call in progress, awaited by the callers that joined it."""
+
+    def __init__(self):
+        """Class constructor."""
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe deduplication of identical concurrent calls.
+
+    While a call for a key is in flight, other callers asking for the same key wait for it and receive its result
+    (or exception) instead of running their own. Nothing is kept once the call returns.
+    """
+
+    def __init__(self):
+        """Class constructor."""
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def do(self, key, func):
+        """Return ``(func(), shared)``, where ``shared`` tells whether the result came from another caller's call."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["followers"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+        try:
+            flight.value = func()
+            return flight.value, False
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def __len__(self):
+        """Return the number of calls in flight."""
+        return len(self._flights)
+
+
+class FetchContext:
+    """Dashboard data fetched while a single chat command runs, shared by its handler and the prompts it sends.
+
+    Entries do not expire and are dropped with the context, so a command fetches each resource at most once whatever
+    the cache settings. Keys are tuples whose first element tells the kind of data stored.
+    """
+
+    def __init__(self):
+        """Class constructor."""
+        self._data = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key, default=None):
+        """Return the value fetched for a key earlier in the command, or ``default``."""
+        value = self._data.get(key)
+        if value is None:
+            self.stats["misses"] += 1
+            return default
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key, value):
+        """Store a value for the rest of the command."""
+        self._data[key] = value
+
+    def clear(self, kind=None):
+        """Drop the entries of one kind, or every entry."""
+        for key in [key for key in self._data if kind is None or key[0] == kind]:
+            del self._data[key]
+
+    def __len__(self):
+        """Return the number of stored entries."""
+        return len(self._data)
+
+
+def current_fetches():
+    """Return the FetchContext of the running command, or None."""
+    return _FETCHES.get()
+
+
+@contextlib.contextmanager
+def fetch_context():
+    """Share the data fetched within the block; a block nested in another one joins the outer context."""
+    fetches = _FETCHES.get()
+    if fetches is not None:
+        yield fetches
+        return
+    fetches = FetchContext()
+    token = _FETCHES.set(fetches)
+    try:
+        yield fetches
+    finally:
+        _FETCHES.reset(token)
+
+
+class RedisCache:
+    """Second-level cache of inventory responses in Redis, shared by every RQ worker.
+
+    Values are stored as zlib-compressed compact JSON along with the time they were fetched, each key with its own
+    TTL. When a key is missing, a short-lived lock makes sure only one worker runs the loader while the others wait
+    for its result instead of all hitting the dashboard at once.
+    """
+
+    def __init__(
+        self,
+        redis,
+        ttl=300,
+        key_prefix="nautobot_plugin_chatops_meraki:inventory:",
+        lock_timeout=60,
+        poll_interval=0.1,
+    ):  # pylint: disable=too-many-arguments
+        """Class constructor."""
+        self.redis = redis
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._release = redis.register_script(_RELEASE_SCRIPT)
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "waits": 0}
+
+    def _key(self, key):
+        """Return the Redis key of a cache key tuple."""
+        return self.key_prefix + ":".join(str(part) for part in key)
+
+    @staticmethod
+    def dumps(value, fetched_at=None):
+        """Serialize a value and the time it was fetched."""
+        payload = {"t": time.time() if fetched_at is None else fetched_at, "v": value}
+        return zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+    @staticmethod
+    def loads(data):
+        """Deserialize a value into a ``(value, fetched_at)`` pair."""
+        payload = json.loads(zlib.decompress(data))
+        return payload["v"], payload["t"]
+
+    def get_entry(self, key):
+        """Return the ``(value, fetched_at)`` pair stored for a key, or None."""
+        data = self.redis.get(self._key(key))
+        if data is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return self.loads(data)
+
+    def get(self, key, default=None):
+        """Return the value stored for a key, or ``default``."""
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl=None):
+        """Store a value with its own time to live."""
+        self.redis.set(self._key(key), self.dumps(value), ex=self.ttl if ttl is None else ttl)
+
+    def invalidate(self, key):
+        """Drop a key, so the next reader fetches fresh data."""
+        self.redis.delete(self._key(key))
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the value of a key, running ``loader`` in at most one worker at a time when it is missing."""
+        return self.get_or_load_entry(key, loader, ttl=ttl)[0]
+
+    def get_or_load_entry(self, key, loader, ttl=None):
+        """Like :meth:`get_or_load`, but return a ``(value, fetched_at)`` pair."""
+        entry = self.get_entry(key)
+        if entry is not None:
+            return entry
+        lock_key = self._key(key) + ":lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        while not self.redis.set(lock_key, token, nx=True, ex=self.lock_timeout):
+            # Another worker is refreshing this key: wait for its result rather than duplicating the download.
+            self.stats["waits"] += 1
+            time.sleep(self.poll_interval)
+            data = self.redis.get(self._key(key))
+            if data is not None:
+                return self.loads(data)
+            if time.monotonic() > deadline:
+                break
+        try:
+            # The previous holder of the lock may have stored the value between the first read and the lock.
+            data = self.redis.get(self._key(key))
+            if data is not None:
+                return self.loads(data)
+            self.stats["loads"] += 1
+            value = loader()
+            self.set(key, value, ttl=ttl)
+            return value, time.time()
+        finally:
+            self._release(keys=[lock_key], args=[token])
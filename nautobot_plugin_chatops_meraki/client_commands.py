@@ -0,0 +1,227 @@
+"""Meraki subcommands locating and searching the clients of an organization."""
+
+import ipaddress
+import math
+import re
+import time
+from operator import itemgetter
+
+from nautobot_chatops.choices import CommandStatusChoices
+from nautobot_chatops.workers import subcommand_of
+
+from .client_index import ClientIndex
+from .helpers import (
+    LOGGER,
+    PLUGIN_SETTINGS,
+    get_client,
+    get_client_index_store,
+    meraki_logo,
+    progress_reporter,
+    prompt_for_organization,
+    run_async,
+    table_renderer,
+)
+from .inventory import normalize_mac
+from .metrics import instrumented
+from .rendering import Column
+
+
+# Columns of the places a client was located in, from its network-level records.
+CLIENT_LOCATION_COLUMNS = [
+    Column("MAC", itemgetter("mac")),
+    Column("IP", lambda entry: entry.get("ip")),
+    Column("Description", lambda entry: entry.get("description")),
+    Column("Network", itemgetter("network")),
+    Column("Device", lambda entry: entry.get("recentDeviceName") or entry.get("recentDeviceSerial")),
+    Column("Switchport", lambda entry: entry.get("switchport")),
+    Column("VLAN", lambda entry: entry.get("vlan")),
+    Column("Status", lambda entry: entry.get("status")),
+]
+
+# Columns of the clients found in a client index.
+CLIENT_INDEX_COLUMNS = [
+    Column(title, itemgetter(field))
+    for title, field in (
+        ("MAC", "mac"),
+        ("IP", "ip"),
+        ("Host Name", "hostname"),
+        ("Device", "device"),
+        ("Switchport", "switchport"),
+        ("VLAN", "vlan"),
+        ("Network", "network"),
+    )
+]
+
+
+def parse_client_address(address):
+    """Return whether an address typed by the user is a ``mac`` or an ``ip``, with the address in canonical form.
+
+    Raises:
+        ValueError: when the address is neither a MAC nor an IP address.
+    """
+    # IP addresses are tried first, as IPv6 addresses such as ``::aabb:ccdd:eeff`` hold 12 hex digits as well.
+    try:
+        return "ip", str(ipaddress.ip_address(address.strip()))
+    except ValueError:
+        pass
+    digits = normalize_mac(address)
+    if len(digits) == 12 and not re.sub(r"[0-9a-fA-F:.-]", "", address):
+        return "mac", ":".join(re.findall("..", digits))
+    raise ValueError(f"{address!r} is neither a MAC nor an IP address.")
+
+
+def network_clients(client, org_name, dispatcher=None, **filters):
+    """Return the clients of every network of an organization, as a dict of network name to clients.
+
+    The networks are queried concurrently, with ``filters`` such as ``ip`` passed to the network clients endpoint, and
+    the user of ``dispatcher``, when given, is told how many of them are done along the way. Returns the names of the
+    networks that could not be queried as well.
+    """
+    networks = {net["id"]: net["name"] for net in client.get_network_inventory(org_name).entries}
+    results = run_async(
+        lambda aio_client: aio_client.for_each_serial(
+            aio_client.dashboard.networks.getNetworkClients,
+            list(networks),
+            org_id=client.org_name_to_id(org_name),
+            progress=progress_reporter(dispatcher, len(networks), "networks") if dispatcher else None,
+            total_pages=-1,
+            perPage=1000,
+            **filters,
+        )
+    )
+    clients, failed = {}, []
+    for network_id, entries in results.items():
+        if isinstance(entries, Exception):
+            failed.append(networks[network_id])
+        else:
+            clients[networks[network_id]] = entries
+    return clients, failed
+
+
+def locate_client_by_ip(dispatcher, client, org_name, ip_address):
+    """Return the clients of every network of an organization with a given IP address, and the networks not queried.
+
+    The dashboard has no organization-wide search by IP, so the networks are queried concurrently, each filtering
+    its own clients.
+    """
+    clients, failed = network_clients(client, org_name, dispatcher, ip=ip_address)
+    located = [
+        dict(entry, network=network)
+        for network, entries in clients.items()
+        # The filter matches part of the address, so 10.0.0.1 also finds 10.0.0.10.
+        for entry in entries
+        if entry["ip"] == ip_address
+    ]
+    return located, failed
+
+
+@subcommand_of("meraki")
+@instrumented
+def locate_client(dispatcher, org_name=None, address=None):
+    """Find the networks, devices and switch ports a client MAC or IP address was seen on, across an organization."""
+    LOGGER.info("ORG NAME: %s", org_name)
+    LOGGER.info("ADDRESS: %s", address)
+    if not org_name:
+        return prompt_for_organization(dispatcher, "meraki locate-client")
+    if not address:
+        dispatcher.prompt_for_text(f"meraki locate-client '{org_name}'", "Enter a MAC or IP address", "Address")
+        return False
+    try:
+        kind, address = parse_client_address(address)
+    except ValueError as error:
+        dispatcher.send_warning(str(error))
+        return CommandStatusChoices.STATUS_FAILED, str(error)
+    client = get_client()
+    failed = []
+    if kind == "mac":
+        # A single organization-wide request, whatever the number of devices.
+        record = client.search_meraki_client(org_name, address)
+        located = [
+            dict(entry, mac=record["mac"], network=entry["network"]["name"])
+            for entry in (record or {}).get("records", [])
+        ]
+    else:
+        dispatcher.send_markdown(f"Searching the networks of {org_name} for {address}...")
+        located, failed = locate_client_by_ip(dispatcher, client, org_name, address)
+    if failed:
+        dispatcher.send_warning(f"{len(failed)} networks could not be searched: {', '.join(failed)}.")
+    if not located:
+        message = f"There are NO Clients with {kind.upper()} address {address} in {org_name}!"
+        dispatcher.send_markdown(message)
+        return CommandStatusChoices.STATUS_SUCCEEDED, message
+    blocks = [
+        *dispatcher.command_response_header(
+            "meraki",
+            "locate-client",
+            [("Org Name", org_name), ("Address", address)],
+            "Client Locations",
+            meraki_logo(dispatcher),
+        ),
+    ]
+    dispatcher.send_blocks(blocks)
+    table_renderer(dispatcher, CLIENT_LOCATION_COLUMNS, "Client Locations").render(located)
+    return (
+        CommandStatusChoices.STATUS_SUCCEEDED,
+        f"{address} was seen in {len({entry['network'] for entry in located})} networks.",
+    )
+
+
+def load_client_index(org_name):
+    """Return the stored client index of an organization, or None."""
+    data = get_client_index_store().get(("clients", org_name.lower()))
+    return ClientIndex.from_dict(data) if data is not None else None
+
+
+def build_client_index(client, org_name, dispatcher=None):
+    """Index the clients of every network of an organization and store the index for every RQ worker.
+
+    Returns the index, and the names of the networks whose clients could not be listed.
+    """
+    clients, failed = network_clients(client, org_name, dispatcher)
+    if failed:
+        LOGGER.warning("Unable to index the clients of %d networks of %s", len(failed), org_name)
+    index = ClientIndex.from_clients(clients)
+    get_client_index_store().set(("clients", org_name.lower()), index.to_dict())
+    return index, failed
+
+
+@subcommand_of("meraki")
+@instrumented
+def find_client(dispatcher, org_name=None, query=None):
+    """Find the clients whose MAC, IP address or host name starts with a text, from the client index."""
+    LOGGER.info("ORG NAME: %s", org_name)
+    LOGGER.info("QUERY: %s", query)
+    if not org_name:
+        return prompt_for_organization(dispatcher, "meraki find-client")
+    if not query:
+        dispatcher.prompt_for_text(
+            f"meraki find-client '{org_name}'", "Enter the start of a MAC, IP address or host name", "Client"
+        )
+        return False
+    index = load_client_index(org_name)
+    if index is None:
+        dispatcher.send_markdown(f"Indexing the clients of {org_name}, which is only needed once in a while...")
+        index, failed = build_client_index(get_client(), org_name, dispatcher)
+        if failed:
+            dispatcher.send_warning(f"{len(failed)} networks could not be indexed: {', '.join(failed)}.")
+    matches = index.search(query, limit=PLUGIN_SETTINGS.get("client_index_max_results", 1000))
+    if not matches:
+        message = f"There are NO Clients matching {query} in {org_name}!"
+        dispatcher.send_markdown(message)
+        return CommandStatusChoices.STATUS_SUCCEEDED, message
+    blocks = [
+        *dispatcher.command_response_header(
+            "meraki",
+            "find-client",
+            [
+                ("Org Name", org_name),
+                ("Query", query),
+                ("Indexed", f"{len(index)} clients, {math.ceil((time.time() - index.built_at) / 60)} min ago"),
+            ],
+            "Found Clients",
+            meraki_logo(dispatcher),
+        ),
+    ]
+    dispatcher.send_blocks(blocks)
+    table_renderer(dispatcher, CLIENT_INDEX_COLUMNS, "Clients").render(matches)
+    return CommandStatusChoices.STATUS_SUCCEEDED, f"{len(matches)} clients match {query}."
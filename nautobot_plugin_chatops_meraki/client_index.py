@@ -0,0 +1,132 @@
+"""Compact index of the clients of an organization, searchable by the start of their MAC, IP address or host name.
+
+The index is filled from the network clients endpoint (``getNetworkClients``), one paged request per network, rather
+than from the clients of each device: that takes a request per network instead of one per device, and it also lists
+the clients seen only on non-Meraki devices of the network.
+"""
+
+import bisect
+import itertools
+import re
+import sys
+import time
+from array import array
+
+from .inventory import normalize_mac
+
+# Fields of an indexed client, in the order of its row.
+FIELDS = ("mac", "ip", "hostname", "device", "switchport", "vlan", "network")
+# Fields a client is looked up by.
+SEARCH_FIELDS = ("mac", "ip", "hostname")
+
+_MAC_PREFIX = re.compile(r"[0-9a-f]{2}([:.-]?[0-9a-f]{1,2})*$")
+_IPV4_PREFIX = re.compile(r"[0-9]*\.[0-9.]*$")
+
+
+def _text(value):
+    """Return a field as an interned string, so values repeated by thousands of clients are stored once."""
+    return sys.intern(str(value)) if value not in (None, "") else ""
+
+
+def client_row(entry, network):
+    """Return the row of a client listed by the network clients endpoint."""
+    return (
+        normalize_mac(entry.get("mac")),
+        entry.get("ip") or "",
+        entry.get("dhcpHostname") or entry.get("mdnsName") or entry.get("description") or "",
+        _text(entry.get("recentDeviceName") or entry.get("recentDeviceSerial")),
+        _text(entry.get("switchport")),
+        _text(entry.get("vlan")),
+        _text(network),
+    )
+
+
+def _unique(positions):
+    """Lazily yield each position once, so a client matching on several fields is listed once."""
+    seen = set()
+    for position in positions:
+        if position not in seen:
+            seen.add(position)
+            yield position
+
+
+def format_mac(digits):
+    """Return a MAC address stored as 12 hex digits in the usual colon-separated notation."""
+    return ":".join(re.findall("..", digits))
+
+
+class ClientIndex:
+    """Clients of an organization, indexed by MAC, IP address and host name for prefix searches.
+
+    Each client is a tuple of strings, and each searchable field keeps its values in sorted order along with an array
+    of row positions, so a search bisects to the first match and reads the matches in order, whatever the number of
+    clients. The sort orders are serialized with the rows, so loading a stored index does not sort it again.
+    """
+
+    def __init__(self, rows, orders=None, built_at=None):
+        """Class constructor."""
+        self.rows = rows
+        self.built_at = time.time() if built_at is None else built_at
+        self._keys = {}
+        self._positions = {}
+        for field in SEARCH_FIELDS:
+            column = FIELDS.index(field)
+            # MAC and IP addresses are stored in lower case already, so only host names need a lower-case copy.
+            key = str.lower if field == "hostname" else str
+            keys = [key(row[column]) for row in rows]
+            positions = orders[field] if orders is not None else sorted(range(len(rows)), key=keys.__getitem__)
+            self._positions[field] = array("I", positions)
+            self._keys[field] = [keys[position] for position in positions]
+
+    @classmethod
+    def from_clients(cls, clients_by_network):
+        """Build the index of the clients of several networks, given as a dict of network name to clients."""
+        rows = [client_row(entry, network) for network, entries in clients_by_network.items() for entry in entries]
+        return cls(rows)
+
+    def to_dict(self):
+        """Return the index as JSON-serializable data."""
+        return {
+            "built_at": self.built_at,
+            "rows": self.rows,
+            "orders": {field: self._positions[field].tolist() for field in SEARCH_FIELDS},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Load an index serialized by :meth:`to_dict`."""
+        return cls([tuple(row) for row in data["rows"]], orders=data["orders"], built_at=data["built_at"])
+
+    def _search_field(self, field, prefix):
+        """Yield the positions of the rows whose field starts with a prefix, in the field's order."""
+        keys = self._keys[field]
+        for index in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[index].startswith(prefix):
+                break
+            yield self._positions[field][index]
+
+    def search(self, text, limit=None):
+        """Return the clients whose MAC, IP address or host name starts with a text, as dicts of FIELDS.
+
+        MAC addresses match whatever their notation, such as ``00:18:0a`` or ``0018.0a``.
+        """
+        text = text.strip().lower()
+        if not text:
+            return []
+        prefixes = {"ip": text, "hostname": text}
+        if _MAC_PREFIX.match(text) and not _IPV4_PREFIX.match(text):
+            prefixes["mac"] = normalize_mac(text)
+        matches = itertools.chain.from_iterable(
+            self._search_field(field, prefixes[field]) for field in SEARCH_FIELDS if field in prefixes
+        )
+        return [self.client(position) for position in itertools.islice(_unique(matches), limit)]
+
+    def client(self, position):
+        """Return the client of a row as a dict, with its MAC address in the usual notation."""
+        client = dict(zip(FIELDS, self.rows[position]))
+        client["mac"] = format_mac(client["mac"])
+        return client
+
+    def __len__(self):
+        """Return the number of indexed clients."""
+        return len(self.rows)
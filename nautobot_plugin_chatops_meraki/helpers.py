@@ -0,0 +1,318 @@
+"""Dashboard clients, prompts and table output shared by the Meraki subcommands."""
+
+import functools
+import itertools
+import logging
+import math
+import os
+
+import django_rq
+from django.conf import settings
+from meraki import DEFAULT_BASE_URL
+from nautobot_chatops.choices import CommandStatusChoices
+
+from .async_utils import run_with_async_client
+from .cache import RedisCache, TTLCache
+from .inventory import MerakiLookupError
+from .ratelimit import RequestScheduler
+from .rendering import TableRenderer, select_columns
+from .streaming import DEFAULT_CHUNK_SIZE, DEFAULT_FLUSH_INTERVAL, TableStream
+from .utils import get_meraki_client
+
+
+MERAKI_LOGO_PATH = "nautobot_meraki/meraki.png"
+MERAKI_LOGO_ALT = "Meraki Logo"
+
+# Values sent back by the name pickers in place of a name: a page of search results, or a request to search.
+PICKER_PAGE = "page:"
+PICKER_SEARCH = "search:"
+# Longest search text carried in a picker value, as chat platforms limit the length of menu values.
+PICKER_QUERY_MAX_LENGTH = 50
+
+LOGGER = logging.getLogger("nautobot_plugin_chatops_meraki")
+
+PLUGIN_SETTINGS = settings.PLUGINS_CONFIG.get("nautobot_plugin_chatops_meraki", {})
+
+try:
+    MERAKI_DASHBOARD_API_KEY = settings.PLUGINS_CONFIG["nautobot_plugin_chatops_meraki"]["meraki_dashboard_api_key"]
+except KeyError as err:
+    MERAKI_DASHBOARD_API_KEY = os.getenv("MERAKI_DASHBOARD_API_KEY")
+    if not MERAKI_DASHBOARD_API_KEY:
+        raise Exception("Unable to find the Meraki API key.") from err
+
+
+@functools.lru_cache(maxsize=None)
+def get_scheduler():
+    """Return the request scheduler pacing dashboard calls per organization, or None when pacing is disabled."""
+    rate = PLUGIN_SETTINGS.get("rate_limit_per_org", 10)
+    if not rate:
+        return None
+    redis = django_rq.get_connection("default") if PLUGIN_SETTINGS.get("rate_limit_shared", True) else None
+    return RequestScheduler(rate=rate, redis=redis)
+
+
+@functools.lru_cache(maxsize=None)
+def get_shared_cache():
+    """Return the inventory cache shared by every RQ worker through Redis, or None when it is disabled."""
+    ttl = PLUGIN_SETTINGS.get("shared_cache_ttl", 300)
+    if not ttl:
+        return None
+    return RedisCache(django_rq.get_connection("default"), ttl=ttl)
+
+
+@functools.lru_cache(maxsize=None)
+def get_coalescer():
+    """Return the Redis store letting identical requests from several RQ workers share one call, or None."""
+    window = PLUGIN_SETTINGS.get("coalesce_window", 2)
+    if not window:
+        return None
+    return RedisCache(
+        django_rq.get_connection("default"),
+        ttl=window,
+        key_prefix="nautobot_plugin_chatops_meraki:flight:",
+        poll_interval=0.05,
+    )
+
+
+def index_store(ttl, key_prefix):
+    """Return a store of data indexed from the dashboard, in Redis for every RQ worker, or in this process."""
+    if not PLUGIN_SETTINGS.get("shared_cache_ttl", 300):
+        return TTLCache(ttl=ttl, maxsize=64)
+    return RedisCache(django_rq.get_connection("default"), ttl=ttl, key_prefix=key_prefix)
+
+
+@functools.lru_cache(maxsize=None)
+def get_client_index_store():
+    """Return the store of the client indexes."""
+    return index_store(PLUGIN_SETTINGS.get("client_index_ttl", 3600), "nautobot_plugin_chatops_meraki:clients:")
+
+
+@functools.lru_cache(maxsize=None)
+def get_topology_store():
+    """Return the store of the neighbors reported by the devices of each organization."""
+    return index_store(PLUGIN_SETTINGS.get("topology_ttl", 86400), "nautobot_plugin_chatops_meraki:topology:")
+
+
+def get_client():
+    """Return the shared MerakiClient configured from the plugin settings."""
+    return get_meraki_client(
+        MERAKI_DASHBOARD_API_KEY,
+        cache_ttl=PLUGIN_SETTINGS.get("resolution_cache_ttl", 300),
+        cache_maxsize=PLUGIN_SETTINGS.get("resolution_cache_maxsize", 256),
+        scheduler=get_scheduler(),
+        shared_cache=get_shared_cache(),
+        keep_raw=PLUGIN_SETTINGS.get("keep_raw_inventory", False),
+        base_url=PLUGIN_SETTINGS.get("dashboard_base_url", DEFAULT_BASE_URL),
+        coalescer=get_coalescer(),
+    )
+
+
+def run_async(func, *args, **kwargs):
+    """Run ``await func(async_client, *args, **kwargs)`` from a subcommand, sharing the sync client's cache."""
+    return run_with_async_client(
+        MERAKI_DASHBOARD_API_KEY,
+        func,
+        *args,
+        concurrency=PLUGIN_SETTINGS.get("bulk_concurrency", 5),
+        cache=get_client().cache,
+        scheduler=get_scheduler(),
+        base_url=PLUGIN_SETTINGS.get("dashboard_base_url", DEFAULT_BASE_URL),
+        **kwargs,
+    )
+
+
+def progress_reporter(dispatcher, total, noun, steps=4):
+    """Return a callback that tells the user, a few times along the way, how many of ``total`` items are done."""
+    milestones = {math.ceil(total * step / steps) for step in range(1, steps)} - {total}
+
+    def report(done):
+        if done in milestones:
+            dispatcher.send_markdown(f"Collected {done}/{total} {noun}...")
+
+    return report
+
+
+def table_stream(dispatcher, header, title=None):
+    """Return a TableStream sending rows to the user as they are collected, as configured by the plugin settings."""
+    return TableStream(
+        dispatcher,
+        header,
+        title=title,
+        chunk_size=PLUGIN_SETTINGS.get("stream_chunk_size", DEFAULT_CHUNK_SIZE),
+        flush_interval=PLUGIN_SETTINGS.get("stream_flush_interval", DEFAULT_FLUSH_INTERVAL),
+        enabled=PLUGIN_SETTINGS.get("stream_results", True),
+    )
+
+
+def table_renderer(dispatcher, columns, title, selection=None, output=None):
+    """Return a TableRenderer of the selected columns, in the requested output format.
+
+    Raises:
+        ValueError: when the selection names an unknown column, or the output format is unknown.
+    """
+    return TableRenderer(
+        dispatcher,
+        select_columns(columns, selection),
+        title=title,
+        output=(output or "table").lower(),
+        budget=PLUGIN_SETTINGS.get("message_budget", 0),
+    )
+
+
+def format_age(seconds):
+    """Return a short human readable age."""
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}m {int(seconds % 60)}s"
+    return f"{int(seconds // 3600)}h {int(seconds % 3600 // 60)}m"
+
+
+def data_age_args(client, kind, org_name=None, product=None):
+    """Return the command_response_header args showing how old the inventory used for a response is."""
+    age = client.inventory_age(kind, org_name, product)
+    return [] if age is None else [("Data Age", format_age(age))]
+
+
+def prompt_help(text, client, kind, org_name, product=None):
+    """Return prompt help text mentioning how old the inventory behind the menu is."""
+    age = client.inventory_age(kind, org_name, product)
+    return text if age is None else f"{text} (data from {format_age(age)} ago)"
+
+
+def meraki_logo(dispatcher):
+    """Construct an image_element containing the locally hosted Meraki logo."""
+    return dispatcher.image_element(dispatcher.static_url(MERAKI_LOGO_PATH), alt_text=MERAKI_LOGO_ALT)
+
+
+def prompt_for_organization(dispatcher, command):
+    """Prompt the user to select a Meraki Organization."""
+    client = get_client()
+    org_list = client.get_meraki_orgs()
+    dispatcher.prompt_from_menu(command, "Select an Organization", [(org["name"], org["name"]) for org in org_list])
+    return False
+
+
+def picker_value(query, offset):
+    """Return the value a picker sends back to show a page of the names matching a search."""
+    # Chat platforms send menu values back single-quoted, so the search text must not contain any.
+    query = query.replace("'", "")[:PICKER_QUERY_MAX_LENGTH]
+    return f"{PICKER_PAGE}{offset}:{query}"
+
+
+def parse_picker_value(value):
+    """Return the search text and page offset given by a name argument."""
+    if value and value.startswith(PICKER_PAGE):
+        offset, _, query = value.replace(PICKER_PAGE, "", 1).partition(":")
+        return query, int(offset or 0)
+    return value or "", 0
+
+
+def is_picker_value(value):
+    """Return whether a name argument was left out or sent back by a picker, rather than typed as a name."""
+    return not value or value == PICKER_SEARCH or value.startswith(PICKER_PAGE)
+
+
+def prompt_for_name(dispatcher, command, help_text, inventory, value=None):
+    """Prompt the user to select a name from an inventory.
+
+    Small inventories are offered in a single menu. Larger ones are offered a page of names at a time, with
+    previous and next entries and a search entry, so the menu stays the same size whatever the size of the
+    inventory. ``value`` is the argument given in place of a name: a page or search request sent back by a previous
+    prompt, or a search text.
+    """
+    page_size = PLUGIN_SETTINGS.get("picker_page_size", 25)
+    if value == PICKER_SEARCH:
+        dispatcher.prompt_for_text(command, f"{help_text}: enter the beginning or a part of its name", "Name")
+        return False
+    query, offset = parse_picker_value(value)
+    if not query and len(inventory.by_name) <= page_size:
+        names = [entry["name"] for entry in inventory if entry.get("name")]
+        dispatcher.prompt_from_menu(command, help_text, [(name, name) for name in names])
+        return False
+    names = list(itertools.islice(inventory.search(query), offset, offset + page_size + 1))
+    if not names:
+        dispatcher.send_warning(f"Nothing is named like {query!r}.")
+        dispatcher.prompt_for_text(command, f"{help_text}: enter the beginning or a part of its name", "Name")
+        return False
+    choices = [(name, name) for name in names[:page_size]]
+    if offset:
+        choices.insert(0, ("Previous...", picker_value(query, max(0, offset - page_size))))
+    if len(names) > page_size:
+        choices.append(("Next...", picker_value(query, offset + page_size)))
+    choices.append(("Search...", PICKER_SEARCH))
+    matching = f" matching {query!r}" if query else ""
+    dispatcher.prompt_from_menu(
+        command, f"{help_text}{matching} ({offset + 1}-{offset + min(len(names), page_size)})", choices
+    )
+    return False
+
+
+# Dashboard product type of each device type offered to the user.
+DEVICE_TYPE_PRODUCTS = {
+    "aps": "wireless",
+    "cameras": "camera",
+    "firewalls": "appliance",
+    "switches": "switch",
+}
+
+
+def device_selected(org, device_name, dev_type=None):
+    """Return whether a device name argument names a single device of a type, rather than a search or a picker page.
+
+    Names are looked up in the cached inventory, so a search never downloads the inventory again. A name shared by
+    several devices is not a selection, and is reported by :func:`prompt_for_device`.
+    """
+    if is_picker_value(device_name):
+        return False
+    inventory = get_client().get_device_inventory(org, DEVICE_TYPE_PRODUCTS.get(dev_type))
+    return len(inventory.by_name.get(device_name.lower(), [])) == 1
+
+
+def network_selected(org, net_name):
+    """Return whether a network name argument names a network, rather than a search or a picker page."""
+    return not is_picker_value(net_name) and net_name in get_client().get_network_inventory(org)
+
+
+def prompt_for_device(dispatcher, command, org, dev_type=None, query=None):
+    """Prompt the user to select a Meraki device, optionally among those matching a search.
+
+    A search naming several devices fails with a warning listing their serials, as picking the name again would not
+    tell them apart.
+    """
+    client = get_client()
+    product = DEVICE_TYPE_PRODUCTS.get(dev_type)
+    inventory = client.get_device_inventory(org, product)
+    if not is_picker_value(query) and query in inventory:
+        try:
+            inventory.get_by_name(query)
+        except MerakiLookupError as error:
+            dispatcher.send_warning(str(error))
+            return CommandStatusChoices.STATUS_FAILED, str(error)
+    return prompt_for_name(
+        dispatcher,
+        command,
+        prompt_help("Select a Device", client, "devices", org, product),
+        inventory,
+        query,
+    )
+
+
+def prompt_for_network(dispatcher, command, org, query=None):
+    """Prompt the user to select a Network name, optionally among those matching a search."""
+    client = get_client()
+    return prompt_for_name(
+        dispatcher,
+        command,
+        prompt_help("Select a Network", client, "networks", org),
+        client.get_network_inventory(org),
+        query,
+    )
+
+
+def prompt_for_port(dispatcher, command, org, switch_name):
+    """Prompt the user to select a port from a switch."""
+    client = get_client()
+    ports = client.get_meraki_switchports(org, switch_name)
+    dispatcher.prompt_from_menu(command, "Select a Port", [(port["portId"], port["portId"]) for port in ports])
+    return False
@@ -0,0 +1,165 @@
+"""Indexed views over inventory lists returned by the Meraki Dashboard API."""
+
+import bisect
+import re
+
+_MAC_SEPARATORS = re.compile(r"[^0-9a-f]")
+
+# Dashboard product type of the device models, for devices listed without their product type.
+MODEL_PRODUCT_TYPES = (
+    ("MR", "wireless"),
+    ("CW", "wireless"),
+    ("MS", "switch"),
+    ("MX", "appliance"),
+    ("Z", "appliance"),
+    ("MV", "camera"),
+    ("MG", "cellularGateway"),
+    ("MT", "sensor"),
+)
+PRODUCT_TYPES = tuple(dict.fromkeys(product for _, product in MODEL_PRODUCT_TYPES))
+# Shortest search text looked up anywhere in the names, when no name starts with it.
+SUBSTRING_SEARCH_MIN_LENGTH = 3
+
+
+class MerakiLookupError(LookupError):
+    """Base class for failures to resolve an inventory entry."""
+
+
+class NotFoundError(MerakiLookupError, IndexError):
+    """Raised when no inventory entry matches (an IndexError for compatibility with earlier resolvers)."""
+
+
+class AmbiguousNameError(MerakiLookupError):
+    """Raised when a name matches more than one inventory entry."""
+
+    def __init__(self, kind, name, matches):
+        """Class constructor."""
+        self.kind = kind
+        self.name = name
+        self.matches = matches
+        identifiers = ", ".join(str(Inventory.identifier(entry)) for entry in matches)
+        super().__init__(f"{len(matches)} {kind}s are named {name!r} ({identifiers}); use a unique name.")
+
+
+def normalize_mac(mac):
+    """Return a MAC address as lower-case hex digits without separators."""
+    return _MAC_SEPARATORS.sub("", mac.lower()) if mac else ""
+
+
+def product_type(entry):
+    """Return the dashboard product type of a device, derived from its model when the API did not report it."""
+    if entry.get("productType"):
+        return entry["productType"]
+    model = entry.get("model") or ""
+    return next((product for prefix, product in MODEL_PRODUCT_TYPES if model.startswith(prefix)), None)
+
+
+class Inventory:  # pylint: disable=too-many-instance-attributes
+    """Case-insensitive hashed indexes over a list of organizations, networks or devices.
+
+    The indexes are built once per fetched list, so every subsequent lookup by name, serial, ID, MAC, network ID or
+    product type is a dictionary access instead of a scan of the whole list.
+    """
+
+    def __init__(self, entries, kind="device"):
+        """Class constructor."""
+        self.kind = kind
+        self.entries = list(entries)
+        self.by_name = {}
+        self.by_id = {}
+        self.by_mac = {}
+        self.by_network = {}
+        self.by_product_type = {}
+        self._sorted_names = None
+        for entry in self.entries:
+            if entry.get("name"):
+                self.by_name.setdefault(entry["name"].lower(), []).append(entry)
+            identifier = self.identifier(entry)
+            if identifier:
+                self.by_id[identifier.lower()] = entry
+            if entry.get("mac"):
+                self.by_mac[normalize_mac(entry["mac"])] = entry
+            if entry.get("networkId"):
+                self.by_network.setdefault(entry["networkId"], []).append(entry)
+            if entry.get("serial"):
+                self.by_product_type.setdefault(product_type(entry), []).append(entry)
+
+    @staticmethod
+    def identifier(entry):
+        """Return the serial of a device, or the ID of an organization or network."""
+        return entry.get("serial") or entry.get("id")
+
+    def get_by_name(self, name):
+        """Return the single entry with the given name."""
+        matches = self.by_name.get(name.lower(), [])
+        if not matches:
+            raise NotFoundError(f"No {self.kind} named {name!r} was found.")
+        if len(matches) > 1:
+            raise AmbiguousNameError(self.kind, name, matches)
+        return matches[0]
+
+    def get_by_id(self, identifier):
+        """Return the entry with the given serial or ID."""
+        try:
+            return self.by_id[identifier.lower()]
+        except KeyError:
+            raise NotFoundError(f"No {self.kind} with identifier {identifier!r} was found.") from None
+
+    def get_by_mac(self, mac):
+        """Return the entry with the given MAC address, whatever its formatting."""
+        try:
+            return self.by_mac[normalize_mac(mac)]
+        except KeyError:
+            raise NotFoundError(f"No {self.kind} with MAC address {mac!r} was found.") from None
+
+    def in_network(self, network_id):
+        """Return the entries that belong to a network."""
+        return self.by_network.get(network_id, [])
+
+    def of_type(self, product):
+        """Return the devices of a dashboard product type (``switch``, ``wireless``, ``appliance``...)."""
+        return self.by_product_type.get(product, [])
+
+    @property
+    def sorted_names(self):
+        """Return the lower-case names in alphabetical order, sorted on first use."""
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self.by_name)
+        return self._sorted_names
+
+    def search(self, text):
+        """Lazily yield the names matching a search text, as the API spells them.
+
+        Names starting with the text are yielded in alphabetical order, found by bisecting the sorted names so a page
+        of them costs the same whatever the size of the inventory. Only when no name starts with the text, and it has
+        at least ``SUBSTRING_SEARCH_MIN_LENGTH`` characters, are the names containing it looked up, with a scan of
+        every name.
+        """
+        text = text.lower()
+        names = self.sorted_names
+        start = bisect.bisect_left(names, text)
+        if start < len(names) and names[start].startswith(text):
+            for index in range(start, len(names)):
+                if not names[index].startswith(text):
+                    break
+                yield self.by_name[names[index]][0]["name"]
+        elif len(text) >= SUBSTRING_SEARCH_MIN_LENGTH:
+            for name in names:
+                if text in name:
+                    yield self.by_name[name][0]["name"]
+
+    def duplicates(self):
+        """Return the names shared by more than one entry, mapped to those entries."""
+        return {name: matches for name, matches in self.by_name.items() if len(matches) > 1}
+
+    def __contains__(self, name):
+        """Return whether an entry has the given name."""
+        return name.lower() in self.by_name
+
+    def __iter__(self):
+        """Iterate over the entries in the order the API returned them."""
+        return iter(self.entries)
+
+    def __len__(self):
+        """Return the number of entries."""
+        return len(self.entries)
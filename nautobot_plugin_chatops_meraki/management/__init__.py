@@ -0,0 +1 @@
+"""Management commands for nautobot_plugin_chatops_meraki."""
@@ -0,0 +1,54 @@
+"""Benchmark the Meraki subcommands against a local mock Meraki Dashboard."""
+import json
+
+from django.core.management.base import BaseCommand
+
+from nautobot_plugin_chatops_meraki.benchmark.harness import format_report, run_benchmark, unbenchmarked_subcommands
+
+
+class Command(BaseCommand):
+    """Report API calls, latency percentiles, peak memory and table size of each subcommand at several scales."""
+
+    help = "Benchmark the Meraki subcommands against a local mock Meraki Dashboard."
+
+    def add_arguments(self, parser):
+        """Add the benchmark options."""
+        parser.add_argument(
+            "--devices",
+            type=int,
+            nargs="+",
+            default=[100, 10000, 100000],
+            help="Inventory sizes to benchmark (default: 100 10000 100000).",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Runs reusing a warm client per scenario.")
+        parser.add_argument("--latency", type=float, default=0.0, help="Mean latency added to each request, in ms.")
+        parser.add_argument("--throttle", type=float, default=0.0, help="Share of requests answered with HTTP 429.")
+        parser.add_argument("--rate", type=int, default=10, help="Requests per second paced per organization.")
+        parser.add_argument("--only", nargs="+", help="Only run these scenarios or subcommands.")
+        parser.add_argument("--json", dest="json_path", help="Also write the raw results to this JSON file.")
+
+    def handle(self, *args, **options):
+        """Run the benchmark at every requested scale and print the report."""
+        results = []
+        for devices in options["devices"]:
+            self.stdout.write(f"Benchmarking {devices} devices...")
+            results.extend(
+                run_benchmark(
+                    devices=devices,
+                    repeat=options["repeat"],
+                    latency=options["latency"] / 1000,
+                    throttle_ratio=options["throttle"],
+                    rate_limit_per_org=options["rate"],
+                    only=options["only"],
+                )
+            )
+        self.stdout.write(format_report(results))
+        for result in results:
+            for error in sorted(set(result["errors"])):
+                self.stderr.write(f"{result['scenario']} ({result['devices']} devices): {error}")
+        missing = unbenchmarked_subcommands()
+        if missing:
+            self.stderr.write(f"Subcommands without a benchmark scenario: {', '.join(missing)}")
+        if options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as report:
+                json.dump(results, report, indent=2)
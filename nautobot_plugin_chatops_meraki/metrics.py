@@ -0,0 +1,255 @@
+"""Per-command accounting of Meraki Dashboard API calls and timings, exported as Prometheus metrics.
+
+The metrics are registered in the default ``prometheus_client`` registry and therefore served by Nautobot's
+``/metrics`` endpoint. Subcommands run in RQ worker processes, so ``PROMETHEUS_MULTIPROC_DIR`` must be set for the
+web process to report them (as Nautobot already requires for its own multi-process metrics).
+"""
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import time
+from collections import Counter
+
+from prometheus_client import Counter as PrometheusCounter, Histogram
+
+from .cache import fetch_context
+
+API_CALLS = PrometheusCounter(
+    "nautobot_meraki_api_calls_total",
+    "Meraki Dashboard API requests, by chat command, organization, endpoint and outcome.",
+    ["command", "org", "endpoint", "outcome"],
+)
+API_CALL_SECONDS = Histogram(
+    "nautobot_meraki_api_call_seconds",
+    "Duration of Meraki Dashboard API requests, rate limiter wait excluded.",
+    ["command", "endpoint"],
+)
+SPAN_SECONDS = Histogram(
+    "nautobot_meraki_span_seconds",
+    "Time spent by chat commands resolving names, waiting for the rate limiter, querying and rendering.",
+    ["command", "org", "span"],
+)
+SHARED_CALLS = PrometheusCounter(
+    "nautobot_meraki_shared_calls_total",
+    "Dashboard API requests answered by an identical request already in flight, by chat command and endpoint.",
+    ["command", "endpoint"],
+)
+FIRST_ROW_SECONDS = Histogram(
+    "nautobot_meraki_first_row_seconds",
+    "Time from the start of Meraki chat commands to the first table rows sent to the user.",
+    ["command", "org"],
+)
+COMMAND_SECONDS = Histogram(
+    "nautobot_meraki_command_seconds",
+    "Duration of Meraki chat commands.",
+    ["command", "org"],
+)
+
+# Maximum length of the details stored with a command result.
+DETAILS_MAX_LENGTH = 255
+# Organization label of the commands naming an organization that is not in the organization list.
+UNKNOWN_ORG = "unknown"
+
+_CURRENT = contextvars.ContextVar("nautobot_plugin_chatops_meraki_command", default=None)
+_SPAN = contextvars.ContextVar("nautobot_plugin_chatops_meraki_span", default=None)
+# Names of the organizations listed by the dashboard, by lower-case name: the only values of the organization label.
+_ORG_NAMES = {}
+
+
+def register_orgs(orgs):
+    """Record the organizations listed by the dashboard, so commands naming them are labelled with their name."""
+    _ORG_NAMES.update((org["name"].lower(), org["name"]) for org in orgs if org.get("name"))
+
+
+def org_label(org_name):
+    """Return the organization label of a command given the organization typed in the chat.
+
+    Only names found in the organization list are used as labels, so arbitrary input cannot create new time series.
+    """
+    if not org_name:
+        return ""
+    return _ORG_NAMES.get(org_name.lower(), UNKNOWN_ORG)
+
+
+class CommandMetrics:  # pylint: disable=too-many-instance-attributes
+    """API calls and span timings accumulated while a single chat command runs."""
+
+    def __init__(self, command, org=""):
+        """Class constructor."""
+        self.command = command
+        self.org_name = org or ""
+        self.calls = Counter()
+        self.errors = 0
+        self.shared = 0
+        self.spans = Counter()
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.first_row = None
+
+    @property
+    def org(self):
+        """Return the organization label, resolved when it is used as the organization list may load meanwhile."""
+        return org_label(self.org_name)
+
+    def add_span(self, name, seconds):
+        """Account for time spent in a top-level span."""
+        self.spans[name] += seconds
+        SPAN_SECONDS.labels(self.command, self.org, name).observe(seconds)
+
+    def mark_first_row(self):
+        """Record the time to the first table rows sent, the first time any are."""
+        if self.first_row is None:
+            self.first_row = time.perf_counter() - self.started
+            FIRST_ROW_SECONDS.labels(self.command, self.org).observe(self.first_row)
+
+    def summary(self):
+        """Return a one-line summary of the API calls made and where the time went."""
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+        calls = sum(self.calls.values())
+        text = f"{calls} API call{'' if calls == 1 else 's'}"
+        if calls:
+            text += " (" + ", ".join(f"{endpoint} {count}" for endpoint, count in self.calls.most_common()) + ")"
+        if self.shared:
+            text += f", {self.shared} shared"
+        if self.errors:
+            text += f", {self.errors} failed"
+        text += f" in {elapsed:.2f}s"
+        if self.first_row is not None:
+            text += f", first rows after {self.first_row:.2f}s"
+        if self.spans:
+            text += ": " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.spans.most_common())
+        return text
+
+
+def current():
+    """Return the CommandMetrics of the running command, or None."""
+    return _CURRENT.get()
+
+
+@contextlib.contextmanager
+def command_metrics(command, org=""):
+    """Account every API call and span made within the block to a command."""
+    metrics = CommandMetrics(command, org)
+    token = _CURRENT.set(metrics)
+    try:
+        yield metrics
+    finally:
+        metrics.elapsed = time.perf_counter() - metrics.started
+        COMMAND_SECONDS.labels(metrics.command, metrics.org).observe(metrics.elapsed)
+        _CURRENT.reset(token)
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time a block of a command; spans nested in another span are accounted to the outermost one."""
+    if _SPAN.get() is not None:
+        yield
+        return
+    token = _SPAN.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _SPAN.reset(token)
+        metrics = current()
+        if metrics is not None:
+            metrics.add_span(name, time.perf_counter() - start)
+
+
+def _labels():
+    """Return the command and organization labels of the running command."""
+    metrics = current()
+    return ("", "") if metrics is None else (metrics.command, metrics.org)
+
+
+@contextlib.contextmanager
+def api_call(endpoint):
+    """Count and time a Dashboard API request; outside any span, its time is accounted as ``query``."""
+    command, org = _labels()
+    outcome = "error"
+    with span("query"):
+        start = time.perf_counter()
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            API_CALL_SECONDS.labels(command, endpoint).observe(time.perf_counter() - start)
+            API_CALLS.labels(command, org, endpoint, outcome).inc()
+            metrics = current()
+            if metrics is not None:
+                metrics.calls[endpoint] += 1
+                metrics.errors += outcome == "error"
+
+
+def shared_call(endpoint):
+    """Count a request answered by an identical request already in flight."""
+    command, _ = _labels()
+    SHARED_CALLS.labels(command, endpoint).inc()
+    metrics = current()
+    if metrics is not None:
+        metrics.shared += 1
+
+
+def endpoint_name(method):
+    """Return the operation name of a Dashboard SDK method."""
+    return getattr(method, "__name__", "unknown")
+
+
+class TimedDispatcher:
+    """Dispatcher proxy accounting the time spent rendering and sending tables to the ``render`` span.
+
+    The time to the first table sent is recorded as well, as that is when the user first sees any results.
+    """
+
+    def __init__(self, dispatcher):
+        """Class constructor."""
+        self._dispatcher = dispatcher
+
+    def send_large_table(self, *args, **kwargs):
+        """Render and send a table."""
+        with span("render"):
+            result = self._dispatcher.send_large_table(*args, **kwargs)
+        metrics = current()
+        if metrics is not None:
+            metrics.mark_first_row()
+        return result
+
+    def __getattr__(self, name):
+        """Delegate everything else to the wrapped dispatcher."""
+        return getattr(self._dispatcher, name)
+
+
+def with_summary(result, summary):
+    """Return a subcommand result carrying the metrics summary in its details."""
+    if result is False or result is None:
+        return result
+    if isinstance(result, (list, tuple)):
+        status, details = result[:2]
+        details = f"{details} ({summary})" if details else summary
+    else:
+        status, details = result, summary
+    return status, details[:DETAILS_MAX_LENGTH]
+
+
+def instrumented(func):
+    """Account the API calls and timings of a subcommand and attach their summary to its result.
+
+    The subcommand runs in a fetch context, so the handler and the prompt helpers it calls share whatever they
+    fetch and no dashboard data is requested twice by one invocation. Apply it below ``@subcommand_of`` so the
+    command registry still sees the handler's own signature.
+    """
+    command = func.__name__.replace("_", "-")
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(dispatcher, *args, **kwargs):
+        org = signature.bind_partial(dispatcher, *args, **kwargs).arguments.get("org_name") or ""
+        with command_metrics(command, org) as metrics, fetch_context():
+            result = func(TimedDispatcher(dispatcher), *args, **kwargs)
+        if not metrics.calls and not metrics.shared:
+            return result
+        return with_summary(result, metrics.summary())
+
+    return wrapper
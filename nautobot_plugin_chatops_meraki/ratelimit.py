@@ -0,0 +1,133 @@
+"""Client-side pacing of Meraki Dashboard API requests."""
+
+import asyncio
+import threading
+import time
+
+# The dashboard allows about 10 requests per second per organization.
+DEFAULT_RATE = 10
+
+# Atomically refill the bucket from the Redis server clock, reserve one token and return the wait in microseconds.
+_RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000000 + tonumber(now_parts[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = tonumber(state[1]) or capacity
+local stamp = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - stamp) * rate / 1000000) - 1
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'stamp', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+if tokens >= 0 then
+    return 0
+end
+return math.ceil(-tokens * 1000000 / rate)
+"""
+
+
+class TokenBucket:  # pylint: disable=too-few-public-methods
+    """Thread-safe token bucket for a single organization.
+
+    Callers reserve a token ahead of time and are told how long to wait before sending, so concurrent requests are
+    spread out at ``rate`` per second instead of bursting into HTTP 429 responses.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=None, timer=time.monotonic):
+        """Class constructor."""
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._timer = timer
+        self._tokens = self.capacity
+        self._stamp = timer()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Reserve the next token and return how many seconds the caller must wait before using it."""
+        with self._lock:
+            now = self._timer()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate) - 1
+            self._stamp = now
+            return max(0.0, -self._tokens / self.rate)
+
+
+class RedisTokenBucket:  # pylint: disable=too-few-public-methods
+    """Token bucket for a single organization whose state lives in Redis, shared by every RQ worker."""
+
+    def __init__(self, redis, key, rate=DEFAULT_RATE, capacity=None):
+        """Class constructor."""
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.key = key
+        self._script = redis.register_script(_RESERVE_SCRIPT)
+
+    def reserve(self):
+        """Reserve the next token and return how many seconds the caller must wait before using it."""
+        return int(self._script(keys=[self.key], args=[self.rate, self.capacity])) / 1000000
+
+
+class RequestScheduler:
+    """Per-organization request pacing shared by every thread of a process, or every worker through Redis.
+
+    ``stats`` reports the number of requests currently waiting for their slot (``queue_depth``) and the wait time
+    accumulated so far.
+    """
+
+    def __init__(
+        self, rate=DEFAULT_RATE, capacity=None, redis=None, key_prefix="nautobot_plugin_chatops_meraki:ratelimit:"
+    ):  # pylint: disable=too-many-arguments
+        """Class constructor."""
+        self.rate = rate
+        self.capacity = capacity
+        self.redis = redis
+        self.key_prefix = key_prefix
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "delayed": 0, "queue_depth": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    def bucket(self, org_id):
+        """Return the token bucket of an organization."""
+        with self._lock:
+            if org_id not in self._buckets:
+                if self.redis is not None:
+                    self._buckets[org_id] = RedisTokenBucket(
+                        self.redis, f"{self.key_prefix}{org_id}", rate=self.rate, capacity=self.capacity
+                    )
+                else:
+                    self._buckets[org_id] = TokenBucket(rate=self.rate, capacity=self.capacity)
+            return self._buckets[org_id]
+
+    def _reserve(self, org_id):
+        """Reserve a slot for an organization and account for the wait."""
+        wait = self.bucket(org_id).reserve()
+        with self._lock:
+            self.stats["requests"] += 1
+            if wait:
+                self.stats["delayed"] += 1
+                self.stats["queue_depth"] += 1
+                self.stats["total_wait"] += wait
+                self.stats["max_wait"] = max(self.stats["max_wait"], wait)
+        return wait
+
+    def _release(self):
+        """Account for a delayed request leaving the queue."""
+        with self._lock:
+            self.stats["queue_depth"] -= 1
+
+    def acquire(self, org_id):
+        """Block until the organization's budget allows one more request."""
+        wait = self._reserve(org_id)
+        if wait:
+            try:
+                time.sleep(wait)
+            finally:
+                self._release()
+
+    async def acquire_async(self, org_id):
+        """Wait, without blocking the event loop, until the organization's budget allows one more request."""
+        wait = self._reserve(org_id)
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._release()
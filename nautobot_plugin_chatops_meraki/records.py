@@ -0,0 +1,133 @@
+"""Compact records for the inventory returned by the Meraki Dashboard API."""
+
+
+class Record:
+    """Slotted record keeping only the fields of an API response the plugin uses.
+
+    ``FIELDS`` pairs each attribute with the key of the API response it is read from. Records can also be read like
+    the original dict (``device["name"]``, ``device.get("tags")``), so code written against the raw API responses
+    keeps working. The full response is only kept, as ``raw``, when requested.
+    """
+
+    FIELDS = ()
+    _ATTRS = {}
+    __slots__ = ("raw",)
+
+    def __init__(self, *values, raw=None):
+        """Class constructor, taking the field values in ``FIELDS`` order."""
+        values += (None,) * (len(self.FIELDS) - len(values))
+        for (attr, _), value in zip(self.FIELDS, values):
+            setattr(self, attr, value)
+        self.raw = raw
+
+    def __init_subclass__(cls, **kwargs):
+        """Index the fields of a record type by API key."""
+        super().__init_subclass__(**kwargs)
+        cls._ATTRS = {key: attr for attr, key in cls.FIELDS}
+
+    @classmethod
+    def from_api(cls, data, keep_raw=False):
+        """Build a record from an API response dict."""
+        if isinstance(data, cls):
+            return data
+        return cls(*(data.get(key) for _, key in cls.FIELDS), raw=data if keep_raw else None)
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a record from the compact row produced by :meth:`to_row`."""
+        return cls(*row)
+
+    def to_row(self):
+        """Return the field values as a list, the compact form used to serialize records."""
+        return [getattr(self, attr) for attr, _ in self.FIELDS]
+
+    def to_dict(self):
+        """Return the raw API response when it was kept, or a dict of the kept fields otherwise."""
+        if self.raw is not None:
+            return self.raw
+        return {key: getattr(self, attr) for attr, key in self.FIELDS}
+
+    def __getitem__(self, key):
+        """Return a field by its API key, falling back to the raw response when it was kept."""
+        attr = self._ATTRS.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        if self.raw is not None:
+            return self.raw[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        """Return a field by its API key, or ``default``."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        """Compare records by type and field values."""
+        return type(self) is type(other) and self.to_row() == other.to_row()
+
+    def __repr__(self):
+        """Return a readable representation."""
+        fields = ", ".join(f"{attr}={getattr(self, attr)!r}" for attr, _ in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class Organization(Record):
+    """Meraki organization."""
+
+    FIELDS = (("id", "id"), ("name", "name"))
+    __slots__ = tuple(attr for attr, _ in FIELDS)
+
+
+class Network(Record):
+    """Meraki network."""
+
+    FIELDS = (
+        ("id", "id"),
+        ("name", "name"),
+        ("organization_id", "organizationId"),
+        ("product_types", "productTypes"),
+        ("tags", "tags"),
+        ("notes", "notes"),
+    )
+    __slots__ = tuple(attr for attr, _ in FIELDS)
+
+
+class Device(Record):
+    """Meraki device."""
+
+    FIELDS = (
+        ("serial", "serial"),
+        ("name", "name"),
+        ("mac", "mac"),
+        ("model", "model"),
+        ("network_id", "networkId"),
+        ("product_type", "productType"),
+        ("tags", "tags"),
+        ("lan_ip", "lanIp"),
+    )
+    __slots__ = tuple(attr for attr, _ in FIELDS)
+
+
+class SwitchPort(Record):
+    """Configuration of a switch port."""
+
+    FIELDS = (
+        ("port_id", "portId"),
+        ("name", "name"),
+        ("tags", "tags"),
+        ("enabled", "enabled"),
+        ("poe_enabled", "poeEnabled"),
+        ("type", "type"),
+        ("vlan", "vlan"),
+        ("voice_vlan", "voiceVlan"),
+        ("allowed_vlans", "allowedVlans"),
+        ("isolation_enabled", "isolationEnabled"),
+        ("rstp_enabled", "rstpEnabled"),
+        ("stp_guard", "stpGuard"),
+        ("link_negotiation", "linkNegotiation"),
+        ("port_schedule_id", "portScheduleId"),
+        ("udld", "udld"),
+    )
+    __slots__ = tuple(attr for attr, _ in FIELDS)
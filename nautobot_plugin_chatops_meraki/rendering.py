@@ -0,0 +1,153 @@
+"""Size-bounded rendering of API results as chat tables, or as CSV or JSON attachments."""
+
+import csv
+import io
+import json
+from collections import namedtuple
+
+# A table column: its title, and the function formatting its cell from an API entry.
+Column = namedtuple("Column", ["title", "cell"])
+
+OUTPUT_FORMATS = ("table", "csv", "json")
+
+# Largest message, in characters, each chat platform accepts for a table or snippet. Slack uploads snippets as files.
+MESSAGE_BUDGETS = {
+    "slack": 500000,
+    "mattermost": 16383,
+    "microsoft_teams": 25000,
+    "webex": 7439,
+}
+DEFAULT_MESSAGE_BUDGET = 7439
+
+
+def column_key(column):
+    """Return the name a user selects a column by, e.g. ``voice-vlan`` for "Voice VLAN"."""
+    return column.title.lower().replace(" ", "-")
+
+
+def select_columns(columns, selection=None):
+    """Return the columns named in a comma-separated selection, in the order given, or every column.
+
+    Raises:
+        ValueError: when the selection names an unknown column.
+    """
+    if not selection or selection.lower() == "all":
+        return list(columns)
+    by_key = {column_key(column): column for column in columns}
+    keys = [key.strip().lower() for key in selection.split(",") if key.strip()]
+    unknown = [key for key in keys if key not in by_key]
+    if unknown:
+        raise ValueError(
+            f"Unknown column{'s' if len(unknown) > 1 else ''} {', '.join(unknown)}; "
+            f"choose among {', '.join(by_key)}."
+        )
+    return [by_key[key] for key in keys]
+
+
+def message_budget(dispatcher, budget=None):
+    """Return the largest message, in characters, to send to the dispatcher's platform."""
+    if budget:
+        return budget
+    return MESSAGE_BUDGETS.get(getattr(dispatcher, "platform_slug", None), DEFAULT_MESSAGE_BUDGET)
+
+
+def _cell_size(value):
+    """Return the width and height of a cell drawn as text."""
+    lines = str(value).split("\n")
+    return max(len(line) for line in lines), len(lines)
+
+
+class TableRenderer:  # pylint: disable=too-many-instance-attributes
+    """Render API entries as pages of a table, or as CSV or JSON, without exceeding a message size budget.
+
+    Rows are built one at a time from the entries, formatting only the selected columns, and each page is sent as
+    soon as the next row would take it over ``budget`` characters. Table pages are measured as drawn with one
+    padded column per field, so the estimate holds for the texttable drawing of the dispatchers.
+    """
+
+    def __init__(self, dispatcher, columns, title=None, output="table", budget=None):
+        """Class constructor."""
+        if output not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {output}; choose among {', '.join(OUTPUT_FORMATS)}.")
+        self.dispatcher = dispatcher
+        self.columns = columns
+        self.header = [column.title for column in columns]
+        self.title = title
+        self.output = output
+        self.budget = message_budget(dispatcher, budget)
+        self.count = 0
+        self.pages = 0
+
+    def rows(self, entries):
+        """Lazily yield the cells of the selected columns for each entry."""
+        for entry in entries:
+            yield tuple(column.cell(entry) for column in self.columns)
+
+    def render(self, entries):
+        """Send the entries, page by page, and return the number of rows sent."""
+        render = {"table": self._render_table, "csv": self._render_csv, "json": self._render_json}[self.output]
+        render(self.rows(entries))
+        return self.count
+
+    def _page_title(self, suffix=""):
+        """Return the title of the next page."""
+        title = f"{self.title or 'Results'}{suffix}"
+        return title if not self.pages else f"{title} (page {self.pages + 1})"
+
+    def _render_table(self, rows):
+        widths = [len(title) for title in self.header]
+        page, height = [], 2
+        for row in rows:
+            sizes = [_cell_size(value) for value in row]
+            row_widths = [max(width, size[0]) for width, size in zip(widths, sizes)]
+            row_height = max((size[1] for size in sizes), default=1)
+            if page and (height + row_height) * (sum(row_widths) + 3 * len(row_widths)) > self.budget:
+                self._send_table(page)
+                page, height, row_widths = [], 2, [max(len(title), size[0]) for title, size in zip(self.header, sizes)]
+            page.append(row)
+            widths, height = row_widths, height + row_height
+        if page or not self.pages:
+            self._send_table(page)
+
+    def _send_table(self, page):
+        self.dispatcher.send_large_table(self.header, page, title=self._page_title())
+        self.count += len(page)
+        self.pages += 1
+
+    def _render_lines(self, header, lines, suffix):
+        """Send text lines as snippets of at most ``budget`` characters, each starting with ``header`` if given."""
+        chunk = [header] if header else []
+        size = len(header or "")
+        rows = 0
+        for line in lines:
+            if rows and size + len(line) + 1 > self.budget:
+                self._send_snippet(chunk, rows, suffix)
+                chunk, size, rows = [header] if header else [], len(header or ""), 0
+            chunk.append(line)
+            size += len(line) + 1
+            rows += 1
+        if rows or not self.pages:
+            self._send_snippet(chunk, rows, suffix)
+
+    def _send_snippet(self, lines, rows, suffix):
+        self.dispatcher.send_snippet("\n".join(lines), title=self._page_title(suffix))
+        self.count += rows
+        self.pages += 1
+
+    def _render_csv(self, rows):
+        def lines():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="")
+            for row in rows:
+                writer.writerow(row)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        header = io.StringIO()
+        csv.writer(header, lineterminator="").writerow(self.header)
+        self._render_lines(header.getvalue(), lines(), ".csv")
+
+    def _render_json(self, rows):
+        # JSON Lines, so every snippet of a split result is valid on its own.
+        self._render_lines(None, (json.dumps(dict(zip(self.header, row)), default=str) for row in rows), ".jsonl")
@@ -0,0 +1,93 @@
+"""Tables sent to the chat a chunk at a time, while the rows are still being collected."""
+
+import time
+
+# Default number of rows per message of a streamed table.
+DEFAULT_CHUNK_SIZE = 500
+# Default number of seconds between two messages of a streamed table.
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+
+class TableStream:  # pylint: disable=too-many-instance-attributes
+    """Table whose rows are sent as they are collected, so long queries show their first results early.
+
+    Rows are sent as soon as the first batch of them is complete, then whenever ``chunk_size`` rows are pending or a
+    batch completes ``flush_interval`` seconds after the previous message. Producers call :meth:`batch_done` at
+    natural boundaries (a page, a device), so a message never ends in the middle of one. Each message is a table of
+    its own, titled with the range of rows it holds. With ``enabled`` set to False, rows are kept until the stream is
+    closed and sent as one table, as if no streaming took place.
+
+    Use it as a context manager, so the remaining rows are sent when the block exits::
+
+        with TableStream(dispatcher, ["Switch", "Port"], title="Switch ports") as stream:
+            for page in pages:
+                stream.extend(rows(page))
+                stream.batch_done()
+    """
+
+    def __init__(
+        self,
+        dispatcher,
+        header,
+        title=None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+        enabled=True,
+    ):  # pylint: disable=too-many-arguments
+        """Class constructor."""
+        self.dispatcher = dispatcher
+        self.header = header
+        self.title = title
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self.count = 0
+        self.chunks = 0
+        self._pending = []
+        self._sent = 0
+        self._last_flush = None
+
+    def add(self, row):
+        """Add a row to the table."""
+        self._pending.append(row)
+        self.count += 1
+        if self.enabled and len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def extend(self, rows):
+        """Add several rows to the table."""
+        for row in rows:
+            self.add(row)
+
+    def batch_done(self):
+        """Send the pending rows if they are the first ones, or if the previous message is old enough."""
+        if not self.enabled or not self._pending:
+            return
+        if self._last_flush is None or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self, last=False):
+        """Send the pending rows now; ``last`` tells they end the table."""
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        title = self.title
+        # A table sent in a single message keeps its plain title.
+        if self.chunks or not last:
+            title = f"{self.title or 'Rows'} {self._sent + 1}-{self._sent + len(rows)}"
+        self.dispatcher.send_large_table(self.header, rows, title=title)
+        self._sent += len(rows)
+        self.chunks += 1
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Send the remaining rows."""
+        self.flush(last=True)
+
+    def __enter__(self):
+        """Start collecting rows."""
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        """Send the rows collected so far, even when collecting them failed."""
+        self.close()
@@ -0,0 +1,89 @@
+"""Test of async_utils.py."""
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from ..async_utils import AsyncMerakiClient, run_sync, run_with_async_client
+from ..cache import TTLCache
+
+DEVICES = [
+    {"name": "sw01-test", "serial": "SN987654", "model": "MS220-8P"},
+    {"name": "sw02-test", "serial": "SN123456", "model": "MS220-8P"},
+]
+
+
+class TestAsyncMerakiClient(unittest.TestCase):
+    """Test the asynchronous Meraki client."""
+
+    @patch("nautobot_plugin_chatops_meraki.async_utils.meraki.aio.AsyncDashboardAPI")
+    def test_for_each_device_concurrent(self, mock_api):
+        """Test per-device queries are fanned out concurrently within the concurrency limit."""
+        dashboard = mock_api.return_value
+        dashboard.__aexit__ = AsyncMock()
+        dashboard.organizations.getOrganizations = AsyncMock(return_value=[{"id": "123456", "name": "NTC-TEST"}])
+        dashboard.organizations.getOrganizationDevices = AsyncMock(return_value=DEVICES)
+        in_flight = {"now": 0, "max": 0}
+
+        async def statuses(serial):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            return [{"portId": "1", "serial": serial}]
+
+        dashboard.switch.getDeviceSwitchPortsStatuses = statuses
+
+        async def query(client):
+            return await client.for_each_device(
+                client.get_meraki_switchports_status, "NTC-TEST", ["sw01-test", "sw02-test", "sw03-test"]
+            )
+
+        cache = TTLCache()
+        results = run_with_async_client("1234567890", query, concurrency=2, cache=cache)
+        assert results["sw01-test"] == [{"portId": "1", "serial": "SN987654"}]
+        assert results["sw02-test"] == [{"portId": "1", "serial": "SN123456"}]
+        assert isinstance(results["sw03-test"], IndexError)
+        assert in_flight["max"] == 2
+        assert ("devices", "ntc-test") in cache
+        dashboard.organizations.getOrganizations.assert_awaited_once()
+        dashboard.organizations.getOrganizationDevices.assert_awaited_once()
+        dashboard.__aexit__.assert_awaited_once()
+
+    @patch("nautobot_plugin_chatops_meraki.async_utils.meraki.aio.AsyncDashboardAPI")
+    def test_for_each_serial_args(self, mock_api):  # pylint: disable=no-self-use
+        """Test each serial can be called with arguments of its own, and a failing call does not abort the others."""
+        dashboard = mock_api.return_value
+        dashboard.__aexit__ = AsyncMock()
+
+        async def cycle(serial, ports):
+            if serial == "SN000000":
+                raise ValueError("unknown serial")
+            return {"serial": serial, "ports": ports}
+
+        async def query(client):
+            return await client.for_each_serial(
+                cycle,
+                ["SN987654", "SN123456", "SN000000"],
+                org_id="123456",
+                serial_args={"SN987654": (["1", "2"],), "SN123456": (["48"],), "SN000000": (["1"],)},
+            )
+
+        results = run_with_async_client("1234567890", query)
+        assert results["SN987654"] == {"serial": "SN987654", "ports": ["1", "2"]}
+        assert results["SN123456"] == {"serial": "SN123456", "ports": ["48"]}
+        assert isinstance(results["SN000000"], ValueError)
+
+    def test_run_sync_inside_running_loop(self):
+        """Test the sync bridge also works when called from a thread that already runs an event loop."""
+
+        async def answer():
+            return 42
+
+        async def outer():
+            return run_sync(answer())
+
+        assert asyncio.run(outer()) == 42
+
+    def test_client_requires_context_manager(self):
+        """Test the dashboard session is only created once the client is entered."""
+        assert AsyncMerakiClient(api_key="1234567890").dashboard is None
@@ -0,0 +1,202 @@
+"""Test of the benchmark harness."""
+import unittest
+from collections import Counter
+
+import meraki
+
+from .. import helpers, topology_commands
+from ..async_utils import run_with_async_client
+from ..benchmark.harness import SCENARIOS, benchmark_settings, percentile, run_benchmark, unbenchmarked_subcommands
+from ..benchmark.mock_dashboard import DashboardData, MockDashboard
+from ..records import SwitchPort
+from ..utils import MerakiClient
+
+# Dashboard requests each scenario sends when every cache is empty, prompts included.
+CALL_BUDGETS = {
+    "get-organizations": 1,
+    "get-admins": 2,
+    "get-devices": 2,
+    "get-networks": 2,
+    "get-switchports (picker)": 2,
+    "get-switchports (search)": 2,
+    "get-switchports": 3,
+    "get-switchports-status": 3,
+    "get-switchports-status-bulk": 15,
+    "get-org-switchports": 4,
+    "get-firewall-performance (picker)": 2,
+    "get-firewall-performance": 3,
+    "get-wlan-ssids": 3,
+    "get-camera-recent (picker)": 2,
+    "get-camera-recent": 3,
+    "get-clients": 3,
+    "get-clients (csv)": 3,
+    "locate-client (mac)": 2,
+    "locate-client (ip)": 5,
+    "find-client": 5,
+    "get-topology (upstream)": 44,
+    "get-topology (dot)": 44,
+    "get-neighbors": 3,
+    "configure-basic-access-port": 3,
+    "configure-ports-bulk": 4,
+    "cycle-port": 3,
+    "cycle-ports": 6,
+}
+
+
+class TestMockDashboard(unittest.TestCase):
+    """Test the local stand-in for the Dashboard API."""
+
+    def setUp(self):
+        """Serve a small synthetic organization."""
+        self.data = DashboardData(devices=25)
+        self.server = MockDashboard(self.data).start()
+        self.addCleanup(self.server.stop)
+        self.client = MerakiClient(api_key="benchmark", base_url=self.server.url)
+        self.addCleanup(self.client.close)
+
+    def test_pagination(self):
+        """Test the devices endpoint pages like the dashboard, following its links, and every request is counted."""
+        devices = list(self.client.iter_meraki_devices("Benchmark Org 0", per_page=10))
+        assert [dev["serial"] for dev in devices] == self.data.serials
+        assert self.server.stats["operations"]["getOrganizationDevices"] == 3
+        assert self.server.stats["requests"] == 4
+        # Cursors are opaque, like the dashboard's: only those issued in the Link headers are accepted.
+        with self.assertRaises(meraki.APIError):
+            self.client.dashboard.organizations.getOrganizationDevices(
+                self.data.org_id, perPage=10, startingAfter=self.data.serials[9]
+            )
+
+    def test_device_filters(self):
+        """Test devices of one product type are filtered by the dashboard, or taken from a cached full inventory."""
+        switches = self.client.get_device_inventory("Benchmark Org 0", "switch")
+        expected = [dev["serial"] for dev in self.data.devices if dev["productType"] == "switch"]
+        assert [dev["serial"] for dev in switches] == expected
+        assert self.client.name_to_serial("Benchmark Org 0", switches.entries[-1]["name"], "switch") == expected[-1]
+        assert self.server.stats["operations"]["getOrganizationDevices"] == 1
+        self.client.get_device_inventory("Benchmark Org 0")
+        self.client.clear_cache()
+        self.client.get_device_inventory("Benchmark Org 0")
+        cameras = self.client.get_device_inventory("Benchmark Org 0", "camera")
+        assert {dev["productType"] for dev in cameras} == {"camera"}
+        assert self.server.stats["operations"]["getOrganizationDevices"] == 3
+
+    def test_org_switch_ports(self):
+        """Test the ports of every switch are read from the organization-wide endpoints, a page of switches at once."""
+        switches = [dev for dev in self.data.devices if dev["productType"] == "switch"]
+        ports = list(self.client.iter_meraki_org_switchports("Benchmark Org 0"))
+        assert len(ports) == len(switches) * 48
+        assert all(status["portId"] == config.port_id for _, status, config in ports)
+        assert all(isinstance(config, SwitchPort) for _, _, config in ports)
+        assert [switch["serial"] for switch, _, _ in ports[::48]] == [dev["serial"] for dev in switches]
+        assert self.server.stats["operations"]["getOrganizationSwitchPortsStatusesBySwitch"] == 1
+        assert self.server.stats["operations"]["getOrganizationSwitchPortsBySwitch"] == 1
+        network_ports = list(self.client.iter_meraki_org_switchports("Benchmark Org 0", networkIds=["L_000000"]))
+        assert {switch["network"]["id"] for switch, _, _ in network_ports} == {"L_000000"}
+        assert len(network_ports) == 48 * sum(dev["networkId"] == "L_000000" for dev in switches)
+
+    def test_action_batches(self):
+        """Test port changes are submitted in batches of at most 100 actions, and an invalid one fails its batch."""
+        switches = [dev["name"] for dev in self.data.devices if dev["productType"] == "switch"]
+        changes = [(name, str(port), {"vlan": 20}) for name in switches[:5] for port in range(1, 49)]
+        actions = self.client.switch_port_actions("Benchmark Org 0", changes)
+        actions[-1]["resource"] = actions[-1]["resource"].replace("/48", "/49")
+        results = run_with_async_client(
+            "benchmark",
+            lambda aio_client: aio_client.run_action_batches(actions, org_id="100000", poll_interval=0),
+            base_url=self.server.url,
+        )
+        assert [len(batch_actions) for batch_actions, _ in results] == [100, 100, 40]
+        assert [batch["status"]["completed"] for _, batch in results] == [True, True, False]
+        assert results[-1][1]["status"]["errors"] == [f"Resource {actions[-1]['resource']} not found"]
+        assert self.server.stats["operations"]["createOrganizationActionBatch"] == 3
+        assert self.server.stats["operations"]["getOrganizationActionBatch"] == 2
+
+    def test_client_search(self):
+        """Test a client is located by MAC address in a single request, and an unknown one is reported as None."""
+        dev = self.data.devices[7]
+        mac = self.data.device_clients(dev["serial"])[2]["mac"]
+        record = self.client.search_meraki_client("Benchmark Org 0", mac)
+        assert record["mac"] == mac
+        assert [(entry["network"]["id"], entry["recentDeviceName"]) for entry in record["records"]] == [
+            (dev["networkId"], dev["name"])
+        ]
+        assert self.client.search_meraki_client("Benchmark Org 0", "00:11:22:33:44:55") is None
+        assert self.server.stats["operations"]["getOrganizationClientsSearch"] == 2
+
+    def test_topology_refresh(self):
+        """Test the neighbors of the switches and appliances are only queried again once they are too old."""
+        crawled = [dev for dev in self.data.devices if dev["productType"] in ("switch", "appliance")]
+        with benchmark_settings(self.server.url, rate_limit_per_org=0):
+            client = helpers.get_client()
+            topology, queried = topology_commands.load_topology(client, "Benchmark Org 0")
+            assert queried == len(crawled)
+            assert topology_commands.load_topology(client, "Benchmark Org 0")[1] == 0
+            assert topology_commands.load_topology(client, "Benchmark Org 0", max_age=1e-9)[1] == len(crawled)
+        # The last five devices make up a network of switches only, with no appliance upstream.
+        switches = [dev for dev in crawled if dev["productType"] == "switch"]
+        hops = topology.upstream(topology.find(next(dev for dev in switches if dev["networkId"] == "L_000000")["name"]))
+        assert topology.is_root(hops[-1][2])
+        assert (
+            topology.upstream(topology.find(next(dev for dev in switches if dev["networkId"] == "L_000001")["serial"]))
+            is None
+        )
+        assert self.server.stats["operations"]["getDeviceLldpCdp"] == 2 * len(crawled)
+
+    def test_incremental_sync(self):
+        """Test only the devices listed as changed are downloaded between full refreshes."""
+        assert self.client.sync_inventory("Benchmark Org 0") == "full"
+        assert self.client.sync_inventory("Benchmark Org 0") == "unchanged"
+        serial = self.data.devices[3]["serial"]
+        self.data.rename_device(serial, "renamed-device")
+        before = self.server.snapshot()
+        assert self.client.sync_inventory("Benchmark Org 0") == "incremental"
+        assert self.server.snapshot()["operations"] - before["operations"] == Counter(
+            {"getOrganizationConfigurationChanges": 1, "getOrganizationDevices": 1}
+        )
+        assert self.client.name_to_serial("Benchmark Org 0", "renamed-device") == serial
+        assert len(self.client.get_device_inventory("Benchmark Org 0")) == len(self.data.devices)
+        self.data.changes.append({"ts": self.data.changes[-1]["ts"], "networkId": None, "label": "Network created"})
+        assert self.client.sync_inventory("Benchmark Org 0") == "full"
+        assert self.client.sync_inventory("Benchmark Org 0", full_interval=0) == "full"
+
+    def test_throttling(self):
+        """Test requests answered with HTTP 429 are retried, then surface as API errors."""
+        self.server.throttle_ratio = 1.0
+        with self.assertRaises(meraki.APIError):
+            self.client.get_meraki_orgs()
+        assert self.server.stats["throttled"] == self.server.stats["requests"] > 1
+
+
+class TestHarness(unittest.TestCase):
+    """Test running subcommands against the mock dashboard."""
+
+    def test_run_benchmark(self):  # pylint: disable=no-self-use
+        """Test API calls and rendered tables are measured with cold and warm caches."""
+        results = run_benchmark(devices=30, repeat=2, rate_limit_per_org=0, only=["get-switchports"])
+        assert [result["scenario"] for result in results] == [
+            "get-switchports (picker)",
+            "get-switchports (search)",
+            "get-switchports",
+        ]
+        picker, search, ports = results
+        assert picker["menu_choices"] == 18
+        assert search["menu_choices"] == 7  # six switches named switch-00001x, then the search entry
+        assert (ports["cold_calls"], ports["warm_calls"], ports["table_rows"]) == (3, 1, 48)
+        assert not ports["errors"]
+
+    def test_every_subcommand_has_a_scenario(self):  # pylint: disable=no-self-use
+        """Test new subcommands get a benchmark scenario."""
+        assert not unbenchmarked_subcommands()
+        assert len({scenario.label for scenario in SCENARIOS}) == len(SCENARIOS)
+
+    def test_call_budgets(self):  # pylint: disable=no-self-use
+        """Test no subcommand requests the same data twice, even with the resolution cache disabled."""
+        for ttl in (300, 0):
+            results = run_benchmark(devices=60, repeat=0, rate_limit_per_org=0, settings={"resolution_cache_ttl": ttl})
+            assert {result["scenario"]: result["cold_calls"] for result in results} == CALL_BUDGETS
+
+    def test_percentile(self):  # pylint: disable=no-self-use
+        """Test the nearest-rank percentile."""
+        assert percentile([4, 1, 3, 2], 50) == 2
+        assert percentile([4, 1, 3, 2], 95) == 4
+        assert percentile([], 50) == 0.0
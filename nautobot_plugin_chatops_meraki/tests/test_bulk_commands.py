@@ -0,0 +1,244 @@
+"""Test of bulk_commands.py."""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from nautobot_chatops.choices import CommandStatusChoices
+
+from .. import bulk_commands
+from ..inventory import Inventory, product_type
+from ..utils import MerakiClient
+from .test_worker import DEVICES
+
+PORT_STATUS = {
+    "portId": "1",
+    "enabled": True,
+    "status": "Connected",
+    "errors": [],
+    "warnings": [],
+    "speed": "1 Gbps",
+    "duplex": "full",
+    "clientCount": 1,
+}
+
+
+class TestBulkSwitchportsStatus(unittest.TestCase):
+    """Test the multi-switch port status subcommand."""
+
+    def setUp(self):
+        """Serve a fixed inventory from a fresh client."""
+        self.client = MerakiClient(api_key="1234567890")
+        patcher = patch.object(
+            self.client,
+            "get_meraki_devices",
+            side_effect=lambda org_name, product=None: [dev for dev in DEVICES if product in (None, product_type(dev))],
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(
+            self.client, "get_meraki_networks_by_org", return_value=[{"id": "L_12345", "name": "HQ"}]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_filter_switches(self):
+        """Test switches are selected by network, tag and model, and other device types are ignored."""
+        by_network = bulk_commands.filter_switches(self.client, "NTC-TEST", "network", "hq")
+        assert [dev["name"] for dev in by_network] == ["sw01-test", "sw02-test"]
+        assert [dev["name"] for dev in bulk_commands.filter_switches(self.client, "NTC-TEST", "tag", "idf1")] == [
+            "sw01-test"
+        ]
+        by_model = bulk_commands.filter_switches(self.client, "NTC-TEST", "model", "ms220-8p")
+        assert [dev["name"] for dev in by_model] == ["sw01-test", "sw03-test"]
+
+    def test_merged_table(self):
+        """Test the per-switch results are merged into one table and failures reported separately."""
+        dispatcher = MagicMock()
+        results = {"SN987654": [PORT_STATUS], "SN666666": Exception("404 Not Found")}
+
+        def for_each_serial(_method, serials, on_result=None, **_):
+            for serial in serials:
+                on_result(serial, results[serial])
+            return results
+
+        aio_client = MagicMock(for_each_serial=for_each_serial)
+        with patch.object(bulk_commands, "get_client", return_value=self.client), patch.object(
+            bulk_commands, "run_async", side_effect=lambda func: func(aio_client)
+        ), patch.object(self.client, "org_name_to_id", return_value="123"):
+            result = bulk_commands.get_switchports_status_bulk(dispatcher, "NTC-TEST", "model", "MS220-8P")
+        assert result == (CommandStatusChoices.STATUS_SUCCEEDED, "1 of 2 switches could not be queried.")
+        header, rows = dispatcher.send_large_table.call_args_list[0][0]
+        assert header[0] == "Switch"
+        assert rows == [("sw01-test", "1", True, "Connected", "", "", "1 Gbps", "full", 1)]
+        assert dispatcher.send_large_table.call_args_list[1][0][1] == [("sw03-test", "404 Not Found")]
+
+
+class TestOrgSwitchports(unittest.TestCase):
+    """Test the organization-wide switch port subcommand."""
+
+    PORTS = [
+        ({"name": "sw01-test", "serial": "SN987654"}, PORT_STATUS, {"portId": "1", "vlan": 10, "poeEnabled": True}),
+        (
+            {"name": "sw02-test", "serial": "SN555555"},
+            dict(PORT_STATUS, status="Disconnected", errors=["Port disconnected"]),
+            {"portId": "1", "vlan": 20, "poeEnabled": False},
+        ),
+        ({"name": "sw02-test", "serial": "SN555555"}, dict(PORT_STATUS, portId="2", enabled=False), None),
+    ]
+
+    def test_port_filters(self):
+        """Test ports are selected by status, errors, PoE and VLAN."""
+        for filter_type, filter_value, expected in [
+            ("all", "", [0, 1, 2]),
+            ("status", "connected", [0]),
+            ("status", "disabled", [2]),
+            ("errors", "", [1]),
+            ("poe", "disabled", [1, 2]),
+            ("vlan", "20", [1]),
+        ]:
+            matches = [
+                index
+                for index, (_, status, config) in enumerate(self.PORTS)
+                if bulk_commands.port_matches(filter_type, filter_value, status, config)
+            ]
+            assert matches == expected, (filter_type, filter_value)
+
+    def test_prompts(self):  # pylint: disable=no-self-use
+        """Test a filter type, then a value for the status, PoE and VLAN filters, are asked for."""
+        dispatcher = MagicMock()
+        assert bulk_commands.get_org_switchports(dispatcher, "NTC-TEST") is False
+        assert dispatcher.prompt_from_menu.call_args[0][2] == bulk_commands.PORT_FILTER_TYPES
+        assert bulk_commands.get_org_switchports(dispatcher, "NTC-TEST", "poe", "maybe") is False
+        assert dispatcher.prompt_from_menu.call_args[0][2] == [("enabled", "enabled"), ("disabled", "disabled")]
+        assert bulk_commands.get_org_switchports(dispatcher, "NTC-TEST", "vlan") is False
+        assert dispatcher.prompt_for_text.call_args[0][0] == "meraki get-org-switchports 'NTC-TEST' vlan"
+
+    def test_table(self):
+        """Test the matching ports of every switch are listed in one table."""
+        dispatcher = MagicMock()
+        client = MagicMock()
+        client.iter_meraki_org_switchports.return_value = iter(self.PORTS)
+        with patch.object(bulk_commands, "get_client", return_value=client):
+            result = bulk_commands.get_org_switchports(dispatcher, "NTC-TEST", "errors")
+        assert result[1].startswith("1 of 3 ports on 2 switches match errors.")
+        client.iter_meraki_org_switchports.assert_called_once_with("NTC-TEST")
+        rows = dispatcher.send_large_table.call_args[0][1]
+        assert rows == [("sw02-test", "", "1", True, "Disconnected", 20, False, "Port disconnected", "", "1 Gbps")]
+
+
+class TestBulkPortChanges(unittest.TestCase):
+    """Test the parsing of bulk port changes."""
+
+    def test_default_columns(self):  # pylint: disable=no-self-use
+        """Test lines list the switch, ports, VLAN, state and name, and port ranges are expanded."""
+        changes = bulk_commands.parse_port_changes("sw01-test,1-3,20,yes\nsw02-test, 48, , no, uplink")
+        assert changes == [
+            ("sw01-test", "1", {"vlan": 20, "enabled": True}),
+            ("sw01-test", "2", {"vlan": 20, "enabled": True}),
+            ("sw01-test", "3", {"vlan": 20, "enabled": True}),
+            ("sw02-test", "48", {"name": "uplink", "enabled": False}),
+        ]
+
+    def test_header(self):  # pylint: disable=no-self-use
+        """Test a header line selects the settings to change."""
+        changes = bulk_commands.parse_port_changes("switch,ports,voice-vlan,poe;sw01-test,1-2,200,false")
+        assert changes == [
+            ("sw01-test", "1", {"voiceVlan": 200, "poeEnabled": False}),
+            ("sw01-test", "2", {"voiceVlan": 200, "poeEnabled": False}),
+        ]
+
+    def test_errors(self):
+        """Test errors name the line they were found on."""
+        with self.assertRaisesRegex(ValueError, "Line 2: '4-1' is not a port range."):
+            bulk_commands.parse_port_changes("sw01-test,1,20\nsw01-test,4-1,20")
+        with self.assertRaisesRegex(ValueError, "Line 1: no setting to change."):
+            bulk_commands.parse_port_changes("sw01-test,1")
+        with self.assertRaisesRegex(ValueError, "Line 1: invalid literal"):
+            bulk_commands.parse_port_changes("sw01-test,1,ten")
+        with self.assertRaisesRegex(ValueError, "Unknown column speed"):
+            bulk_commands.parse_port_changes("switch,ports,speed\nsw01-test,1,100")
+
+    @patch.object(bulk_commands, "get_client")
+    def test_shared_switch_name(self, mock_get_client):  # pylint: disable=no-self-use
+        """Test a switch name shared by several switches fails with their serials before any batch is built."""
+        devices = [*DEVICES, {"name": "sw01-test", "serial": "SN777777", "networkId": "L_67890", "model": "MS120-8"}]
+        client = mock_get_client.return_value
+        client.get_device_inventory.return_value = Inventory(devices)
+        dispatcher = MagicMock()
+        status, details = bulk_commands.configure_ports_bulk(dispatcher, "NTC-TEST", "sw02-test,1,20;SW01-test,2,20")
+        assert status == CommandStatusChoices.STATUS_FAILED
+        assert "'SW01-test'" in details and "SN987654, SN777777" in details
+        dispatcher.send_warning.assert_called_once_with(details)
+        client.switch_port_actions.assert_not_called()
+
+    @patch.object(bulk_commands, "run_async")
+    @patch.object(bulk_commands, "get_client")
+    def test_pending_batches(self, mock_get_client, mock_run_async):  # pylint: disable=no-self-use
+        """Test batches still running when the command stops waiting are reported with their IDs."""
+        mock_get_client.return_value.get_device_inventory.return_value = Inventory(DEVICES)
+        mock_run_async.return_value = [
+            (["action"], {"id": "1", "status": {"completed": True, "failed": False}}),
+            (["action"], {"id": "2", "status": {"completed": False, "failed": False}}),
+        ]
+        dispatcher = MagicMock()
+        status, details = bulk_commands.configure_ports_bulk(dispatcher, "NTC-TEST", "sw01-test,1-2,20")
+        assert status == CommandStatusChoices.STATUS_SUCCEEDED
+        assert details == "1 of 2 port changes applied in 2 action batches. Action batches still running: 2."
+        assert dispatcher.send_warning.call_args[0][0].startswith("Action batches 2 are still running.")
+        rows = dispatcher.send_large_table.call_args[0][1]
+        assert [row[3] for row in rows] == ["applied", "pending in batch 2"]
+
+    def test_batch_result(self):  # pylint: disable=no-self-use
+        """Test the outcome of each port change follows the state of its batch."""
+        assert bulk_commands.batch_result(None) == "not submitted"
+        assert bulk_commands.batch_result({"id": "1", "status": {"completed": True, "failed": False}}) == "applied"
+        assert (
+            bulk_commands.batch_result({"id": "1", "status": {"completed": False, "failed": False}})
+            == "pending in batch 1"
+        )
+        failed = {"id": "1", "status": {"completed": False, "failed": True, "errors": ["Invalid VLAN"]}}
+        assert bulk_commands.batch_result(failed) == "failed: Invalid VLAN"
+
+
+class TestPortTargets(unittest.TestCase):
+    """Test the parsing of the ports to cycle on several switches."""
+
+    def test_targets(self):  # pylint: disable=no-self-use
+        """Test ports are grouped per switch, with ranges expanded and repeated ports dropped."""
+        targets = bulk_commands.parse_port_targets("sw01-test:1-3,12; sw02-test:48\nsw01-test:2,13")
+        assert targets == {"sw01-test": ["1", "2", "3", "12", "13"], "sw02-test": ["48"]}
+        targets = bulk_commands.parse_port_targets("sw01-test:1_MA-MOD-4X10G_1,1_MA-MOD-4X10G_2")
+        assert targets == {"sw01-test": ["1_MA-MOD-4X10G_1", "1_MA-MOD-4X10G_2"]}
+
+    def test_errors(self):
+        """Test targets without a switch or ports are rejected."""
+        with self.assertRaisesRegex(ValueError, "'sw01-test' is not a switch:ports target"):
+            bulk_commands.parse_port_targets("sw01-test")
+        with self.assertRaisesRegex(ValueError, "'4-1' is not a port range"):
+            bulk_commands.parse_port_targets("sw01-test:4-1")
+
+    @patch.object(bulk_commands, "run_async")
+    @patch.object(bulk_commands, "get_client")
+    def test_cycle_ports_merges_names(self, mock_get_client, mock_run_async):  # pylint: disable=no-self-use
+        """Test names of the same switch spelled in different cases are cycled, and reported, as one switch."""
+        mock_get_client.return_value.get_device_inventory.return_value = Inventory(DEVICES)
+        mock_run_async.return_value = {"SN987654": {"ports": ["1", "2", "3"]}, "SN555555": Exception("404")}
+        dispatcher = MagicMock()
+        status, details = bulk_commands.cycle_ports(dispatcher, "NTC-TEST", "sw01-test:1,2;sw02-test:48;SW01-TEST:2,3")
+        assert status == CommandStatusChoices.STATUS_SUCCEEDED
+        assert details == "Ports cycled on 1 of 2 switches."
+        dispatcher.send_markdown.assert_called_with("Cycling 4 ports on 2 switches...")
+        rows = dispatcher.send_large_table.call_args[0][1]
+        assert rows == [("sw01-test", "1, 2, 3", "cycled"), ("sw02-test", "48", "failed: 404")]
+
+    @patch.object(bulk_commands, "run_async")
+    @patch.object(bulk_commands, "get_client")
+    def test_cycle_ports_shared_name(self, mock_get_client, mock_run_async):  # pylint: disable=no-self-use
+        """Test a switch name shared by several switches fails with their serials before any port is cycled."""
+        devices = [*DEVICES, {"name": "sw01-test", "serial": "SN777777", "networkId": "L_67890", "model": "MS120-8"}]
+        mock_get_client.return_value.get_device_inventory.return_value = Inventory(devices)
+        dispatcher = MagicMock()
+        status, details = bulk_commands.cycle_ports(dispatcher, "NTC-TEST", "sw01-test:1")
+        assert status == CommandStatusChoices.STATUS_FAILED
+        assert "SN987654, SN777777" in details
+        dispatcher.send_warning.assert_called_once_with(details)
+        mock_run_async.assert_not_called()
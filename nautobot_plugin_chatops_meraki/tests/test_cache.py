@@ -0,0 +1,210 @@
+"""Test of cache.py."""
+import threading
+import time
+import unittest
+
+from ..cache import RedisCache, SingleFlight, TTLCache, current_fetches, fetch_context
+
+
+class FakeTimer:  # pylint: disable=too-few-public-methods
+    """Manually advanced clock."""
+
+    def __init__(self):
+        """Start the clock at zero."""
+        self.now = 0
+
+    def __call__(self):
+        """Return the current fake time."""
+        return self.now
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the Redis commands used by RedisCache."""
+
+    def __init__(self):
+        """Start empty."""
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return a stored value."""
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):  # pylint: disable=unused-argument
+        """Store a value, optionally only when the key is absent."""
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def delete(self, key):
+        """Drop a key."""
+        self.data.pop(key, None)
+
+    def register_script(self, _):
+        """Return the lock release script."""
+
+        def release(keys, args):
+            if self.data.get(keys[0]) == args[0]:
+                self.delete(keys[0])
+
+        return release
+
+
+class TestTTLCache(unittest.TestCase):
+    """Test the TTL cache."""
+
+    def setUp(self):
+        """Create a cache driven by a fake clock."""
+        self.timer = FakeTimer()
+        self.cache = TTLCache(ttl=10, maxsize=2, timer=self.timer)
+
+    def test_expiry(self):
+        """Test entries expire after their time to live."""
+        self.cache.set(("orgs",), {"ntc-test": "123456"})
+        assert self.cache.get(("orgs",)) == {"ntc-test": "123456"}
+        self.timer.now = 10
+        assert self.cache.get(("orgs",)) is None
+        assert self.cache.stats["hits"] == 1
+        assert self.cache.stats["misses"] == 1
+        assert self.cache.stats["expired"] == 1
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted once the cache is full."""
+        self.cache.set(("devices", "org-a"), {})
+        self.cache.set(("devices", "org-b"), {})
+        self.cache.get(("devices", "org-a"))
+        self.cache.set(("devices", "org-c"), {})
+        assert ("devices", "org-a") in self.cache
+        assert ("devices", "org-b") not in self.cache
+        assert self.cache.stats["evictions"] == 1
+
+    def test_invalidate_org(self):
+        """Test invalidating an organization only drops entries scoped to it."""
+        self.cache.set(("devices", "org-a"), {})
+        self.cache.set(("networks", "org-b"), {})
+        self.cache.invalidate_org("org-a")
+        assert ("devices", "org-a") not in self.cache
+        assert ("networks", "org-b") in self.cache
+
+
+class TestRedisCache(unittest.TestCase):
+    """Test the Redis-backed shared cache."""
+
+    def test_round_trip(self):  # pylint: disable=no-self-use
+        """Test values are stored compressed and read back with their fetch time."""
+        cache = RedisCache(FakeRedis())
+        cache.set(("devices", "ntc-test"), [{"name": "sw01-test", "serial": "SN987654"}])
+        value, fetched_at = cache.get_entry(("devices", "ntc-test"))
+        assert value == [{"name": "sw01-test", "serial": "SN987654"}]
+        assert fetched_at <= time.time()
+        assert cache.get(("devices", "other")) is None
+
+    def test_single_loader_under_stampede(self):  # pylint: disable=no-self-use
+        """Test concurrent readers of a missing key share the result of a single load."""
+        cache = RedisCache(FakeRedis(), poll_interval=0.01)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return ["org"]
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_load(("orgs",), loader))) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1
+        assert results == [["org"]] * 5
+        assert not cache.redis.data.get(cache._key(("orgs",)) + ":lock")  # pylint: disable=protected-access
+
+    def test_no_load_after_previous_leader(self):  # pylint: disable=no-self-use
+        """Test a value stored by the previous lock holder, after the first read missed, is not loaded again."""
+        redis = FakeRedis()
+        cache = RedisCache(redis)
+        read = redis.get
+        reads = []
+
+        def get(key):
+            data = read(key)
+            if not reads:
+                # The previous leader stores its value and releases its lock right after the first read misses.
+                cache.set(("orgs",), ["org"])
+            reads.append(key)
+            return data
+
+        redis.get = get
+        assert cache.get_or_load(("orgs",), lambda: ["loaded"]) == ["org"]
+        assert cache.stats["loads"] == 0
+        assert not redis.data.get(cache._key(("orgs",)) + ":lock")  # pylint: disable=protected-access
+
+
+class TestFetchContext(unittest.TestCase):
+    """Test the data shared while a command runs."""
+
+    def test_nested_contexts_share_data(self):  # pylint: disable=no-self-use
+        """Test nested blocks join the outer context, which is dropped when the outer block exits."""
+        assert current_fetches() is None
+        with fetch_context() as fetches:
+            fetches.set(("call", "getOrganizations"), ["org"])
+            fetches.set(("inventory", "orgs"), ["org"])
+            with fetch_context() as nested:
+                assert nested is fetches
+                assert nested.get(("call", "getOrganizations")) == ["org"]
+            fetches.clear("call")
+            assert fetches.get(("call", "getOrganizations")) is None
+            assert len(fetches) == 1
+        assert current_fetches() is None
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test the deduplication of identical concurrent calls."""
+
+    def run_concurrently(self, flight, func, count=5):
+        """Call ``flight.do`` from several threads at once and return the outcomes."""
+        outcomes = []
+
+        def call():
+            try:
+                outcomes.append(flight.do(("orgs",), func))
+            except ValueError as exc:
+                outcomes.append(exc)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_concurrent_calls_share_one_result(self):
+        """Test callers joining a call in flight receive its result."""
+        flight = SingleFlight()
+        calls = []
+
+        def func():
+            calls.append(1)
+            time.sleep(0.05)
+            return ["org"]
+
+        outcomes = self.run_concurrently(flight, func)
+        assert len(calls) == 1
+        assert sorted(shared for _, shared in outcomes) == [False, True, True, True, True]
+        assert all(value == ["org"] for value, _ in outcomes)
+        assert len(flight) == 0
+        assert flight.do(("orgs",), lambda: ["new"]) == (["new"], False)
+
+    def test_error_shared(self):
+        """Test the callers of a failed call all receive its exception."""
+
+        def func():
+            time.sleep(0.05)
+            raise ValueError("boom")
+
+        outcomes = self.run_concurrently(SingleFlight(), func, count=3)
+        assert [str(outcome) for outcome in outcomes] == ["boom"] * 3
@@ -0,0 +1,22 @@
+"""Test of client_commands.py."""
+import unittest
+
+from .. import client_commands
+
+
+class TestClientAddress(unittest.TestCase):
+    """Test the recognition of the addresses clients are located by."""
+
+    def test_addresses(self):  # pylint: disable=no-self-use
+        """Test MAC addresses in any usual notation and IP addresses are put in canonical form."""
+        for mac in ("AA:BB:CC:00:11:22", "aa-bb-cc-00-11-22", "aabb.cc00.1122", "aabbcc001122"):
+            assert client_commands.parse_client_address(mac) == ("mac", "aa:bb:cc:00:11:22")
+        assert client_commands.parse_client_address(" 10.0.0.1 ") == ("ip", "10.0.0.1")
+        assert client_commands.parse_client_address("2001:DB8::1") == ("ip", "2001:db8::1")
+        assert client_commands.parse_client_address("::aabb:ccdd:eeff") == ("ip", "::aabb:ccdd:eeff")
+
+    def test_errors(self):
+        """Test host names and partial addresses are rejected."""
+        for address in ("printer-01", "aa:bb:cc", "10.0.0"):
+            with self.assertRaisesRegex(ValueError, "is neither a MAC nor an IP address"):
+                client_commands.parse_client_address(address)
@@ -0,0 +1,84 @@
+"""Test of client_index.py."""
+import json
+import unittest
+
+from ..client_index import ClientIndex
+
+CLIENTS = {
+    "Branch 1": [
+        {
+            "mac": "00:18:0A:11:22:33",
+            "ip": "10.0.1.15",
+            "dhcpHostname": "Printer-01",
+            "recentDeviceName": "sw01-test",
+            "switchport": "12",
+            "vlan": 10,
+        },
+        {
+            "mac": "00:18:0a:44:55:66",
+            "ip": "10.0.1.150",
+            "dhcpHostname": None,
+            "description": "laptop-jdoe",
+            "recentDeviceSerial": "SN987654",
+            "switchport": None,
+            "vlan": 20,
+        },
+    ],
+    "Branch 2": [
+        {"mac": "aa:bb:cc:dd:ee:ff", "ip": "10.0.2.15", "dhcpHostname": "printer-02", "recentDeviceName": "sw02-test"},
+    ],
+}
+
+
+class TestClientIndex(unittest.TestCase):
+    """Test the prefix searches of the client index."""
+
+    def setUp(self):
+        """Index a few clients of two networks."""
+        self.index = ClientIndex.from_clients(CLIENTS)
+
+    def macs(self, text, limit=None):
+        """Return the MAC addresses of the clients matching a search."""
+        return [client["mac"] for client in self.index.search(text, limit=limit)]
+
+    def test_rows(self):
+        """Test each client is stored with its device, switchport, VLAN and network."""
+        assert len(self.index) == 3
+        assert self.index.search("printer-01") == [
+            {
+                "mac": "00:18:0a:11:22:33",
+                "ip": "10.0.1.15",
+                "hostname": "Printer-01",
+                "device": "sw01-test",
+                "switchport": "12",
+                "vlan": "10",
+                "network": "Branch 1",
+            }
+        ]
+        assert self.index.search("laptop")[0]["device"] == "SN987654"
+
+    def test_mac_prefix(self):
+        """Test MAC addresses match by prefix whatever their notation."""
+        for text in ("00:18:0a", "00-18-0A", "0018.0a", "00180a"):
+            assert self.macs(text) == ["00:18:0a:11:22:33", "00:18:0a:44:55:66"]
+
+    def test_ip_and_hostname_prefix(self):
+        """Test IP addresses and host names match by prefix, host names whatever their case."""
+        assert self.macs("10.0.1.15") == ["00:18:0a:11:22:33", "00:18:0a:44:55:66"]
+        assert self.macs("10.0.2") == ["aa:bb:cc:dd:ee:ff"]
+        assert self.macs("PRINTER") == ["00:18:0a:11:22:33", "aa:bb:cc:dd:ee:ff"]
+        assert not self.macs("switch")
+        assert not self.macs("  ")
+
+    def test_unique_and_limit(self):
+        """Test a client matching on several fields is listed once, and results stop at the limit."""
+        index = ClientIndex.from_clients({"Lab": [{"mac": "ab:00:00:00:00:01", "ip": "", "dhcpHostname": "ab-host"}]})
+        assert [client["hostname"] for client in index.search("ab")] == ["ab-host"]
+        assert len(self.index.search("10.0", limit=2)) == 2
+
+    def test_serialization(self):
+        """Test an index round-trips through JSON with its sort orders."""
+        loaded = ClientIndex.from_dict(json.loads(json.dumps(self.index.to_dict())))
+        assert loaded.built_at == self.index.built_at
+        assert loaded.search("printer") == self.index.search("printer")
+        assert loaded.search("00:18") == self.index.search("00:18")
@@ -0,0 +1,56 @@
+"""Test of helpers.py."""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from .. import helpers
+from ..inventory import Inventory
+
+
+class TestNamePicker(unittest.TestCase):
+    """Test the paged and searchable name menus."""
+
+    def setUp(self):
+        """Offer menus of at most two names."""
+        self.inventory = Inventory([{"name": f"sw{index:02}", "serial": f"SN{index:06}"} for index in range(5)])
+        self.dispatcher = MagicMock()
+        patcher = patch.dict(helpers.PLUGIN_SETTINGS, {"picker_page_size": 2})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def choices(self):
+        """Return the choices of the last menu sent."""
+        return self.dispatcher.prompt_from_menu.call_args[0][2]
+
+    def test_pages(self):
+        """Test a large inventory is offered one page at a time, with paging and search entries."""
+        helpers.prompt_for_name(self.dispatcher, "meraki get-clients", "Select a Device", self.inventory)
+        assert self.choices() == [("sw00", "sw00"), ("sw01", "sw01"), ("Next...", "page:2:"), ("Search...", "search:")]
+        helpers.prompt_for_name(self.dispatcher, "meraki get-clients", "Select a Device", self.inventory, "page:4:")
+        assert self.choices() == [("Previous...", "page:2:"), ("sw04", "sw04"), ("Search...", "search:")]
+
+    def test_search(self):
+        """Test a search text selects the matching names, and the search entry asks for one."""
+        helpers.prompt_for_name(self.dispatcher, "meraki get-clients", "Select a Device", self.inventory, "SW0")
+        assert self.choices()[-2:] == [("Next...", "page:2:SW0"), ("Search...", "search:")]
+        helpers.prompt_for_name(self.dispatcher, "meraki get-clients", "Select a Device", self.inventory, "search:")
+        assert self.dispatcher.prompt_for_text.call_args[0][0] == "meraki get-clients"
+        helpers.prompt_for_name(self.dispatcher, "meraki get-clients", "Select a Device", self.inventory, "fw")
+        self.dispatcher.send_warning.assert_called_once()
+
+    def test_small_inventory(self):
+        """Test an inventory fitting in one menu is offered whole, in the order the API returned it."""
+        inventory = Inventory([{"name": "sw02", "serial": "SN2"}, {"name": "sw01", "serial": "SN1"}])
+        helpers.prompt_for_name(self.dispatcher, "meraki get-clients", "Select a Device", inventory)
+        assert self.choices() == [("sw02", "sw02"), ("sw01", "sw01")]
+
+
+class TestProgressReporter(unittest.TestCase):
+    """Test the progress reports of the subcommands querying many devices."""
+
+    def test_progress_reporter(self):  # pylint: disable=no-self-use
+        """Test progress is only reported at a few milestones."""
+        dispatcher = MagicMock()
+        report = helpers.progress_reporter(dispatcher, 8, "switches")
+        for done in range(1, 9):
+            report(done)
+        assert dispatcher.send_markdown.call_count == 3
@@ -0,0 +1,61 @@
+"""Test of inventory.py."""
+import unittest
+
+from ..inventory import AmbiguousNameError, Inventory, NotFoundError, product_type
+
+DEVICES = [
+    {"name": "sw01-test", "serial": "SN987654", "mac": "0c:8d:db:7e:d4:48", "networkId": "L_12345", "model": "MS120-8"},
+    {"name": "fw01-test", "serial": "SN123456", "mac": "0c:8d:db:1b:5e:80", "networkId": "L_12345", "model": "MX64"},
+    {"name": "ap01-test", "serial": "SN111111", "mac": "0c:8d:db:00:00:01", "networkId": "L_67890", "model": "MR33"},
+    {"name": "AP01-TEST", "serial": "SN222222", "mac": "0c:8d:db:00:00:02", "networkId": "L_67890", "model": "MR33"},
+    {"name": None, "serial": "SN333333", "mac": "0c:8d:db:00:00:03", "networkId": "L_67890", "model": "MR33"},
+]
+
+
+class TestInventory(unittest.TestCase):
+    """Test the indexed inventory."""
+
+    def setUp(self):
+        """Index the sample devices."""
+        self.inventory = Inventory(DEVICES)
+
+    def test_lookups(self):
+        """Test case-insensitive lookups by name, serial, MAC and network."""
+        assert self.inventory.get_by_name("FW01-test")["serial"] == "SN123456"
+        assert self.inventory.get_by_id("sn987654")["name"] == "sw01-test"
+        assert self.inventory.get_by_mac("0C-8D-DB-1B-5E-80")["name"] == "fw01-test"
+        assert [dev["serial"] for dev in self.inventory.in_network("L_12345")] == ["SN987654", "SN123456"]
+        assert len(self.inventory) == 5
+
+    def test_search(self):
+        """Test names starting with the search text are found, or names containing it when none starts with it."""
+        inventory = Inventory([{"name": name, "serial": name} for name in ["fw01", "sw02", "SW01", "core-sw01", "ap"]])
+        assert list(inventory.search("sw")) == ["SW01", "sw02"]
+        assert list(inventory.search("w01")) == ["core-sw01", "fw01", "SW01"]
+        assert not list(inventory.search("01"))
+        assert list(inventory.search("")) == ["ap", "core-sw01", "fw01", "SW01", "sw02"]
+        assert not list(inventory.search("mx"))
+
+    def test_not_found(self):
+        """Test a missing name raises a descriptive error that is still an IndexError."""
+        with self.assertRaises(NotFoundError) as context:
+            self.inventory.get_by_name("sw99-test")
+        assert isinstance(context.exception, IndexError)
+        assert "sw99-test" in str(context.exception)
+
+    def test_ambiguous_name(self):
+        """Test names shared by several devices are reported with their serials."""
+        with self.assertRaises(AmbiguousNameError) as context:
+            self.inventory.get_by_name("ap01-test")
+        assert "SN111111" in str(context.exception)
+        assert "SN222222" in str(context.exception)
+        assert list(self.inventory.duplicates()) == ["ap01-test"]
+
+    def test_of_type(self):
+        """Test devices are indexed by product type, derived from the model when the API did not report it."""
+        assert [dev["serial"] for dev in self.inventory.of_type("wireless")] == ["SN111111", "SN222222", "SN333333"]
+        assert [dev["name"] for dev in self.inventory.of_type("appliance")] == ["fw01-test"]
+        assert not self.inventory.of_type("camera")
+        assert product_type({"model": "MS220-8P", "productType": "switch"}) == "switch"
+        assert product_type({"model": "Z3"}) == "appliance"
+        assert product_type({"model": "unknown"}) is None
@@ -0,0 +1,85 @@
+"""Test of metrics.py."""
+import unittest
+from unittest.mock import MagicMock
+
+from nautobot_chatops.choices import CommandStatusChoices
+from prometheus_client import REGISTRY
+
+from ..metrics import UNKNOWN_ORG, api_call, command_metrics, instrumented, register_orgs, span, with_summary
+from ..utils import MerakiClient
+
+
+def getOrganizations():  # pylint: disable=invalid-name
+    """Stand in for the SDK endpoint."""
+    return [{"id": "123", "name": "Test Org"}]
+
+
+def getDeviceSwitchPorts(serial):  # pylint: disable=invalid-name,unused-argument
+    """Stand in for the SDK endpoint."""
+    return [{"portId": "1"}]
+
+
+class TestMetrics(unittest.TestCase):
+    """Test the per-command accounting of API calls and timings."""
+
+    def test_nested_spans(self):  # pylint: disable=no-self-use
+        """Test time spent in nested spans and API calls is accounted to the outermost span only."""
+        with command_metrics("get-test", "Test Org") as metrics:
+            with span("resolve_serial"):
+                with span("resolve_org"), api_call("getOrganizations"):
+                    pass
+            with api_call("getDeviceSwitchPorts"):
+                pass
+        assert set(metrics.spans) == {"resolve_serial", "query"}
+        assert metrics.calls == {"getOrganizations": 1, "getDeviceSwitchPorts": 1}
+
+    def test_prometheus_counters(self):  # pylint: disable=no-self-use
+        """Test API calls are counted by command, organization, endpoint and outcome."""
+        labels = {"command": "get-failing", "org": "Test Org", "endpoint": "getOrganizations", "outcome": "error"}
+        before = REGISTRY.get_sample_value("nautobot_meraki_api_calls_total", labels) or 0
+        register_orgs([{"id": "123", "name": "Test Org"}])
+        with command_metrics("get-failing", "test org") as metrics:
+            with self.assertRaises(ValueError), api_call("getOrganizations"):
+                raise ValueError("boom")
+        assert REGISTRY.get_sample_value("nautobot_meraki_api_calls_total", labels) == before + 1
+        assert metrics.errors == 1
+        assert "1 failed" in metrics.summary()
+
+    def test_org_label(self):  # pylint: disable=no-self-use
+        """Test organizations missing from the organization list share a single label."""
+        register_orgs([{"id": "123", "name": "Test Org"}])
+        with command_metrics("get-test", "Test Org") as metrics:
+            assert metrics.org == "Test Org"
+        with command_metrics("get-test", "No Such Org") as metrics:
+            assert metrics.org == UNKNOWN_ORG
+        with command_metrics("get-organizations") as metrics:
+            assert metrics.org == ""
+
+    def test_instrumented_handler(self):  # pylint: disable=no-self-use
+        """Test a subcommand's result details carry the summary of the API calls it made."""
+        client = MerakiClient(api_key="1234567890")
+        client.dashboard = MagicMock()
+        client.dashboard.organizations.getOrganizations = getOrganizations
+        client.dashboard.switch.getDeviceSwitchPorts = getDeviceSwitchPorts
+        client.name_to_serial = MagicMock(return_value="SN987654")
+
+        @instrumented
+        def get_switchports(dispatcher, org_name=None, device_name=None):
+            dispatcher.send_large_table(
+                ["Port"], [(port["portId"],) for port in client.get_meraki_switchports(org_name, device_name)]
+            )
+            return CommandStatusChoices.STATUS_SUCCEEDED
+
+        dispatcher = MagicMock()
+        status, details = get_switchports(dispatcher, "Test Org", "sw01-test")
+        assert status == CommandStatusChoices.STATUS_SUCCEEDED
+        assert details.startswith("2 API calls (getOrganizations 1, getDeviceSwitchPorts 1) in ")
+        assert "render" in details and "resolve_org" in details
+        assert ", first rows after " in details
+        dispatcher.send_large_table.assert_called_once_with(["Port"], [("1",)])
+
+    def test_with_summary(self):  # pylint: disable=no-self-use
+        """Test prompts are left alone and details fit in the command log."""
+        assert with_summary(False, "1 API call") is False
+        assert with_summary(("succeeded", "NO Networks!"), "1 API call") == ("succeeded", "NO Networks! (1 API call)")
+        assert len(with_summary("succeeded", "x" * 300)[1]) == 255
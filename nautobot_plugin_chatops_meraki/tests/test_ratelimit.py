@@ -0,0 +1,44 @@
+"""Test of ratelimit.py."""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from ..ratelimit import RedisTokenBucket, RequestScheduler, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test the in-process token bucket."""
+
+    def test_paces_requests(self):  # pylint: disable=no-self-use
+        """Test requests beyond the burst capacity are spaced out at the configured rate."""
+        now = [0.0]
+        bucket = TokenBucket(rate=10, timer=lambda: now[0])
+        waits = [bucket.reserve() for _ in range(12)]
+        assert waits[:10] == [0.0] * 10
+        assert waits[10:] == [0.1, 0.2]
+        now[0] = 1.0
+        assert bucket.reserve() == 0.0
+
+    def test_redis_bucket_uses_script(self):  # pylint: disable=no-self-use
+        """Test the shared bucket reserves through the Redis script."""
+        redis = MagicMock()
+        redis.register_script.return_value.return_value = 250000
+        bucket = RedisTokenBucket(redis, "ratelimit:123456", rate=10)
+        assert bucket.reserve() == 0.25
+        redis.register_script.return_value.assert_called_with(keys=["ratelimit:123456"], args=[10, 10])
+
+
+class TestRequestScheduler(unittest.TestCase):
+    """Test the per-organization request scheduler."""
+
+    @patch("nautobot_plugin_chatops_meraki.ratelimit.time.sleep")
+    def test_acquire_per_org(self, mock_sleep):  # pylint: disable=no-self-use
+        """Test each organization has its own budget and waits are accounted for."""
+        scheduler = RequestScheduler(rate=2)
+        for _ in range(3):
+            scheduler.acquire("123456")
+        scheduler.acquire("654321")
+        assert mock_sleep.call_count == 1
+        assert scheduler.stats["requests"] == 4
+        assert scheduler.stats["delayed"] == 1
+        assert scheduler.stats["queue_depth"] == 0
+        assert scheduler.stats["total_wait"] > 0
@@ -0,0 +1,35 @@
+"""Test of records.py."""
+import unittest
+
+from ..records import Device, SwitchPort
+from .test_inventory import DEVICES
+
+DEVICE = dict(DEVICES[0], productType="switch", tags=["idf1"], lanIp="10.0.0.2", firmware="switch-14-33")
+
+
+class TestRecords(unittest.TestCase):
+    """Test the compact inventory records."""
+
+    def test_only_used_fields_kept(self):  # pylint: disable=no-self-use
+        """Test a record keeps only its fields, readable as attributes or like the API dict."""
+        device = Device.from_api(DEVICE)
+        assert device.network_id == "L_12345"
+        assert device["networkId"] == "L_12345"
+        assert device.lan_ip == "10.0.0.2"
+        assert device.get("firmware") is None
+        assert not hasattr(device, "__dict__")
+        assert device.to_dict() == {key: DEVICE[key] for _, key in Device.FIELDS}
+
+    def test_keep_raw(self):  # pylint: disable=no-self-use
+        """Test the full API response is available when kept."""
+        device = Device.from_api(DEVICE, keep_raw=True)
+        assert device["firmware"] == "switch-14-33"
+        assert device.to_dict() is DEVICE
+
+    def test_row_round_trip(self):  # pylint: disable=no-self-use
+        """Test records survive the compact row serialization."""
+        device = Device.from_api(DEVICE)
+        assert Device.from_row(device.to_row()) == device
+        port = SwitchPort.from_api({"portId": "1", "vlan": 10, "poeEnabled": True})
+        assert port.to_row()[:1] == ["1"]
+        assert port["vlan"] == 10
@@ -0,0 +1,86 @@
+"""Test of rendering.py."""
+import csv
+import io
+import json
+import unittest
+from operator import itemgetter
+from unittest.mock import MagicMock
+
+from texttable import Texttable
+
+from ..rendering import Column, TableRenderer, message_budget, select_columns
+
+COLUMNS = [
+    Column("Port", itemgetter("portId")),
+    Column("Name", itemgetter("name")),
+    Column("Voice VLAN", itemgetter("voiceVlan")),
+]
+
+PORTS = [{"portId": str(port), "name": f"Port {port}", "voiceVlan": 100} for port in range(1, 201)]
+
+
+def draw(header, rows):
+    """Draw a table like the dispatchers' default send_large_table."""
+    table = Texttable(max_width=120)
+    table.set_deco(Texttable.HEADER)
+    table.header(header)
+    table.set_cols_dtype(["t" for _ in header])
+    table.add_rows(rows, header=False)
+    return table.draw()
+
+
+class TestTableRenderer(unittest.TestCase):
+    """Test tables split to the message size budget, and CSV and JSON output."""
+
+    def setUp(self):
+        """Record what is sent."""
+        self.dispatcher = MagicMock(platform_slug="webex")
+
+    def test_select_columns(self):
+        """Test columns are selected by name, in the order given."""
+        assert select_columns(COLUMNS) == COLUMNS
+        assert select_columns(COLUMNS, "all") == COLUMNS
+        assert [column.title for column in select_columns(COLUMNS, "voice-vlan, PORT")] == ["Voice VLAN", "Port"]
+        with self.assertRaisesRegex(ValueError, "Unknown column speed; choose among port, name, voice-vlan."):
+            select_columns(COLUMNS, "port,speed")
+
+    def test_only_selected_columns_formatted(self):
+        """Test cells of the columns left out are never computed."""
+        failing = Column("Failing", MagicMock(side_effect=AssertionError))
+        renderer = TableRenderer(self.dispatcher, select_columns([*COLUMNS, failing], "port"))
+        assert renderer.render(PORTS) == 200
+        assert self.dispatcher.send_large_table.call_args[0][1][0] == ("1",)
+
+    def test_table_pages(self):
+        """Test a table larger than the budget is split into pages that each fit in a message."""
+        renderer = TableRenderer(self.dispatcher, COLUMNS, title="Ports", budget=2000)
+        assert renderer.render(PORTS) == 200
+        pages = self.dispatcher.send_large_table.call_args_list
+        assert renderer.pages == len(pages) > 1
+        assert sum(len(page[0][1]) for page in pages) == 200
+        assert all(len(draw(*page[0])) <= 2000 for page in pages)
+        assert [page[1]["title"] for page in pages[:2]] == ["Ports", "Ports (page 2)"]
+
+    def test_csv(self):
+        """Test CSV snippets each start with the header and stay within the budget."""
+        TableRenderer(self.dispatcher, COLUMNS, title="Ports", output="csv", budget=1000).render(PORTS)
+        snippets = [call[0][0] for call in self.dispatcher.send_snippet.call_args_list]
+        assert len(snippets) > 1 and all(len(snippet) <= 1000 for snippet in snippets)
+        rows = [row for snippet in snippets for row in csv.reader(io.StringIO(snippet))]
+        assert rows[0] == ["Port", "Name", "Voice VLAN"]
+        assert [row for row in rows if row[0] != "Port"][-1] == ["200", "Port 200", "100"]
+        assert self.dispatcher.send_snippet.call_args_list[0][1]["title"] == "Ports.csv"
+
+    def test_json(self):
+        """Test JSON output has one object per line."""
+        TableRenderer(self.dispatcher, COLUMNS[:1], output="json").render(PORTS[:2])
+        text = self.dispatcher.send_snippet.call_args[0][0]
+        assert [json.loads(line) for line in text.splitlines()] == [{"Port": "1"}, {"Port": "2"}]
+
+    def test_budgets(self):
+        """Test the budget follows the platform, unless configured."""
+        assert message_budget(MagicMock(platform_slug="webex")) == 7439
+        assert message_budget(MagicMock(platform_slug="slack")) > message_budget(MagicMock(platform_slug="webex"))
+        assert message_budget(MagicMock(platform_slug="webex"), 1000) == 1000
+        with self.assertRaises(ValueError):
+            TableRenderer(MagicMock(), COLUMNS, output="xml")
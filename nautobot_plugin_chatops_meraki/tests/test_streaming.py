@@ -0,0 +1,54 @@
+"""Test of streaming.py."""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from ..streaming import TableStream
+
+
+class TestTableStream(unittest.TestCase):
+    """Test tables sent a chunk at a time."""
+
+    def setUp(self):
+        """Record the tables sent."""
+        self.dispatcher = MagicMock()
+
+    def tables(self):
+        """Return the title and rows of every table sent."""
+        return [(call[1]["title"], call[0][1]) for call in self.dispatcher.send_large_table.call_args_list]
+
+    def test_first_batch_sent_early(self):
+        """Test the first batch is sent at once, and later ones wait for the flush interval."""
+        with patch("nautobot_plugin_chatops_meraki.streaming.time.monotonic", side_effect=[0, 1, 10, 10, 11, 11]):
+            with TableStream(self.dispatcher, ["Port"], title="Ports", flush_interval=5) as stream:
+                for batch in ([("1",), ("2",)], [("3",)], [("4",)], [("5",)]):
+                    stream.extend(batch)
+                    stream.batch_done()
+        assert self.tables() == [
+            ("Ports 1-2", [("1",), ("2",)]),
+            ("Ports 3-4", [("3",), ("4",)]),
+            ("Ports 5-5", [("5",)]),
+        ]
+        assert (stream.count, stream.chunks) == (5, 3)
+
+    def test_chunk_size(self):
+        """Test no message holds more than ``chunk_size`` rows."""
+        with TableStream(self.dispatcher, ["Port"], chunk_size=2, flush_interval=3600) as stream:
+            stream.extend((str(port),) for port in range(5))
+        assert [len(rows) for _, rows in self.tables()] == [2, 2, 1]
+        assert self.tables()[0][0] == "Rows 1-2"
+
+    def test_disabled(self):
+        """Test a stream that is not enabled sends its rows as one table, under its plain title."""
+        with TableStream(self.dispatcher, ["Port"], title="Ports", chunk_size=2, enabled=False) as stream:
+            for port in range(5):
+                stream.add((str(port),))
+                stream.batch_done()
+        assert [(title, len(rows)) for title, rows in self.tables()] == [("Ports", 5)]
+
+    def test_single_message(self):
+        """Test rows that fit in the last message keep the plain title, and an empty table is not sent."""
+        with TableStream(self.dispatcher, ["Port"], title="Ports") as stream:
+            stream.add(("1",))
+        with TableStream(self.dispatcher, ["Port"], title="Ports"):
+            pass
+        assert self.tables() == [("Ports", [("1",)])]
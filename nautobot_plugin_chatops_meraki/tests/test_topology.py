@@ -0,0 +1,88 @@
+"""Test of topology.py."""
+import json
+import unittest
+
+from ..inventory import NotFoundError
+from ..records import Device
+from ..topology import Topology, neighbor_entries
+
+DEVICES = [
+    {"name": "fw01-test", "serial": "SN111111", "mac": "e0:55:3d:00:00:01", "lanIp": "10.0.0.1", "model": "MX64"},
+    {"name": "sw01-test", "serial": "SN222222", "mac": "e0:55:3d:00:00:02", "lanIp": "10.0.0.2", "model": "MS220-8P"},
+    {"name": "sw02-test", "serial": "SN333333", "mac": "e0:55:3d:00:00:03", "lanIp": "10.0.0.3", "model": "MS220-8P"},
+    {"name": "sw03-test", "serial": "SN444444", "mac": "e0:55:3d:00:00:04", "lanIp": "10.0.0.4", "model": "MS220-8P"},
+]
+
+NEIGHBORS = {
+    # sw01 reports the firewall by LLDP name and CDP MAC, and sw02 by management address only.
+    "SN222222": [
+        ("8", "cdp", "e0553d000001", "Port 3", "10.0.0.1"),
+        ("8", "lldp", "fw01-test", "3", "10.0.0.1"),
+        ("1", "lldp", "unknown", "1", "10.0.0.3"),
+        ("5", "lldp", "core-router", "Gi0/1", None),
+    ],
+    # sw02 reports sw01 back, on the same link.
+    "SN333333": [("1", "lldp", "sw01-test", "1", "10.0.0.2")],
+}
+
+
+class TestTopology(unittest.TestCase):
+    """Test the LLDP/CDP topology graph."""
+
+    def setUp(self):
+        """Build the graph of a firewall, two connected switches and a lone switch."""
+        self.topology = Topology([Device.from_api(device) for device in DEVICES], NEIGHBORS)
+
+    def test_neighbor_entries(self):  # pylint: disable=no-self-use
+        """Test the neighbors of a device are flattened to one entry per port and protocol."""
+        lldp_cdp = {
+            "ports": {
+                "8": {
+                    "cdp": {"deviceId": "e0553d000001", "portId": "Port 3", "address": "10.0.0.1"},
+                    "lldp": {"systemName": "fw01-test", "portId": "3", "managementAddress": "10.0.0.1"},
+                }
+            }
+        }
+        assert list(neighbor_entries(lldp_cdp)) == [
+            ("8", "cdp", "e0553d000001", "Port 3", "10.0.0.1"),
+            ("8", "lldp", "fw01-test", "3", "10.0.0.1"),
+        ]
+        assert not list(neighbor_entries({}))
+
+    def test_links(self):
+        """Test neighbors resolve to devices by name, MAC or address, and each link is listed once."""
+        assert self.topology.adjacency["SN222222"] == {
+            "SN111111": {"8": "3"},
+            "SN333333": {"1": "1"},
+            "core-router": {"5": "Gi0/1"},
+        }
+        assert sorted(self.topology.links()) == [
+            ("SN111111", "3", "SN222222", "8"),
+            ("SN222222", "1", "SN333333", "1"),
+            ("SN222222", "5", "core-router", "Gi0/1"),
+        ]
+        self.assertCountEqual(self.topology.nodes(), ["SN111111", "SN222222", "SN333333", "core-router"])
+
+    def test_paths(self):
+        """Test upstream and path queries follow the shortest path through the ports of each hop."""
+        sw02 = self.topology.find("sw02-test")
+        assert self.topology.upstream(sw02) == [("SN333333", "1", "SN222222", "1"), ("SN222222", "8", "SN111111", "3")]
+        assert self.topology.path(sw02, self.topology.find("core-router")) == [
+            ("SN333333", "1", "SN222222", "1"),
+            ("SN222222", "5", "core-router", "Gi0/1"),
+        ]
+        assert self.topology.upstream(self.topology.find("SN111111")) == []
+        assert self.topology.upstream(self.topology.find("sw03-test")) is None
+        with self.assertRaises(NotFoundError):
+            self.topology.find("sw04-test")
+
+    def test_exports(self):
+        """Test the graph exports as DOT and node-link JSON."""
+        dot = self.topology.to_dot()
+        assert dot.startswith("graph topology {\n")
+        assert '  "SN222222" [label="sw01-test"];' in dot
+        assert '  "SN111111" -- "SN222222" [taillabel="3", headlabel="8"];' in dot
+        data = json.loads(self.topology.to_json())
+        assert {"id": "SN111111", "name": "fw01-test", "productType": "appliance"} in data["nodes"]
+        assert {"id": "core-router", "name": "core-router", "productType": None} in data["nodes"]
+        assert len(data["links"]) == 3
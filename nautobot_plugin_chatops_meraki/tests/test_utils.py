@@ -1,8 +1,24 @@
 """Test of utils.py."""
+import inspect
+import os
+import threading
+import time
 import unittest
+from types import SimpleNamespace
 from unittest.mock import patch
 
-from ..utils import MerakiClient
+import meraki
+from meraki.rest_session import RestSession
+
+from ..cache import RedisCache
+from ..utils import (
+    GET_PAGES_PARAMETERS,
+    REQUEST_PARAMETERS,
+    MerakiClient,
+    MerakiClientPool,
+    switch_port_statuses_by_switch,
+)
+from .test_cache import FakeRedis
 
 
 class TestUtils(unittest.TestCase):
@@ -74,3 +90,202 @@ class TestUtils(unittest.TestCase):
         ]
         client = MerakiClient(api_key="1234567890")
         assert client.netname_to_id("NTC-TEST", "test-network-name") == "L_987654321"
+
+    @patch("nautobot_plugin_chatops_meraki.utils.MerakiClient.get_meraki_orgs")
+    def test_org_name_to_id_cached(self, mock_orgs):  # pylint: disable=no-self-use
+        """Test organization resolutions are served from the cache."""
+        mock_orgs.return_value = [{"id": "123456", "name": "NTC-TEST"}]
+        client = MerakiClient(api_key="1234567890")
+        assert client.org_name_to_id("NTC-TEST") == "123456"
+        assert client.org_name_to_id("ntc-test") == "123456"
+        assert mock_orgs.call_count == 1
+        assert client.cache.stats["hits"] == 1
+
+    @patch("nautobot_plugin_chatops_meraki.utils.MerakiClient.get_meraki_devices")
+    def test_name_to_serial_miss_refetches(self, mock_devices):  # pylint: disable=no-self-use
+        """Test a name missing from the cached devices triggers a single refetch."""
+        mock_devices.return_value = [{"name": "sw01-test", "serial": "SN987654"}]
+        client = MerakiClient(api_key="1234567890")
+        assert client.name_to_serial("NTC-TEST", "sw01-test") == "SN987654"
+        mock_devices.return_value = [
+            {"name": "sw01-test", "serial": "SN987654"},
+            {"name": "sw02-test", "serial": "SN111111"},
+        ]
+        assert client.name_to_serial("NTC-TEST", "sw02-test") == "SN111111"
+        assert mock_devices.call_count == 2
+        with self.assertRaises(IndexError):
+            client.name_to_serial("NTC-TEST", "sw03-test")
+
+    @patch("nautobot_plugin_chatops_meraki.utils.MerakiClient.org_name_to_id", return_value="123456")
+    def test_iter_meraki_devices_pages(self, _):  # pylint: disable=no-self-use
+        """Test devices are requested lazily, one page at a time, following the cursors issued by the dashboard."""
+        devices = [{"name": f"sw{index:02}", "serial": f"SN{index:06}"} for index in range(7)]
+        pages = {None: (devices[:3], "c1"), "c1": (devices[3:6], "c2"), "c2": (devices[6:], None)}
+        client = MerakiClient(api_key="1234567890")
+
+        def get_devices(org_id, **kwargs):
+            entries, cursor = pages[kwargs.get("startingAfter")]
+            if cursor is not None:
+                client.next_links.url = f"/organizations/{org_id}/devices?perPage=3&startingAfter={cursor}"
+            return entries
+
+        with patch.object(client.dashboard.organizations, "getOrganizationDevices") as mock_get:
+            mock_get.side_effect = get_devices
+            iterator = client.iter_meraki_devices("NTC-TEST", per_page=3)
+            assert next(iterator)["serial"] == "SN000000"
+            assert mock_get.call_count == 1
+            assert [dev["serial"] for dev in iterator][-1] == "SN000006"
+            assert mock_get.call_count == 3
+            mock_get.assert_called_with("123456", perPage=3, total_pages=1, startingAfter="c2")
+
+    @patch("nautobot_plugin_chatops_meraki.utils.MerakiClient.iter_meraki_networks")
+    @patch("nautobot_plugin_chatops_meraki.utils.MerakiClient.iter_meraki_devices")
+    def test_refresh_inventory(self, mock_devices, mock_networks):  # pylint: disable=no-self-use
+        """Test a refresh replaces the cached inventory and resets its age."""
+        mock_devices.return_value = iter([{"name": "sw01-test", "serial": "SN987654"}])
+        mock_networks.return_value = iter([{"name": "test-network-name", "id": "L_987654321"}])
+        client = MerakiClient(api_key="1234567890")
+        assert client.inventory_age("devices", "NTC-TEST") is None
+        client.refresh_inventory("NTC-TEST")
+        assert client.name_to_serial("ntc-test", "sw01-test") == "SN987654"
+        assert client.netname_to_id("NTC-TEST", "test-network-name") == "L_987654321"
+        assert client.inventory_age("devices", "NTC-TEST") < 1
+
+
+class TestSessionAdapters(unittest.TestCase):
+    """Test the adapters relying on the SDK session."""
+
+    def test_installed_sdk(self):  # pylint: disable=no-self-use
+        """Test the installed SDK has the session signatures relied upon, or the public method for port statuses."""
+        dashboard = meraki.DashboardAPI("1234567890", suppress_logging=True, output_log=False)
+        method = switch_port_statuses_by_switch(dashboard)
+        assert method.__name__ == "getOrganizationSwitchPortsStatusesBySwitch"
+        if not hasattr(dashboard.switch, "getOrganizationSwitchPortsStatusesBySwitch"):
+            parameters = tuple(inspect.signature(RestSession.get_pages).parameters)[1:]
+            assert parameters[: len(GET_PAGES_PARAMETERS)] == GET_PAGES_PARAMETERS
+        parameters = tuple(inspect.signature(RestSession.request).parameters)[1:]
+        assert parameters[: len(REQUEST_PARAMETERS)] == REQUEST_PARAMETERS
+
+    def test_stand_in(self):  # pylint: disable=no-self-use
+        """Test the stand-in sends the request through the session."""
+        calls = []
+
+        def get_pages(metadata, url, params=None, total_pages=-1, direction="next"):
+            calls.append((metadata["operation"], url, params, total_pages, direction))
+            return []
+
+        dashboard = SimpleNamespace(switch=SimpleNamespace(), _session=SimpleNamespace(get_pages=get_pages))
+        switch_port_statuses_by_switch(dashboard)("123", perPage=20, serials=["Q2SW-0001"])
+        assert calls == [
+            (
+                "getOrganizationSwitchPortsStatusesBySwitch",
+                "/organizations/123/switch/ports/statuses/bySwitch",
+                {"perPage": 20, "serials[]": ["Q2SW-0001"]},
+                1,
+                "next",
+            )
+        ]
+
+    def test_incompatible_session(self):
+        """Test an SDK changing the session signature is reported instead of failing at request time."""
+        dashboard = SimpleNamespace(
+            switch=SimpleNamespace(), _session=SimpleNamespace(get_pages=lambda url, params=None: [])
+        )
+        with self.assertRaises(NotImplementedError):
+            switch_port_statuses_by_switch(dashboard)
+
+
+class TestRequestCoalescing(unittest.TestCase):
+    """Test identical concurrent read requests share one dashboard call."""
+
+    def setUp(self):
+        """Count the calls made to a slow endpoint."""
+        self.calls = []
+
+        def getOrganizations():  # pylint: disable=invalid-name
+            self.calls.append(1)
+            time.sleep(0.05)
+            return [{"id": "123456", "name": "NTC-TEST"}]
+
+        self.endpoint = getOrganizations
+
+    def client(self, coalescer=None):
+        """Return a client whose organizations endpoint is the slow one."""
+        client = MerakiClient(api_key="1234567890", coalescer=coalescer)
+        client.dashboard.organizations.getOrganizations = self.endpoint
+        return client
+
+    def test_in_process(self):
+        """Test threads of one process share a call in flight."""
+        client = self.client()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.get_meraki_orgs())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(self.calls) == 1
+        assert [len(orgs) for orgs in results] == [1] * 5
+
+    def test_across_workers(self):
+        """Test clients of different workers share a response through Redis."""
+        coalescer = RedisCache(FakeRedis(), ttl=2, poll_interval=0.01)
+        results = []
+        clients = [self.client(coalescer) for _ in range(3)]
+        threads = [
+            threading.Thread(target=lambda client=client: results.append(client.get_meraki_orgs()))
+            for client in clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(self.calls) == 1
+        assert results[0] == results[1] == results[2]
+
+    def test_writes_not_coalesced(self):
+        """Test requests changing the configuration are always sent."""
+        client = self.client()
+        with patch.object(client, "name_to_serial", return_value="SN987654"), patch.object(
+            client, "org_name_to_id", return_value="123456"
+        ), patch.object(client.dashboard.switch, "cycleDeviceSwitchPorts") as mock_cycle:
+            mock_cycle.__name__ = "cycleDeviceSwitchPorts"
+            client.port_cycle("NTC-TEST", "sw01-test", "12")
+            client.port_cycle("NTC-TEST", "sw01-test", "12")
+        assert mock_cycle.call_count == 2
+        mock_cycle.assert_called_with("SN987654", ["12"])
+        assert len(client.flights) == 0
+
+
+class TestMerakiClientPool(unittest.TestCase):
+    """Test the process-wide MerakiClient registry."""
+
+    def test_client_reused_per_api_key(self):
+        """Test a single client is shared per API key."""
+        pool = MerakiClientPool()
+        client = pool.get("1234567890")
+        assert pool.get("1234567890") is client
+        assert pool.get("0987654321") is not client
+        assert pool.stats["created"] == 2
+        assert pool.stats["reused"] == 1
+
+    @patch("nautobot_plugin_chatops_meraki.utils.MerakiClient.close")
+    def test_close(self, mock_close):
+        """Test closing the pool closes every client session."""
+        pool = MerakiClientPool()
+        pool.get("1234567890")
+        pool.get("0987654321")
+        pool.close()
+        assert mock_close.call_count == 2
+        assert pool.stats["closed"] == 2
+        assert len(pool) == 0
+
+    @patch("nautobot_plugin_chatops_meraki.utils.MerakiClient.close")
+    def test_fork_discards_inherited_clients(self, mock_close):
+        """Test clients inherited from a parent process are dropped without being closed."""
+        pool = MerakiClientPool()
+        client = pool.get("1234567890")
+        with patch("nautobot_plugin_chatops_meraki.utils.os.getpid", return_value=os.getpid() + 1):
+            assert pool.get("1234567890") is not client
+        mock_close.assert_not_called()
+        assert pool.stats["discarded_on_fork"] == 1
@@ -0,0 +1,127 @@
+"""Test of worker.py."""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from nautobot_chatops.choices import CommandStatusChoices
+
+from .. import helpers, worker
+from ..inventory import Inventory
+from .test_cache import FakeRedis
+
+DEVICES = [
+    {"name": "sw01-test", "serial": "SN987654", "networkId": "L_12345", "model": "MS220-8P", "tags": ["idf1"]},
+    {"name": "sw02-test", "serial": "SN555555", "networkId": "L_12345", "model": "MS120-24", "tags": ["idf2"]},
+    {"name": "fw01-test", "serial": "SN123456", "networkId": "L_12345", "model": "MX64", "tags": ["idf1"]},
+    {"name": "sw03-test", "serial": "SN666666", "networkId": "L_67890", "model": "MS220-8P", "tags": []},
+]
+
+
+class TestColumnSelection(unittest.TestCase):
+    """Test the column and output arguments of the table subcommands."""
+
+    @patch.object(worker, "device_selected", return_value=True)
+    @patch.object(worker, "get_client")
+    def test_selected_columns(self, mock_get_client, _):  # pylint: disable=no-self-use
+        """Test only the selected columns are sent, in the requested format."""
+        mock_get_client.return_value.get_meraki_device_clients.return_value = [
+            {"mac": "00:11:22:33:44:55", "ip": "10.0.0.1", "vlan": 10, "usage": {"sent": 1}}
+        ]
+        dispatcher = MagicMock(platform_slug="slack")
+        worker.get_clients(dispatcher, "NTC-TEST", "sw01-test", "ip,vlan", "CSV")
+        dispatcher.send_snippet.assert_called_once_with("IP,VLAN\n10.0.0.1,10", title="Clients.csv")
+
+    @patch.object(worker, "device_selected", return_value=True)
+    @patch.object(worker, "get_client")
+    def test_unknown_column(self, mock_get_client, _):  # pylint: disable=no-self-use
+        """Test an unknown column is reported before the dashboard is queried."""
+        dispatcher = MagicMock()
+        status, details = worker.get_switchports(dispatcher, "NTC-TEST", "sw01-test", "port,speed")
+        assert status == CommandStatusChoices.STATUS_FAILED
+        assert details.startswith("Unknown column speed")
+        dispatcher.send_warning.assert_called_once()
+        mock_get_client.return_value.get_meraki_switchports.assert_not_called()
+
+
+class TestDeviceSelection(unittest.TestCase):
+    """Test the selection of a device by name."""
+
+    @patch.object(helpers, "get_client")
+    def test_shared_name(self, mock_get_client):  # pylint: disable=no-self-use
+        """Test a name shared by several devices fails with their serials rather than erroring in the command."""
+        devices = [*DEVICES, {"name": "SW01-test", "serial": "SN777777", "networkId": "L_67890", "model": "MS120-8"}]
+        mock_get_client.return_value.get_device_inventory.return_value = Inventory(devices)
+        assert helpers.device_selected("NTC-TEST", "sw02-test", "switches")
+        assert not helpers.device_selected("NTC-TEST", "sw01-test", "switches")
+        dispatcher = MagicMock()
+        status, details = worker.get_switchports(dispatcher, "NTC-TEST", "sw01-test")
+        assert status == CommandStatusChoices.STATUS_FAILED
+        assert "SN987654, SN777777" in details
+        dispatcher.send_warning.assert_called_once_with(details)
+        dispatcher.prompt_from_menu.assert_not_called()
+        mock_get_client.return_value.get_meraki_switchports.assert_not_called()
+
+
+class TestInventoryPrefetch(unittest.TestCase):
+    """Test the background inventory prefetch job."""
+
+    @patch.object(worker, "django_rq")
+    @patch.object(worker, "get_client")
+    def test_prefetch_refreshes_and_reschedules(self, mock_get_client, mock_django_rq):  # pylint: disable=no-self-use
+        """Test every organization is refreshed, one failure does not stop the others, and the job reschedules."""
+        client = mock_get_client.return_value
+        client.refresh_org_list.return_value = [{"name": "NTC-TEST"}, {"name": "NTC-LAB"}]
+        client.sync_inventory.side_effect = [Exception("500"), "full"]
+        mock_django_rq.get_connection.return_value.set.return_value = True
+        with patch.dict(worker.PLUGIN_SETTINGS, {"prefetch_interval": 600, "prefetch_orgs": []}):
+            worker.prefetch_meraki_inventory()
+        assert [call[0][0] for call in client.sync_inventory.call_args_list] == ["NTC-TEST", "NTC-LAB"]
+        mock_django_rq.get_connection.return_value.set.assert_called_with(worker.PREFETCH_PENDING_KEY, 1, ex=1200)
+        mock_django_rq.get_connection.return_value.delete.assert_not_called()
+        mock_django_rq.get_queue.return_value.enqueue_in.assert_called_once()
+
+    @patch.object(worker, "django_rq")
+    @patch.object(worker, "get_client")
+    def test_no_concurrent_prefetch(self, mock_get_client, mock_django_rq):  # pylint: disable=no-self-use
+        """Test a command sent during a prefetch neither enqueues another one nor stops the job from rescheduling."""
+        redis = FakeRedis()
+        mock_django_rq.get_connection.return_value = redis
+        queue = mock_django_rq.get_queue.return_value
+        with patch.dict(worker.PLUGIN_SETTINGS, {"prefetch_interval": 600, "prefetch_orgs": ["NTC-TEST"]}):
+            assert worker.schedule_inventory_prefetch(delay=0) is queue.enqueue.return_value
+            mock_get_client.return_value.sync_inventory.side_effect = lambda *args, **kwargs: (
+                worker.schedule_inventory_prefetch(delay=0)
+            )
+            worker.prefetch_meraki_inventory()
+        queue.enqueue.assert_called_once()
+        queue.enqueue_in.assert_called_once()
+        assert redis.get(worker.PREFETCH_PENDING_KEY) == 1
+
+    @patch.object(worker, "build_client_index")
+    @patch.object(worker, "load_client_index")
+    @patch.object(worker, "django_rq")
+    @patch.object(worker, "get_client")
+    def test_prefetch_refreshes_client_index(
+        self, mock_get_client, mock_django_rq, mock_load, mock_build
+    ):  # pylint: disable=no-self-use
+        """Test client indexes are rebuilt only once they are older than the client index interval."""
+        client = mock_get_client.return_value
+        client.refresh_org_list.return_value = [{"name": "NTC-TEST"}, {"name": "NTC-LAB"}, {"name": "NTC-NEW"}]
+        mock_django_rq.get_connection.return_value.set.return_value = True
+        mock_load.side_effect = [
+            MagicMock(built_at=worker.time.time() - 700),
+            MagicMock(built_at=worker.time.time() - 60),
+            None,
+        ]
+        with patch.dict(worker.PLUGIN_SETTINGS, {"prefetch_interval": 600, "client_index_interval": 600}):
+            worker.prefetch_meraki_inventory()
+        assert [call[0][1] for call in mock_build.call_args_list] == ["NTC-TEST", "NTC-NEW"]
+
+    @patch.object(worker, "django_rq")
+    def test_schedule_once(self, mock_django_rq):  # pylint: disable=no-self-use
+        """Test nothing is enqueued while a prefetch is already pending or when prefetching is disabled."""
+        mock_django_rq.get_connection.return_value.set.return_value = None
+        with patch.dict(worker.PLUGIN_SETTINGS, {"prefetch_interval": 600}):
+            assert worker.schedule_inventory_prefetch(delay=0) is None
+        with patch.dict(worker.PLUGIN_SETTINGS, {"prefetch_interval": 0}):
+            assert worker.schedule_inventory_prefetch(delay=0) is None
+        mock_django_rq.get_queue.assert_not_called()
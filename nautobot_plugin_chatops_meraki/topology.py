@@ -0,0 +1,169 @@
+"""Network topology of an organization, as a graph of the LLDP and CDP adjacencies reported by its devices."""
+
+import collections
+import json
+
+from .inventory import Inventory, NotFoundError, normalize_mac, product_type
+
+# Fields of the remote device name, port and address in the neighbor reports of each discovery protocol.
+NEIGHBOR_FIELDS = {
+    "lldp": ("systemName", "portId", "managementAddress"),
+    "cdp": ("deviceId", "portId", "address"),
+}
+# Product types a topology is crawled from, and those its upstream paths lead to.
+CRAWLED_PRODUCT_TYPES = ("switch", "appliance")
+ROOT_PRODUCT_TYPES = ("appliance",)
+
+
+def neighbor_entries(lldp_cdp):
+    """Yield a ``(local_port, protocol, remote_name, remote_port, remote_address)`` tuple per reported neighbor."""
+    for local_port, protocols in (lldp_cdp or {}).get("ports", {}).items():
+        for protocol, details in protocols.items():
+            if protocol in NEIGHBOR_FIELDS:
+                yield (local_port, protocol, *(details.get(field) for field in NEIGHBOR_FIELDS[protocol]))
+
+
+class Topology:
+    """Undirected graph of the devices of an organization and of the neighbors they report.
+
+    Neighbors are matched to devices of the inventory by name, then by MAC address (CDP device IDs of Meraki devices
+    are their MAC address) and by LAN IP address; other neighbors become nodes of their own, named as reported. Each
+    node maps its neighbors to the ports linking them, ``{local_port: remote_port}``, so path queries are breadth-first
+    searches over dictionaries.
+    """
+
+    def __init__(self, devices, neighbors):
+        """Build the graph of an inventory of devices, given the neighbor entries reported by serial."""
+        self.inventory = devices if isinstance(devices, Inventory) else Inventory(devices)
+        self.by_lan_ip = {dev["lanIp"]: dev for dev in self.inventory if dev.get("lanIp")}
+        self.adjacency = collections.defaultdict(dict)
+        for serial, entries in neighbors.items():
+            links = {}
+            for local_port, protocol, remote_name, remote_port, remote_address in entries:
+                remote = self.resolve(remote_name, remote_address)
+                # A port seen by both protocols is linked once, as LLDP reports it.
+                if remote not in (None, serial) and (protocol == "lldp" or local_port not in links):
+                    links[local_port] = (remote, remote_port)
+            for local_port, (remote, remote_port) in links.items():
+                self.adjacency[serial].setdefault(remote, {})[local_port] = remote_port
+                # The remote device's own report, when it has one, names its ports best.
+                self.adjacency[remote].setdefault(serial, {}).setdefault(remote_port, local_port)
+
+    def resolve(self, remote_name, remote_address=None):
+        """Return the node of a reported neighbor: the serial of a known device, or else its reported name."""
+        if remote_name:
+            matches = self.inventory.by_name.get(remote_name.lower())
+            if matches:
+                return matches[0]["serial"]
+            device = self.inventory.by_mac.get(normalize_mac(remote_name))
+            if device is not None:
+                return device["serial"]
+        if remote_address in self.by_lan_ip:
+            return self.by_lan_ip[remote_address]["serial"]
+        return remote_name or remote_address or None
+
+    def device(self, node):
+        """Return the inventory entry of a node, or None for a neighbor outside the inventory."""
+        return self.inventory.by_id.get(node.lower())
+
+    def name(self, node):
+        """Return the name of a node."""
+        device = self.device(node)
+        return (device["name"] if device else None) or node
+
+    def find(self, name):
+        """Return the node of a device name or serial, or of a neighbor outside the inventory.
+
+        Raises:
+            NotFoundError: when no node has that name.
+        """
+        device = self.inventory.by_id.get(name.lower())
+        if device is None and self.inventory.by_name.get(name.lower()):
+            device = self.inventory.get_by_name(name)
+        if device is not None:
+            return device["serial"]
+        if name in self.adjacency:
+            return name
+        raise NotFoundError(f"No device or neighbor named {name!r} is in the topology.")
+
+    def is_root(self, node):
+        """Return whether upstream paths end at a node."""
+        device = self.device(node)
+        return device is not None and product_type(device) in ROOT_PRODUCT_TYPES
+
+    def _search(self, source, is_target):
+        """Return the hops of the shortest path from a node to the first one ``is_target`` accepts, or None."""
+        previous = {source: None}
+        queue = collections.deque([source])
+        while queue:
+            node = queue.popleft()
+            if is_target(node):
+                path = [node]
+                while previous[path[-1]] is not None:
+                    path.append(previous[path[-1]])
+                return self._hops(path[::-1])
+            for neighbor in self.adjacency.get(node, {}):
+                if neighbor not in previous:
+                    previous[neighbor] = node
+                    queue.append(neighbor)
+        return None
+
+    def _hops(self, path):
+        """Return the ``(node, local_port, next_node, remote_port)`` hops along a path of nodes."""
+        hops = []
+        for node, next_node in zip(path, path[1:]):
+            local_port, remote_port = next(iter(self.adjacency[node][next_node].items()))
+            hops.append((node, local_port, next_node, remote_port))
+        return hops
+
+    def path(self, source, target):
+        """Return the hops of the shortest path between two nodes, or None when they are not connected."""
+        return self._search(source, lambda node: node == target)
+
+    def upstream(self, node):
+        """Return the hops from a node to the nearest appliance, or None when none can be reached."""
+        return self._search(node, self.is_root)
+
+    def links(self):
+        """Yield every link once, as ``(node, local_port, other_node, remote_port)``."""
+        for node in self.nodes():
+            for other, ports in self.adjacency[node].items():
+                # Links reported from both ends were already yielded from the node sorted first.
+                yielded = set(self.adjacency[other][node].values()) if other < node else set()
+                for local_port, remote_port in ports.items():
+                    if local_port not in yielded:
+                        yield node, local_port, other, remote_port
+
+    def nodes(self):
+        """Return every node with a link, in a stable order."""
+        return sorted(self.adjacency)
+
+    def to_json(self):
+        """Return the graph in the node-link JSON format read by graph tools such as D3 and NetworkX."""
+        data = {
+            "nodes": [
+                {
+                    "id": node,
+                    "name": self.name(node),
+                    "productType": product_type(self.device(node)) if self.device(node) else None,
+                }
+                for node in self.nodes()
+            ],
+            "links": [
+                {"source": node, "sourcePort": local_port, "target": other, "targetPort": remote_port}
+                for node, local_port, other, remote_port in self.links()
+            ],
+        }
+        return json.dumps(data, indent=2)
+
+    def to_dot(self):
+        """Return the graph in the Graphviz DOT language."""
+        lines = ["graph topology {"]
+        lines.extend(f"  {json.dumps(node)} [label={json.dumps(self.name(node))}];" for node in self.nodes())
+        lines.extend(
+            f"  {json.dumps(node)} -- {json.dumps(other)} [taillabel={json.dumps(str(local_port))}, "
+            f"headlabel={json.dumps(str(remote_port or ''))}];"
+            for node, local_port, other, remote_port in self.links()
+        )
+        lines.append("}")
+        return "\n".join(lines)
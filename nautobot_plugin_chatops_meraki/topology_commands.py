@@ -0,0 +1,125 @@
+"""Meraki subcommand answering questions from the LLDP/CDP topology of an organization."""
+
+import time
+
+from nautobot_chatops.choices import CommandStatusChoices
+from nautobot_chatops.workers import subcommand_of
+
+from .helpers import (
+    LOGGER,
+    PLUGIN_SETTINGS,
+    device_selected,
+    get_client,
+    get_topology_store,
+    meraki_logo,
+    progress_reporter,
+    prompt_for_device,
+    prompt_for_organization,
+    run_async,
+)
+from .metrics import instrumented
+from .topology import CRAWLED_PRODUCT_TYPES, Topology, neighbor_entries
+
+
+def load_topology(client, org_name, max_age=None, dispatcher=None):
+    """Return the topology of the switches and appliances of an organization, refreshing it incrementally.
+
+    The neighbors each device reported are stored along with when they were queried. Only the devices added to the
+    inventory since, and those whose neighbors are more than ``max_age`` seconds old (``topology_max_age`` by
+    default, ``0`` for never), are queried again, concurrently; the others are reused as stored. Returns the
+    topology and the number of devices queried.
+    """
+    max_age = PLUGIN_SETTINGS.get("topology_max_age", 3600) if max_age is None else max_age
+    inventory = client.get_device_inventory(org_name)
+    devices = [dev["serial"] for product in CRAWLED_PRODUCT_TYPES for dev in inventory.of_type(product)]
+    key = ("topology", org_name.lower())
+    stored = dict((get_topology_store().get(key) or {}).get("devices", {}))
+    now = time.time()
+    stale = [serial for serial in devices if serial not in stored or (max_age and now - stored[serial][0] >= max_age)]
+    if stale:
+        results = run_async(
+            lambda aio_client: aio_client.for_each_serial(
+                aio_client.dashboard.devices.getDeviceLldpCdp,
+                stale,
+                org_id=client.org_name_to_id(org_name),
+                progress=progress_reporter(dispatcher, len(stale), "devices") if dispatcher else None,
+            )
+        )
+        for serial, result in results.items():
+            if isinstance(result, Exception):
+                LOGGER.warning("Unable to query the neighbors of %s: %s", serial, result)
+            else:
+                stored[serial] = [now, list(neighbor_entries(result))]
+    # Devices removed from the inventory leave the topology.
+    stored = {serial: stored[serial] for serial in devices if serial in stored}
+    if stale:
+        get_topology_store().set(key, {"devices": stored})
+    topology = Topology(inventory, {serial: entries for serial, (_, entries) in stored.items()})
+    return topology, len(stale)
+
+
+TOPOLOGY_QUERIES = [
+    ("What is upstream of a device", "upstream"),
+    ("Path between two devices", "path"),
+    ("Export as DOT", "dot"),
+    ("Export as JSON", "json"),
+]
+
+
+@subcommand_of("meraki")
+@instrumented
+def get_topology(
+    dispatcher, org_name=None, query=None, device_name=None, other_device_name=None
+):  # pylint: disable=too-many-return-statements
+    """Answer upstream and path questions from the LLDP/CDP topology of an organization, or export it as DOT or JSON."""
+    LOGGER.info("ORG NAME: %s", org_name)
+    LOGGER.info("QUERY: %s %s %s", query, device_name, other_device_name)
+    if not org_name:
+        return prompt_for_organization(dispatcher, "meraki get-topology")
+    if query not in dict(TOPOLOGY_QUERIES).values():
+        dispatcher.prompt_from_menu(f"meraki get-topology '{org_name}'", "Select a question", TOPOLOGY_QUERIES)
+        return False
+    command = f"meraki get-topology '{org_name}' {query}"
+    if query in ("upstream", "path") and not device_selected(org_name, device_name):
+        return prompt_for_device(dispatcher, command, org_name, query=device_name)
+    if query == "path" and not device_selected(org_name, other_device_name):
+        return prompt_for_device(dispatcher, f"{command} '{device_name}'", org_name, query=other_device_name)
+    topology, queried = load_topology(get_client(), org_name, dispatcher=dispatcher)
+    blocks = [
+        *dispatcher.command_response_header(
+            "meraki",
+            "get-topology",
+            [
+                ("Org Name", org_name),
+                ("Question", dict((value, title) for title, value in TOPOLOGY_QUERIES)[query]),
+                *[("Device Name", name) for name in (device_name, other_device_name) if name],
+            ],
+            "LLDP/CDP Topology",
+            meraki_logo(dispatcher),
+        ),
+    ]
+    dispatcher.send_blocks(blocks)
+    summary = f"{len(topology.nodes())} devices and {sum(1 for _ in topology.links())} links"
+    if query in ("dot", "json"):
+        export = topology.to_dot() if query == "dot" else topology.to_json()
+        dispatcher.send_snippet(export, title=f"{org_name} topology.{query}")
+        return CommandStatusChoices.STATUS_SUCCEEDED, f"Exported {summary}, {queried} devices queried."
+    source = topology.find(device_name)
+    if query == "upstream":
+        hops = topology.upstream(source)
+        missing = f"{device_name} has no path to an appliance."
+    else:
+        hops = topology.path(source, topology.find(other_device_name))
+        missing = f"{device_name} and {other_device_name} are not connected."
+    if not hops:
+        message = missing if hops is None else f"{device_name} is itself the end of the path."
+        dispatcher.send_markdown(message)
+        return CommandStatusChoices.STATUS_SUCCEEDED, message
+    dispatcher.send_large_table(
+        ["Hop", "Device", "Port", "Next Device", "Next Device Port"],
+        [
+            (number, topology.name(node), local_port, topology.name(next_node), remote_port)
+            for number, (node, local_port, next_node, remote_port) in enumerate(hops, 1)
+        ],
+    )
+    return CommandStatusChoices.STATUS_SUCCEEDED, f"{len(hops)} hops, from a topology of {summary}."
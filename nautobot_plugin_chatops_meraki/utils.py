@@ -1,79 +1,788 @@
 """Utilities for Meraki SDK."""
 
+import atexit
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
 import meraki
 
+from .cache import SingleFlight, TTLCache, current_fetches
+from .inventory import PRODUCT_TYPES, Inventory
+from .metrics import api_call, endpoint_name, register_orgs, shared_call, span
+from .records import Device, Network, Organization, SwitchPort
+
+# Largest page size accepted by the organization devices and network clients endpoints.
+PAGE_SIZE = 1000
+# Seconds of changes read again by every incremental inventory sync, to absorb clock differences with the dashboard.
+SYNC_OVERLAP = 120
+# Largest page sizes, in switches, of the organization-wide switch port configuration and status endpoints.
+SWITCH_PORTS_PAGE_SIZE = 50
+SWITCH_PORT_STATUSES_PAGE_SIZE = 20
+
+
+# Leading parameters of the SDK's ``RestSession`` methods relied upon by ``switch_port_statuses_by_switch`` and
+# ``record_next_links``.
+GET_PAGES_PARAMETERS = ("metadata", "url", "params", "total_pages", "direction")
+REQUEST_PARAMETERS = ("metadata", "method", "url")
+
+
+def _check_session_method(method, expected, name):
+    """Raise NotImplementedError unless a method of the SDK session takes the ``expected`` leading parameters."""
+    parameters = tuple(inspect.signature(method).parameters)
+    if parameters[: len(expected)] != expected:
+        raise NotImplementedError(f"meraki {meraki.__version__} has no compatible {name}; upgrade the meraki package.")
+
+
+def switch_port_statuses_by_switch(dashboard):
+    """Return the SDK method listing the port statuses of the switches of an organization.
+
+    The meraki SDK lacks a public ``switch.getOrganizationSwitchPortsStatusesBySwitch`` up to at least 1.22, so
+    older releases get a stand-in of the same name sending the request through the SDK session, retried and logged
+    like any other SDK call. The stand-in is only built when ``RestSession.get_pages`` still takes
+    ``GET_PAGES_PARAMETERS``, and otherwise the SDK must be upgraded.
+
+    Raises:
+        NotImplementedError: the SDK has neither the public method nor a compatible session.
+    """
+    method = getattr(dashboard.switch, "getOrganizationSwitchPortsStatusesBySwitch", None)
+    if method is not None:
+        return method
+
+    session = dashboard._session  # pylint: disable=protected-access
+    _check_session_method(session.get_pages, GET_PAGES_PARAMETERS, "RestSession.get_pages")
+
+    # pylint: disable-next=invalid-name
+    def getOrganizationSwitchPortsStatusesBySwitch(organizationId, total_pages=1, direction="next", **kwargs):
+        params = {f"{key}[]" if key in ("networkIds", "serials") else key: value for key, value in kwargs.items()}
+        return session.get_pages(
+            {
+                "tags": ["switch", "monitor", "ports", "statuses", "bySwitch"],
+                "operation": "getOrganizationSwitchPortsStatusesBySwitch",
+            },
+            f"/organizations/{organizationId}/switch/ports/statuses/bySwitch",
+            params,
+            total_pages,
+            direction,
+        )
+
+    return getOrganizationSwitchPortsStatusesBySwitch
 
-class MerakiClient:
+
+class NextLinks(threading.local):  # pylint: disable=too-few-public-methods
+    """The ``next`` link of the last dashboard response received by each thread, None after the last page."""
+
+    url = None
+
+    def record(self, response):
+        """Keep the ``next`` link of a response."""
+        self.url = None if response is None else response.links.get("next", {}).get("url")
+
+
+def record_next_links(dashboard):
+    """Return the NextLinks recording the ``Link`` headers of the responses received by a Dashboard API.
+
+    The SDK methods only return the entries of a page, while the cursor of the next page is issued by the dashboard
+    in the ``Link`` header, which the SDK has no public method to read. ``RestSession.request`` is wrapped to record
+    it, as long as it still takes ``REQUEST_PARAMETERS``.
+
+    Raises:
+        NotImplementedError: the SDK session is not compatible.
+    """
+    session = dashboard._session  # pylint: disable=protected-access
+    _check_session_method(session.request, REQUEST_PARAMETERS, "RestSession.request")
+    links = NextLinks()
+    request = session.request
+
+    @functools.wraps(request)
+    def record_request(metadata, method, url, **kwargs):
+        response = request(metadata, method, url, **kwargs)
+        links.record(response)
+        return response
+
+    session.request = record_request
+    return links
+
+
+class MerakiClient:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """Meraki client class."""
 
-    def __init__(self, api_key=None):
-        """Class constructor."""
-        self.dashboard = meraki.DashboardAPI(suppress_logging=True, api_key=api_key)
+    def __init__(
+        self,
+        api_key=None,
+        cache_ttl=300,
+        cache_maxsize=256,
+        scheduler=None,
+        shared_cache=None,
+        keep_raw=False,
+        base_url=meraki.DEFAULT_BASE_URL,
+        coalescer=None,
+    ):  # pylint: disable=too-many-arguments
+        """Class constructor.
+
+        Organizations, networks, devices and switch port configurations are returned as compact records;
+        ``keep_raw`` also keeps the full API responses on them. ``coalescer``, a RedisCache, lets identical read
+        requests issued by several workers at once share a single dashboard call.
+        """
+        self.dashboard = meraki.DashboardAPI(suppress_logging=True, api_key=api_key, base_url=base_url)
+        self.next_links = record_next_links(self.dashboard)
+        self._key_digest = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+        self.flights = SingleFlight()
+        self.coalescer = coalescer
+        self.cache = TTLCache(ttl=cache_ttl, maxsize=cache_maxsize)
+        self.scheduler = scheduler
+        self.shared_cache = shared_cache
+        self.keep_raw = keep_raw
+        self.fetched_at = {}
+        self.sync_state = {}
+
+    def close(self):
+        """Close the HTTP session (and its pooled connections) held by the Dashboard API."""
+        req_session = getattr(getattr(self.dashboard, "_session", None), "_req_session", None)
+        if req_session is not None:
+            req_session.close()
+
+    def _call(self, org_id, method, *args, **kwargs):
+        """Call a dashboard endpoint once the organization's request budget allows it.
+
+        Identical read requests made concurrently share a single call: within the process through ``flights``, and
+        across workers through the ``coalescer`` when one is configured. Within a chat command, a read request is
+        only sent once; any change made through the dashboard makes later reads send their requests again.
+        """
+        endpoint = endpoint_name(method)
+        fetches = current_fetches()
+        if not endpoint.startswith("get"):
+            if fetches is not None:
+                fetches.clear("call")
+            return self._request(org_id, method, *args, **kwargs)
+        key = self._request_key(endpoint, args, kwargs)
+        # Pages are kept by the inventory caches as records, rather than here as raw responses.
+        fetches = None if "perPage" in kwargs else fetches
+        value = None if fetches is None else fetches.get(key)
+        if value is not None:
+            return value
+        value, shared = self.flights.do(key, lambda: self._coalesced(key, org_id, method, *args, **kwargs))
+        if shared:
+            shared_call(endpoint)
+        if fetches is not None:
+            fetches.set(key, value)
+        return value
+
+    def _request(self, org_id, method, *args, **kwargs):
+        """Send a dashboard request, paced by the scheduler."""
+        if self.scheduler is not None:
+            with span("wait"):
+                self.scheduler.acquire(org_id)
+        with api_call(endpoint_name(method)):
+            return method(*args, **kwargs)
+
+    def _request_key(self, endpoint, args, kwargs):
+        """Return the key identifying a request made with this client's API key."""
+        request = json.dumps([args, kwargs], sort_keys=True, default=str)
+        return ("call", self._key_digest, endpoint, hashlib.sha256(request.encode()).hexdigest())
+
+    def _coalesced(self, key, org_id, method, *args, **kwargs):
+        """Send a request, or wait for the same request in flight in another worker and share its response."""
+        if self.coalescer is None:
+            return self._request(org_id, method, *args, **kwargs)
+        sent = []
+
+        def load():
+            sent.append(True)
+            return self._request(org_id, method, *args, **kwargs)
+
+        value = self.coalescer.get_or_load(key, load)
+        if not sent:
+            shared_call(endpoint_name(method))
+        return value
+
+    def _records(self, record_class, entries):
+        """Convert API response dicts, or rows read back from the shared cache, into records."""
+        return [
+            record_class.from_row(entry) if isinstance(entry, list) else record_class.from_api(entry, self.keep_raw)
+            for entry in entries
+        ]
+
+    def _rows(self, records):
+        """Return the compact form of records stored in the shared cache (full responses when they are kept)."""
+        return [record.raw if self.keep_raw else record.to_row() for record in records]
+
+    def _shared(self, key, record_class, loader):
+        """Serve an inventory response from the shared cache when one is configured, recording when it was fetched.
+
+        Concurrent loads of the same inventory within the process share one download.
+        """
+        return self.flights.do(("inventory", *key), lambda: self._load_shared(key, record_class, loader))[0]
+
+    def _load_shared(self, key, record_class, loader):
+        """Load an inventory response through the shared cache, if any."""
+        if self.shared_cache is None:
+            records, fetched_at = self._records(record_class, loader()), time.time()
+        else:
+            rows, fetched_at = self.shared_cache.get_or_load_entry(
+                key, lambda: self._rows(self._records(record_class, loader()))
+            )
+            records = self._records(record_class, rows)
+        self.fetched_at[key] = fetched_at
+        return records
+
+    def inventory_age(self, kind, org_name=None, product_type=None):
+        """Return how many seconds ago the orgs, devices or networks inventory in use was fetched, or None.
+
+        The age of the devices of a product type is the one of the full device inventory when they were taken from it.
+        """
+        if org_name is None:
+            fetched_at = self.fetched_at.get((kind,))
+        else:
+            fetched_at = self.fetched_at.get(self._scope(kind, org_name, product_type))
+            if fetched_at is None and product_type is not None:
+                fetched_at = self.fetched_at.get((kind, org_name.lower()))
+        return None if fetched_at is None else max(0.0, time.time() - fetched_at)
+
+    @staticmethod
+    def _scope(kind, org_name, product_type=None):
+        """Return the cache key of the inventory of an organization, narrowed to one product type if given."""
+        scope = (kind, org_name.lower())
+        return scope if product_type is None else (*scope, product_type)
+
+    def _store(self, scope, kind, record_class, entries):
+        """Replace an inventory in every cache level with freshly downloaded entries and return it."""
+        records = self._records(record_class, entries)
+        if self.shared_cache is not None:
+            self.shared_cache.set(scope, self._rows(records))
+        self.fetched_at[scope] = time.time()
+        inventory = Inventory(records, kind=kind)
+        self._keep(scope, inventory)
+        return inventory
+
+    def refresh_org_list(self):
+        """Download the organizations again, store them in every cache level and return them."""
+        orgs = self._call(None, self.dashboard.organizations.getOrganizations)
+        register_orgs(orgs)
+        return self._store(("orgs",), "organization", Organization, orgs).entries
+
+    def refresh_inventory(self, org_name):
+        """Download the networks and devices of an organization again and store them in every cache level.
+
+        Readers keep being served the previous data until the new lists replace it.
+        """
+        self._store_devices(org_name, self.iter_meraki_devices(org_name))
+        self._store(("networks", org_name.lower()), "network", Network, self.iter_meraki_networks(org_name))
+
+    def _store_devices(self, org_name, entries):
+        """Store the devices of an organization, and its devices of each product type, in every cache level."""
+        devices = self._store(("devices", org_name.lower()), "device", Device, entries)
+        # The devices of each product type are stored as well, so typed lookups never fall back to the dashboard.
+        for product in {*PRODUCT_TYPES, *devices.by_product_type} - {None}:
+            self._store(
+                self._scope("devices", org_name, product), f"{product} device", Device, devices.of_type(product)
+            )
+
+    def sync_inventory(self, org_name, full_interval=3600):
+        """Bring the cached networks and devices of an organization up to date, and return how it was done.
+
+        Once a full refresh has been made, later syncs read the configuration change log since the previous sync
+        and only download the devices whose configuration changed, which usually costs one or two requests instead
+        of every page of the inventory. A full refresh (``"full"``) is made again every ``full_interval`` seconds,
+        when the cached inventory is gone, or when the change log shows changes the devices list cannot reflect:
+        organization-wide changes, removals and renamed networks. Otherwise the result is ``"incremental"``, or
+        ``"unchanged"`` when the change log is empty.
+        """
+        scope = org_name.lower()
+        state = self._load_sync_state(scope)
+        now = time.time()
+        devices = self._known(scope, "devices", Device)
+        networks = self._known(scope, "networks", Network)
+        if state is None or devices is None or networks is None or now - state["full_at"] >= full_interval:
+            self.refresh_inventory(org_name)
+            self._save_sync_state(scope, {"synced_at": now, "full_at": now}, full_interval)
+            return "full"
+        since = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(state["synced_at"] - SYNC_OVERLAP))
+        org_id = self.org_name_to_id(org_name)
+        changes = self._call(
+            org_id, self.dashboard.organizations.getOrganizationConfigurationChanges, org_id, t0=since, total_pages=-1
+        )
+        if any(self._is_structural(change) for change in changes):
+            self.refresh_inventory(org_name)
+            self._save_sync_state(scope, {"synced_at": now, "full_at": now}, full_interval)
+            return "full"
+        if changes:
+            updated = {
+                dev["serial"]: dev for dev in self.iter_meraki_devices(org_name, configurationUpdatedAfter=since)
+            }
+            devices = [updated.pop(dev["serial"], dev) for dev in devices] + list(updated.values())
+        # Stored again even when unchanged, so the cached lists are known to be current and do not expire.
+        self._store_devices(org_name, devices)
+        self._store(("networks", scope), "network", Network, networks)
+        self._save_sync_state(scope, {"synced_at": now, "full_at": state["full_at"]}, full_interval)
+        return "incremental" if changes else "unchanged"
+
+    @staticmethod
+    def _is_structural(change):
+        """Return whether a change log entry may add or remove devices or networks, or rename a network."""
+        text = f"{change.get('page') or ''} {change.get('label') or ''}".lower()
+        return not change.get("networkId") or any(word in text for word in ("remov", "unclaim", "network name"))
+
+    def _known(self, scope, kind, record_class):
+        """Return the cached networks or devices of an organization, or None when no cache level holds them."""
+        inventory = self._cached((kind, scope))
+        if inventory is not None:
+            return inventory.entries
+        rows = None if self.shared_cache is None else self.shared_cache.get((kind, scope))
+        return None if rows is None else self._records(record_class, rows)
+
+    def _load_sync_state(self, scope):
+        """Return when an organization was last synced and last fully refreshed, or None."""
+        if self.shared_cache is None:
+            return self.sync_state.get(scope)
+        return self.shared_cache.get(("sync", scope))
+
+    def _save_sync_state(self, scope, state, full_interval):
+        """Record when an organization was synced, for every worker when the shared cache is enabled."""
+        if self.shared_cache is None:
+            self.sync_state[scope] = state
+        elif full_interval > 0:
+            self.shared_cache.set(("sync", scope), state, ttl=int(full_interval))
+
+    @staticmethod
+    def _fetched(scope):
+        """Return the Inventory of a scope downloaded earlier in the running command, or None."""
+        fetches = current_fetches()
+        return None if fetches is None else fetches.get(("inventory", *scope))
+
+    def _cached(self, scope):
+        """Return the Inventory of a scope downloaded earlier in the running command or still cached, or None."""
+        inventory = self._fetched(scope)
+        return inventory if inventory is not None else self.cache.get(scope)
+
+    def _keep(self, scope, inventory):
+        """Cache a freshly downloaded Inventory, and keep it for the rest of the running command."""
+        self.cache.set(scope, inventory)
+        fetches = current_fetches()
+        if fetches is not None:
+            fetches.set(("inventory", *scope), inventory)
+
+    def _inventory(self, scope, kind, loader, refresh=False):
+        """Return the cached Inventory for a scope, downloading and indexing it when needed."""
+        inventory = None if refresh else self._cached(scope)
+        if inventory is None:
+            inventory = Inventory(loader(), kind=kind)
+            self._keep(scope, inventory)
+        return inventory
+
+    def _resolve(self, scope, kind, loader, name):
+        """Resolve a name within a cached scope, refetching the scope once when the name is not found."""
+        inventory = self._fetched(scope)
+        if inventory is not None:
+            # Downloaded by this very command, so a new download would not know the name either.
+            return inventory.get_by_name(name)
+        inventory = self.cache.get(scope)
+        if inventory is not None:
+            if name in inventory:
+                return inventory.get_by_name(name)
+            # The inventory may have changed since it was cached, so a miss always triggers a fresh download.
+            self.cache.invalidate(scope)
+            if self.shared_cache is not None:
+                self.shared_cache.invalidate(scope)
+        return self._inventory(scope, kind, loader, refresh=True).get_by_name(name)
+
+    def get_org_inventory(self):
+        """Return the indexed list of organizations."""
+        return self._inventory(("orgs",), "organization", self.get_meraki_orgs)
+
+    def get_device_inventory(self, org_name, product_type=None):
+        """Return the indexed list of devices of an organization, or of its devices of one product type.
+
+        The devices of a product type are taken from the full inventory when it is cached, and otherwise downloaded
+        with the dashboard filtering them, so listing the firewalls of an organization never downloads its switches.
+        """
+        if product_type is None:
+            return self._inventory(("devices", org_name.lower()), "device", lambda: self.get_meraki_devices(org_name))
+        return self._inventory(
+            self._scope("devices", org_name, product_type),
+            f"{product_type} device",
+            lambda: self._typed_devices(org_name, product_type),
+        )
+
+    def _typed_devices(self, org_name, product_type):
+        """Return the devices of a product type from the cached full inventory, or from the dashboard."""
+        inventory = self._cached(("devices", org_name.lower()))
+        if inventory is not None:
+            return inventory.of_type(product_type)
+        return self.get_meraki_devices(org_name, product_type)
+
+    def get_network_inventory(self, org_name):
+        """Return the indexed list of networks of an organization."""
+        return self._inventory(
+            ("networks", org_name.lower()), "network", lambda: self.get_meraki_networks_by_org(org_name)
+        )
 
     def org_name_to_id(self, org_name):
         """Translate Org Name to Org Id."""
-        return [org["id"] for org in self.get_meraki_orgs() if org["name"].lower() == org_name.lower()][0]
+        with span("resolve_org"):
+            return self._resolve(("orgs",), "organization", self.get_meraki_orgs, org_name)["id"]
 
-    def name_to_serial(self, org_name, device_name):
-        """Translate Name to Serial."""
-        return [
-            dev["serial"] for dev in self.get_meraki_devices(org_name) if dev["name"].lower() == device_name.lower()
-        ][0]
+    def name_to_serial(self, org_name, device_name, product_type=None):
+        """Translate Name to Serial.
+
+        Given the product type the device must have, only the devices of that type are downloaded when the full
+        inventory of the organization is not cached.
+        """
+        with span("resolve_serial"):
+            if product_type is None or self._cached(("devices", org_name.lower())) is not None:
+                return self._resolve(
+                    ("devices", org_name.lower()), "device", lambda: self.get_meraki_devices(org_name), device_name
+                )["serial"]
+            return self._resolve(
+                self._scope("devices", org_name, product_type),
+                f"{product_type} device",
+                lambda: self.get_meraki_devices(org_name, product_type),
+                device_name,
+            )["serial"]
 
     def netname_to_id(self, org_name, net_name):
         """Translate Network Name to Network ID."""
-        return [
-            net["id"] for net in self.get_meraki_networks_by_org(org_name) if net["name"].lower() == net_name.lower()
-        ][0]
+        with span("resolve_network"):
+            return self._resolve(
+                ("networks", org_name.lower()), "network", lambda: self.get_meraki_networks_by_org(org_name), net_name
+            )["id"]
+
+    def clear_cache(self, org_name=None):
+        """Forget cached inventories, for one organization or entirely (the shared cache then expires on its own)."""
+        fetches = current_fetches()
+        if fetches is not None:
+            fetches.clear()
+        if org_name is None:
+            self.cache.clear()
+        else:
+            self.cache.invalidate_org(org_name.lower())
+            if self.shared_cache is not None:
+                for kind in ("devices", "networks"):
+                    self.shared_cache.invalidate((kind, org_name.lower()))
+                for product in PRODUCT_TYPES:
+                    self.shared_cache.invalidate(self._scope("devices", org_name, product))
 
     def get_meraki_orgs(self):
         """Query the Meraki Dashboard API for a list of defined organizations."""
-        return self.dashboard.organizations.getOrganizations()
+        orgs = self._shared(
+            ("orgs",), Organization, lambda: self._call(None, self.dashboard.organizations.getOrganizations)
+        )
+        register_orgs(orgs)
+        return orgs
 
     def get_meraki_org_admins(self, org_name):
         """Query the Meraki Dashboard API for the admins of a organization."""
-        return self.dashboard.organizations.getOrganizationAdmins(self.org_name_to_id(org_name))
+        org_id = self.org_name_to_id(org_name)
+        return self._call(org_id, self.dashboard.organizations.getOrganizationAdmins, org_id)
+
+    def get_meraki_devices(self, org_name, product_type=None):
+        """Query the Meraki Dashboard API for a list of devices in the given organization.
 
-    def get_meraki_devices(self, org_name):
-        """Query the Meraki Dashboard API for a list of devices in the given organization."""
-        return self.dashboard.organizations.getOrganizationDevices(organizationId=self.org_name_to_id(org_name))
+        ``product_type`` (``switch``, ``wireless``, ``appliance``, ``camera``...) has the dashboard return only the
+        devices of that type.
+        """
+        if product_type is None:
+            return self._shared(("devices", org_name.lower()), Device, lambda: self.iter_meraki_devices(org_name))
+        return self._shared(
+            self._scope("devices", org_name, product_type),
+            Device,
+            lambda: self.iter_meraki_devices(org_name, productTypes=[product_type]),
+        )
 
     def get_meraki_networks_by_org(self, org_name):
         """Query the Meraki Dashboard API for a list of Networks."""
-        return self.dashboard.organizations.getOrganizationNetworks(self.org_name_to_id(org_name))
+        return self._shared(("networks", org_name.lower()), Network, lambda: self.iter_meraki_networks(org_name))
+
+    def _page(self, method):
+        """Wrap an SDK list method to return its entries along with the cursor the dashboard issued for the next page.
+
+        The cursor is the ``startingAfter`` parameter of the ``next`` link, None after the last page. Both are returned
+        together so that requests shared with other threads or workers share the cursor as well.
+        """
+
+        @functools.wraps(method)
+        def page(*args, **kwargs):
+            self.next_links.url = None
+            entries = method(*args, **kwargs)
+            query = parse_qs(urlsplit(self.next_links.url or "").query)
+            return entries, query.get("startingAfter", [None])[0]
+
+        return page
+
+    def _iter_pages(self, org_id, method, per_page, *args, **kwargs):
+        """Lazily yield the entries of a paginated Dashboard endpoint, requesting one page at a time.
+
+        Pages are followed with the cursors issued by the dashboard, and iteration ends on the last page, so a caller
+        that stops consuming early never fetches the rest.
+        """
+        page = self._page(method)
+        starting_after = None
+        while True:
+            params = dict(kwargs, perPage=per_page, total_pages=1)
+            if starting_after is not None:
+                params["startingAfter"] = starting_after
+            entries, starting_after = self._call(org_id, page, *args, **params)
+            yield from entries
+            if starting_after is None:
+                return
+
+    def iter_meraki_devices(self, org_name, per_page=PAGE_SIZE, **filters):
+        """Iterate over the devices of an organization, fetching them page by page."""
+        org_id = self.org_name_to_id(org_name)
+        return self._iter_pages(
+            org_id,
+            self.dashboard.organizations.getOrganizationDevices,
+            per_page,
+            org_id,
+            **filters,
+        )
+
+    def iter_meraki_networks(self, org_name, per_page=PAGE_SIZE, **filters):
+        """Iterate over the networks of an organization, fetching them page by page."""
+        org_id = self.org_name_to_id(org_name)
+        return self._iter_pages(
+            org_id,
+            self.dashboard.organizations.getOrganizationNetworks,
+            per_page,
+            org_id,
+            **filters,
+        )
+
+    def iter_meraki_network_clients(self, org_name, net_name, per_page=PAGE_SIZE, **filters):
+        """Iterate over the clients of a network, fetching them page by page."""
+        return self._iter_pages(
+            self.org_name_to_id(org_name),
+            self.dashboard.networks.getNetworkClients,
+            per_page,
+            self.netname_to_id(org_name, net_name),
+            **filters,
+        )
+
+    def search_meraki_client(self, org_name, mac):
+        """Query the Meraki Dashboard API for the networks of an organization a client MAC address was seen in.
+
+        Returns None when no network of the organization saw the client.
+        """
+        org_id = self.org_name_to_id(org_name)
+        try:
+            return self._call(org_id, self.dashboard.organizations.getOrganizationClientsSearch, org_id, mac)
+        except meraki.APIError as error:
+            if error.status == 404:
+                return None
+            raise
+
+    def iter_meraki_org_switch_ports(self, org_name, per_page=SWITCH_PORTS_PAGE_SIZE, **filters):
+        """Iterate over the switches of an organization with their port configurations, a page of switches at a time.
+
+        ``filters`` are passed to the endpoint, such as ``networkIds`` or ``serials``.
+        """
+        org_id = self.org_name_to_id(org_name)
+        return self._iter_pages(
+            org_id,
+            self.dashboard.switch.getOrganizationSwitchPortsBySwitch,
+            per_page,
+            org_id,
+            **filters,
+        )
+
+    def iter_meraki_org_switch_port_statuses(self, org_name, per_page=SWITCH_PORT_STATUSES_PAGE_SIZE, **filters):
+        """Iterate over the switches of an organization with their port statuses, a page of switches at a time."""
+        org_id = self.org_name_to_id(org_name)
+        return self._iter_pages(
+            org_id,
+            switch_port_statuses_by_switch(self.dashboard),
+            per_page,
+            org_id,
+            **filters,
+        )
+
+    def iter_meraki_org_switchports(self, org_name, **filters):
+        """Iterate over every port of the switches of an organization, as ``(switch, status, config)`` tuples.
+
+        Port statuses and configurations are read from the organization-wide endpoints, a few bulk pages instead of
+        two requests per switch. Both list switches by serial, so configurations are read alongside the statuses and
+        only those read ahead are kept in memory. ``config`` is None for a port without a known configuration.
+        """
+        configs = self.iter_meraki_org_switch_ports(org_name, **filters)
+        pending = {}
+        for switch in self.iter_meraki_org_switch_port_statuses(org_name, **filters):
+            while switch["serial"] not in pending:
+                config = next(configs, None)
+                if config is None:
+                    break
+                pending[config["serial"]] = config
+            ports = {
+                port["portId"]: SwitchPort.from_api(port, self.keep_raw)
+                for port in (pending.pop(switch["serial"], None) or {}).get("ports", [])
+            }
+            for status in switch.get("ports") or []:
+                yield switch, status, ports.get(status["portId"])
+
+    def iter_meraki_org_admins(self, org_name):
+        """Iterate over the admins of an organization.
+
+        The admins endpoint is not paginated by the dashboard, so this only provides the same interface as the other
+        iterators over a single response.
+        """
+        return iter(self.get_meraki_org_admins(org_name))
 
     def get_meraki_switchports(self, org_name, device_name):
         """Query the Meraki Dashboard API for a list of Switchports for a Switch."""
-        return self.dashboard.switch.getDeviceSwitchPorts(self.name_to_serial(org_name, device_name))
+        entries = self._call(
+            self.org_name_to_id(org_name),
+            self.dashboard.switch.getDeviceSwitchPorts,
+            self.name_to_serial(org_name, device_name, "switch"),
+        )
+        return [SwitchPort.from_api(port, self.keep_raw) for port in entries]
 
     def get_meraki_switchports_status(self, org_name, device_name):
         """Query Meraki for Port Status for a Switch."""
-        return self.dashboard.switch.getDeviceSwitchPortsStatuses(self.name_to_serial(org_name, device_name))
+        return self._call(
+            self.org_name_to_id(org_name),
+            self.dashboard.switch.getDeviceSwitchPortsStatuses,
+            self.name_to_serial(org_name, device_name, "switch"),
+        )
 
     def get_meraki_firewall_performance(self, org_name, device_name):
         """Query Meraki with a firewall to return device performance."""
-        return self.dashboard.appliance.getDeviceAppliancePerformance(self.name_to_serial(org_name, device_name))
+        return self._call(
+            self.org_name_to_id(org_name),
+            self.dashboard.appliance.getDeviceAppliancePerformance,
+            self.name_to_serial(org_name, device_name, "appliance"),
+        )
 
     def get_meraki_network_ssids(self, org_name, net_name):
         """Query Meraki for a Networks SSIDs."""
-        return self.dashboard.wireless.getNetworkWirelessSsids(self.netname_to_id(org_name, net_name))
+        return self._call(
+            self.org_name_to_id(org_name),
+            self.dashboard.wireless.getNetworkWirelessSsids,
+            self.netname_to_id(org_name, net_name),
+        )
 
     def get_meraki_camera_recent(self, org_name, device_name):
         """Query Meraki Recent Cameras."""
-        return self.dashboard.camera.getDeviceCameraAnalyticsRecent(self.name_to_serial(org_name, device_name))
+        return self._call(
+            self.org_name_to_id(org_name),
+            self.dashboard.camera.getDeviceCameraAnalyticsRecent,
+            self.name_to_serial(org_name, device_name, "camera"),
+        )
 
     def get_meraki_device_clients(self, org_name, device_name):
         """Query Meraki for Clients."""
-        return self.dashboard.devices.getDeviceClients(self.name_to_serial(org_name, device_name))
+        return self._call(
+            self.org_name_to_id(org_name),
+            self.dashboard.devices.getDeviceClients,
+            self.name_to_serial(org_name, device_name),
+        )
 
     def get_meraki_device_lldpcdp(self, org_name, device_name):
         """Query Meraki for Clients."""
-        return self.dashboard.devices.getDeviceLldpCdp(self.name_to_serial(org_name, device_name))
+        return self._call(
+            self.org_name_to_id(org_name),
+            self.dashboard.devices.getDeviceLldpCdp,
+            self.name_to_serial(org_name, device_name),
+        )
 
     def update_meraki_switch_port(self, org_name, device_name, port, **kwargs):
         """Update SwitchPort Configuration."""
-        return self.dashboard.switch.updateDeviceSwitchPort(self.name_to_serial(org_name, device_name), port, **kwargs)
+        return self._call(
+            self.org_name_to_id(org_name),
+            self.dashboard.switch.updateDeviceSwitchPort,
+            self.name_to_serial(org_name, device_name, "switch"),
+            port,
+            **kwargs,
+        )
+
+    def switch_port_actions(self, org_name, changes):
+        """Return the Action Batch actions applying ``(device_name, port, settings)`` switch port changes."""
+        return [
+            self.dashboard.batch.switch.updateDeviceSwitchPort(
+                self.name_to_serial(org_name, device_name, "switch"), port, **settings
+            )
+            for device_name, port, settings in changes
+        ]
+
+    def port_cycle(self, org_name, device_name, ports):
+        """Cycle a port, or a list of ports, on a switch."""
+        return self._call(
+            self.org_name_to_id(org_name),
+            self.dashboard.switch.cycleDeviceSwitchPorts,
+            self.name_to_serial(org_name, device_name, "switch"),
+            [ports] if isinstance(ports, str) else list(ports),
+        )
+
+
+class MerakiClientPool:
+    """Process-wide registry of MerakiClient instances keyed by API key.
+
+    Each API key maps to a single MerakiClient, so every subcommand and prompt executed in a worker process shares
+    one DashboardAPI and its HTTP connection pool instead of opening new TLS sessions against the dashboard.
+
+    Clients inherited through ``fork()`` are dropped (never closed, as the sockets still belong to the parent) the
+    first time the pool is used in the child process. With the default forking RQ worker the pool therefore lives
+    for the duration of a job; with a non-forking worker class (e.g. ``rq.SimpleWorker``) it lives for the whole
+    worker process.
+    """
+
+    def __init__(self, client_class=MerakiClient):
+        """Class constructor."""
+        self.client_class = client_class
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.stats = {"created": 0, "reused": 0, "closed": 0, "discarded_on_fork": 0}
+
+    def get(self, api_key, **client_kwargs):
+        """Return the shared client for an API key, creating it with ``client_kwargs`` on first use."""
+        if os.getpid() != self._pid:
+            self.reset_after_fork()
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                client = self.client_class(api_key=api_key, **client_kwargs)
+                self._clients[api_key] = client
+                self.stats["created"] += 1
+            else:
+                self.stats["reused"] += 1
+            return client
+
+    def close(self, api_key=None):
+        """Close and forget the client of a given API key, or every client when no key is given."""
+        if os.getpid() != self._pid:
+            self.reset_after_fork()
+            return
+        with self._lock:
+            keys = list(self._clients) if api_key is None else [api_key]
+            for key in keys:
+                client = self._clients.pop(key, None)
+                if client is not None:
+                    client.close()
+                    self.stats["closed"] += 1
+
+    def reset_after_fork(self):
+        """Drop the clients inherited from the parent process without touching their sockets."""
+        self.stats["discarded_on_fork"] += len(self._clients)
+        self._clients = {}
+        # The parent may have held the lock while forking, so never reuse it in the child.
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def __len__(self):
+        """Return the number of live clients in the pool."""
+        return len(self._clients)
+
+
+CLIENT_POOL = MerakiClientPool()
+atexit.register(CLIENT_POOL.close)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=CLIENT_POOL.reset_after_fork)
+
 
-    def port_cycle(self, org_name, device_name, port):
-        """Cycle a port on a switch."""
-        return self.dashboard.switch.cycleDeviceSwitchPorts(self.name_to_serial(org_name, device_name), list(port))
+def get_meraki_client(api_key, **client_kwargs):
+    """Return the process-wide shared MerakiClient for the given API key."""
+    return CLIENT_POOL.get(api_key, **client_kwargs)
@@ -1,20 +1,40 @@
 """Demo meraki addition to Nautobot."""
-import os
-import logging
+import time
+from operator import itemgetter
+from datetime import timedelta
 
-from django.conf import settings
+import django_rq
 from django_rq import job
 from nautobot_chatops.workers import subcommand_of, handle_subcommands
 from nautobot_chatops.choices import CommandStatusChoices
 
-from .utils import MerakiClient
-
-
-MERAKI_LOGO_PATH = "nautobot_meraki/meraki.png"
-MERAKI_LOGO_ALT = "Meraki Logo"
-
-LOGGER = logging.getLogger("nautobot_plugin_chatops_meraki")
-
+from .bulk_commands import expand_ports
+from .client_commands import build_client_index, load_client_index
+from .helpers import (
+    LOGGER,
+    PLUGIN_SETTINGS,
+    DEVICE_TYPE_PRODUCTS,
+    data_age_args,
+    device_selected,
+    get_client,
+    meraki_logo,
+    network_selected,
+    prompt_for_device,
+    prompt_for_network,
+    prompt_for_organization,
+    prompt_for_port,
+    table_renderer,
+)
+from .inventory import product_type
+from .metrics import command_metrics, instrumented
+from .rendering import Column
+from .topology import neighbor_entries
+
+# Imported for the subcommand it registers with the ``meraki`` command, like the modules above.
+from . import topology_commands  # noqa: F401 pylint: disable=unused-import
+
+
+PREFETCH_PENDING_KEY = "nautobot_plugin_chatops_meraki:prefetch:pending"
 
 DEVICE_TYPES = [
     ("all", "all"),
@@ -24,82 +44,126 @@ DEVICE_TYPES = [
     ("switches", "switches"),
 ]
 
-try:
-    MERAKI_DASHBOARD_API_KEY = settings.PLUGINS_CONFIG["nautobot_plugin_chatops_meraki"]["meraki_dashboard_api_key"]
-except KeyError as err:
-    MERAKI_DASHBOARD_API_KEY = os.getenv("MERAKI_DASHBOARD_API_KEY")
-    if not MERAKI_DASHBOARD_API_KEY:
-        raise Exception("Unable to find the Meraki API key.") from err
+SWITCHPORT_COLUMNS = [
+    Column("Port", itemgetter("portId")),
+    Column("Name", itemgetter("name")),
+    Column("Tags", itemgetter("tags")),
+    Column("Enabled", itemgetter("enabled")),
+    Column("PoE", itemgetter("poeEnabled")),
+    Column("Type", itemgetter("type")),
+    Column("VLAN", itemgetter("vlan")),
+    Column("Voice VLAN", itemgetter("voiceVlan")),
+    Column("Allowed VLANs", itemgetter("allowedVlans")),
+    Column("Isolation Enabled", itemgetter("isolationEnabled")),
+    Column("RSTP Enabled", itemgetter("rstpEnabled")),
+    Column("STP Guard", itemgetter("stpGuard")),
+    Column("Link Negotiation", itemgetter("linkNegotiation")),
+    Column("Port Scheduled ID", itemgetter("portScheduleId")),
+    Column("UDLD", itemgetter("udld")),
+]
 
+CLIENT_COLUMNS = [
+    Column("Usage", lambda entry: "\n".join([f"{key}: {value}" for key, value in entry["usage"].items()])),
+    Column("Description", itemgetter("description")),
+    Column("MAC", itemgetter("mac")),
+    Column("IP", itemgetter("ip")),
+    Column("User", itemgetter("user")),
+    Column("VLAN", itemgetter("vlan")),
+    Column("Switchport", itemgetter("switchport")),
+    Column("DHCP Hostname", itemgetter("dhcpHostname")),
+]
 
-def meraki_logo(dispatcher):
-    """Construct an image_element containing the locally hosted Meraki logo."""
-    return dispatcher.image_element(dispatcher.static_url(MERAKI_LOGO_PATH), alt_text=MERAKI_LOGO_ALT)
 
+def iter_device_names(dev_type, devs):
+    """Lazily yield the names of the named devices of a type, so callers can stop consuming early."""
+    product = DEVICE_TYPE_PRODUCTS.get(dev_type)
+    for dev in devs:
+        if not dev["name"]:
+            continue
+        if dev_type == "all" or product_type(dev) == product:
+            yield dev["name"]
 
-def prompt_for_organization(dispatcher, command):
-    """Prompt the user to select a Meraki Organization."""
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
-    org_list = client.get_meraki_orgs()
-    dispatcher.prompt_from_menu(command, "Select an Organization", [(org["name"], org["name"]) for org in org_list])
-    return False
 
+def parse_device_list(dev_type, devs):
+    """Take a list of device and a type and returns only those device types."""
+    return list(iter_device_names(dev_type, devs))
 
-def prompt_for_device(dispatcher, command, org, dev_type=None):
-    """Prompt the user to select a Meraki device."""
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
-    dev_list = client.get_meraki_devices(org)
-    if not dev_type:
-        dispatcher.prompt_from_menu(
-            command, "Select a Device", [(dev["name"], dev["name"]) for dev in dev_list if len(dev["name"]) > 0]
-        )
-        return False
-    dev_list = parse_device_list(dev_type, client.get_meraki_devices(org))
-    dispatcher.prompt_from_menu(command, "Select a Device", [(dev, dev) for dev in dev_list])
-    return False
 
+@job("default")
+def cisco_meraki(subcommand, **kwargs):
+    """Interact with Meraki."""
+    schedule_inventory_prefetch(delay=0)
+    return handle_subcommands("meraki", subcommand, **kwargs)
 
-def prompt_for_network(dispatcher, command, org):
-    """Prompt the user to select a Network name."""
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
-    net_list = client.get_meraki_networks_by_org(org)
-    dispatcher.prompt_from_menu(
-        command, "Select a Network", [(net["name"], net["name"]) for net in net_list if len(net["name"]) > 0]
-    )
-    return False
 
+def schedule_inventory_prefetch(delay=None):
+    """Schedule the next inventory prefetch, unless prefetching is disabled or one is already pending.
 
-def prompt_for_port(dispatcher, command, org, switch_name):
-    """Prompt the user to select a port from a switch."""
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
-    ports = client.get_meraki_switchports(org, switch_name)
-    dispatcher.prompt_from_menu(command, "Select a Port", [(port["portId"], port["portId"]) for port in ports])
-    return False
+    The pending marker expires after two intervals, so the chain restarts on the next command if a worker died
+    while holding it.
+    """
+    interval = PLUGIN_SETTINGS.get("prefetch_interval", 0)
+    if not interval:
+        return None
+    if not django_rq.get_connection("default").set(PREFETCH_PENDING_KEY, 1, nx=True, ex=interval * 2):
+        return None
+    return _enqueue_inventory_prefetch(interval if delay is None else delay)
 
 
-def parse_device_list(dev_type, devs):
-    """Take a list of device and a type and returns only those device types."""
-    meraki_dev_mapper = {
-        "aps": "MR",
-        "cameras": "MV",
-        "firewalls": "MX",
-        "switches": "MS",
-    }
-    if dev_type != "all":
-        return [dev["name"] for dev in devs if meraki_dev_mapper.get(dev_type) in dev["model"]]
-    return [dev["name"] for dev in devs]
+def _enqueue_inventory_prefetch(delay):
+    """Enqueue the inventory prefetch job, to run after ``delay`` seconds."""
+    queue = django_rq.get_queue("default")
+    if delay == 0:
+        return queue.enqueue(prefetch_meraki_inventory)
+    return queue.enqueue_in(timedelta(seconds=delay), prefetch_meraki_inventory)
 
 
 @job("default")
-def cisco_meraki(subcommand, **kwargs):
-    """Interact with Meraki."""
-    return handle_subcommands("meraki", subcommand, **kwargs)
+def prefetch_meraki_inventory():
+    """Refresh the organization, network and device inventory of the configured organizations in the background.
+
+    Between full refreshes, every ``prefetch_full_interval`` seconds, the networks and devices are synced
+    incrementally from the configuration change log. The client index of an organization is rebuilt once it is
+    ``client_index_interval`` seconds old.
+
+    The pending marker is held for the whole run, so commands sent meanwhile do not start a concurrent prefetch, and
+    is handed over to the next run when the job reschedules itself.
+    """
+    interval = PLUGIN_SETTINGS.get("prefetch_interval", 0)
+    connection = django_rq.get_connection("default")
+    if interval:
+        connection.set(PREFETCH_PENDING_KEY, 1, ex=interval * 2)
+    try:
+        client = get_client()
+        with command_metrics("prefetch"):
+            orgs = client.refresh_org_list()
+        for org_name in PLUGIN_SETTINGS.get("prefetch_orgs") or [org["name"] for org in orgs]:
+            try:
+                with command_metrics("prefetch", org_name):
+                    client.sync_inventory(org_name, full_interval=PLUGIN_SETTINGS.get("prefetch_full_interval", 3600))
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception("Unable to prefetch the inventory of %s", org_name)
+            index_interval = PLUGIN_SETTINGS.get("client_index_interval", 0)
+            index = load_client_index(org_name) if index_interval else None
+            if index_interval and (index is None or time.time() - index.built_at >= index_interval):
+                try:
+                    with command_metrics("prefetch", org_name):
+                        build_client_index(client, org_name)
+                except Exception:  # pylint: disable=broad-except
+                    LOGGER.exception("Unable to index the clients of %s", org_name)
+    finally:
+        if interval:
+            connection.set(PREFETCH_PENDING_KEY, 1, ex=interval * 2)
+            _enqueue_inventory_prefetch(interval)
+        else:
+            connection.delete(PREFETCH_PENDING_KEY)
 
 
 @subcommand_of("meraki")
+@instrumented
 def get_organizations(dispatcher):
     """Gather all the Meraki Organizations."""
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    client = get_client()
     org_list = client.get_meraki_orgs()
     if len(org_list) == 0:
         dispatcher.send_markdown("NO Meraki Orgs!")
@@ -111,7 +175,7 @@ def get_organizations(dispatcher):
         *dispatcher.command_response_header(
             "meraki",
             "get-organizations",
-            [],
+            data_age_args(client, "orgs"),
             "Organization List",
             meraki_logo(dispatcher),
         ),
@@ -122,12 +186,13 @@ def get_organizations(dispatcher):
 
 
 @subcommand_of("meraki")
+@instrumented
 def get_admins(dispatcher, org_name=None):
     """Based on an Organization Name Return the Admins."""
     LOGGER.info("ORG NAME: %s", org_name)
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki get-admins")
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    client = get_client()
     admins = client.get_meraki_org_admins(org_name)
     if len(admins) == 0:
         dispatcher.send_markdown(f"NO Meraki Admins for {org_name}!")
@@ -150,6 +215,7 @@ def get_admins(dispatcher, org_name=None):
 
 
 @subcommand_of("meraki")
+@instrumented
 def get_devices(dispatcher, org_name=None, device_type=None):
     """Gathers devices from Meraki."""
     LOGGER.info("ORG NAME: %s", org_name)
@@ -160,9 +226,9 @@ def get_devices(dispatcher, org_name=None, device_type=None):
         dispatcher.prompt_from_menu(f"meraki get-devices '{org_name}'", "Select a Device Type", DEVICE_TYPES)
         return False
     LOGGER.info("Translated Device Type: %s", device_type)
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
-    devices = client.get_meraki_devices(org_name)
-    devices_result = parse_device_list(device_type, devices)
+    client = get_client()
+    product = DEVICE_TYPE_PRODUCTS.get(device_type)
+    devices_result = parse_device_list(device_type, client.get_device_inventory(org_name, product))
     if len(devices_result) == 0:
         dispatcher.send_markdown("There are NO devices that meet the requirements!")
         return (
@@ -173,7 +239,11 @@ def get_devices(dispatcher, org_name=None, device_type=None):
         *dispatcher.command_response_header(
             "meraki",
             "get-devices",
-            [("Org Name", org_name), ("Device Type", device_type)],
+            [
+                ("Org Name", org_name),
+                ("Device Type", device_type),
+                *data_age_args(client, "devices", org_name, product),
+            ],
             "Device List",
             meraki_logo(dispatcher),
         ),
@@ -184,12 +254,13 @@ def get_devices(dispatcher, org_name=None, device_type=None):
 
 
 @subcommand_of("meraki")
+@instrumented
 def get_networks(dispatcher, org_name=None):
     """Gathers networks from Meraki."""
     LOGGER.info("ORG NAME: %s", org_name)
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki get-networks")
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    client = get_client()
     networks = client.get_meraki_networks_by_org(org_name)
     if len(networks) == 0:
         dispatcher.send_markdown(f"NO Networks in {org_name}!")
@@ -201,7 +272,7 @@ def get_networks(dispatcher, org_name=None):
         *dispatcher.command_response_header(
             "meraki",
             "get-networks",
-            [("Org Name", org_name)],
+            [("Org Name", org_name), *data_age_args(client, "networks", org_name)],
             "Network List",
             meraki_logo(dispatcher),
         ),
@@ -212,15 +283,23 @@ def get_networks(dispatcher, org_name=None):
 
 
 @subcommand_of("meraki")
-def get_switchports(dispatcher, org_name=None, device_name=None):
-    """Gathers switch ports from a MS switch device."""
+@instrumented
+def get_switchports(dispatcher, org_name=None, device_name=None, columns=None, output=None):
+    """Gathers switch ports from a MS switch device, optionally only some columns, as a table, CSV or JSON."""
     LOGGER.info("ORG NAME: %s", org_name)
     LOGGER.info("DEVICE NAME: %s", device_name)
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki get-switchports")
-    if not device_name:
-        return prompt_for_device(dispatcher, f"meraki get-switchports {org_name}", org_name, dev_type="switches")
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    if not device_selected(org_name, device_name, "switches"):
+        return prompt_for_device(
+            dispatcher, f"meraki get-switchports {org_name}", org_name, dev_type="switches", query=device_name
+        )
+    try:
+        renderer = table_renderer(dispatcher, SWITCHPORT_COLUMNS, "Switch ports", columns, output)
+    except ValueError as error:
+        dispatcher.send_warning(str(error))
+        return CommandStatusChoices.STATUS_FAILED, str(error)
+    client = get_client()
     ports = client.get_meraki_switchports(org_name, device_name)
     blocks = [
         *dispatcher.command_response_header(
@@ -232,58 +311,23 @@ def get_switchports(dispatcher, org_name=None, device_name=None):
         ),
     ]
     dispatcher.send_blocks(blocks)
-    dispatcher.send_large_table(
-        [
-            "Port",
-            "Name",
-            "Tags",
-            "Enabled",
-            "PoE",
-            "Type",
-            "VLAN",
-            "Voice VLAN",
-            "Allowed VLANs",
-            "Isolation Enabled",
-            "RSTP Enabled",
-            "STP Guard",
-            "Link Negotiation",
-            "Port Scheduled ID",
-            "UDLD",
-        ],
-        [
-            (
-                entry["portId"],
-                entry["name"],
-                entry["tags"],
-                entry["enabled"],
-                entry["poeEnabled"],
-                entry["type"],
-                entry["vlan"],
-                entry["voiceVlan"],
-                entry["allowedVlans"],
-                entry["isolationEnabled"],
-                entry["rstpEnabled"],
-                entry["stpGuard"],
-                entry["linkNegotiation"],
-                entry["portScheduleId"],
-                entry["udld"],
-            )
-            for entry in ports
-        ],
-    )
+    renderer.render(ports)
     return CommandStatusChoices.STATUS_SUCCEEDED
 
 
 @subcommand_of("meraki")
+@instrumented
 def get_switchports_status(dispatcher, org_name=None, device_name=None):
     """Gathers switch ports status from a MS switch device."""
     LOGGER.info("ORG NAME: %s", org_name)
     LOGGER.info("DEVICE NAME: %s", device_name)
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki get-switchports-status")
-    if not device_name:
-        return prompt_for_device(dispatcher, f"meraki get-switchports-status {org_name}", org_name, dev_type="switches")
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    if not device_selected(org_name, device_name, "switches"):
+        return prompt_for_device(
+            dispatcher, f"meraki get-switchports-status {org_name}", org_name, dev_type="switches", query=device_name
+        )
+    client = get_client()
     ports = client.get_meraki_switchports_status(org_name, device_name)
     blocks = [
         *dispatcher.command_response_header(
@@ -328,24 +372,23 @@ def get_switchports_status(dispatcher, org_name=None, device_name=None):
 
 
 @subcommand_of("meraki")
+@instrumented
 def get_firewall_performance(dispatcher, org_name=None, device_name=None):
     """Query Meraki with a firewall to device performance."""
     LOGGER.info("ORG NAME: %s", org_name)
     LOGGER.info("DEVICE NAME: %s", device_name)
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    client = get_client()
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki get-firewall-performance")
-    if not device_name:
-        devices = client.get_meraki_devices(org_name)
-        fws = parse_device_list("firewalls", devices)
-        if len(fws) == 0:
+    if not device_selected(org_name, device_name, "firewalls"):
+        if next(iter_device_names("firewalls", client.get_device_inventory(org_name, "appliance")), None) is None:
             dispatcher.send_markdown("There are NO Firewalls in this Meraki Org!")
             return (
                 CommandStatusChoices.STATUS_SUCCEEDED,
                 "There are NO Firewalls in this Meraki Org!",
             )
         return prompt_for_device(
-            dispatcher, f"meraki get-firewall-performance {org_name}", org_name, dev_type="firewalls"
+            dispatcher, f"meraki get-firewall-performance {org_name}", org_name, dev_type="firewalls", query=device_name
         )
     fw_perfomance = client.get_meraki_firewall_performance(org_name, device_name)
     blocks = [
@@ -363,15 +406,16 @@ def get_firewall_performance(dispatcher, org_name=None, device_name=None):
 
 
 @subcommand_of("meraki")
+@instrumented
 def get_wlan_ssids(dispatcher, org_name=None, net_name=None):
     """Query Meraki for all SSIDs for a given Network."""
     LOGGER.info("ORG NAME: %s", org_name)
     LOGGER.info("NETWORK NAME: %s", net_name)
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki get-wlan-ssids")
-    if not net_name:
-        return prompt_for_network(dispatcher, f"meraki get-wlan-ssids {org_name}", org_name)
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    if not network_selected(org_name, net_name):
+        return prompt_for_network(dispatcher, f"meraki get-wlan-ssids {org_name}", org_name, query=net_name)
+    client = get_client()
     ssids = client.get_meraki_network_ssids(org_name, net_name)
     blocks = [
         *dispatcher.command_response_header(
@@ -391,23 +435,24 @@ def get_wlan_ssids(dispatcher, org_name=None, net_name=None):
 
 
 @subcommand_of("meraki")
+@instrumented
 def get_camera_recent(dispatcher, org_name=None, device_name=None):
     """Query Meraki Recent Camera Analytics."""
     LOGGER.info("ORG NAME: %s", org_name)
     LOGGER.info("DEVICE NAME: %s", device_name)
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    client = get_client()
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki get-camera-recent")
-    if not device_name:
-        devices = client.get_meraki_devices(org_name)
-        cams = parse_device_list("cameras", devices)
-        if len(cams) == 0:
+    if not device_selected(org_name, device_name, "cameras"):
+        if next(iter_device_names("cameras", client.get_device_inventory(org_name, "camera")), None) is None:
             dispatcher.send_markdown("There are NO Cameras in this Meraki Org!")
             return (
                 CommandStatusChoices.STATUS_SUCCEEDED,
                 "There are NO Cameras in this Meraki Org!",
             )
-        return prompt_for_device(dispatcher, f"meraki get-camera-recent '{org_name}'", org_name, dev_type="cameras")
+        return prompt_for_device(
+            dispatcher, f"meraki get-camera-recent '{org_name}'", org_name, dev_type="cameras", query=device_name
+        )
     camera_stats = client.get_meraki_camera_recent(org_name, device_name)
     if len(camera_stats) == 0:
         return (
@@ -441,15 +486,21 @@ def get_camera_recent(dispatcher, org_name=None, device_name=None):
 
 
 @subcommand_of("meraki")
-def get_clients(dispatcher, org_name=None, device_name=None):
-    """Query Meraki for List of Clients."""
+@instrumented
+def get_clients(dispatcher, org_name=None, device_name=None, columns=None, output=None):
+    """Query Meraki for List of Clients, optionally only some columns, as a table, CSV or JSON."""
     LOGGER.info("ORG NAME: %s", org_name)
     LOGGER.info("DEVICE NAME: %s", device_name)
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki get-clients")
-    if not device_name:
-        return prompt_for_device(dispatcher, f"meraki get-clients '{org_name}'", org_name)
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    if not device_selected(org_name, device_name):
+        return prompt_for_device(dispatcher, f"meraki get-clients '{org_name}'", org_name, query=device_name)
+    try:
+        renderer = table_renderer(dispatcher, CLIENT_COLUMNS, "Clients", columns, output)
+    except ValueError as error:
+        dispatcher.send_warning(str(error))
+        return CommandStatusChoices.STATUS_FAILED, str(error)
+    client = get_client()
     client_list = client.get_meraki_device_clients(org_name, device_name)
     if len(client_list) == 0:
         dispatcher.send_markdown(f"There are NO Clients on {device_name}!")
@@ -467,35 +518,21 @@ def get_clients(dispatcher, org_name=None, device_name=None):
         ),
     ]
     dispatcher.send_blocks(blocks)
-    dispatcher.send_large_table(
-        ["Usage", "Description", "MAC", "IP", "User", "VLAN", "Switchport", "DHCP Hostname"],
-        [
-            (
-                "\n".join([f"{key}: {value}" for key, value in entry["usage"].items()]),
-                entry["description"],
-                entry["mac"],
-                entry["ip"],
-                entry["user"],
-                entry["vlan"],
-                entry["switchport"],
-                entry["dhcpHostname"],
-            )
-            for entry in client_list
-        ],
-    )
+    renderer.render(client_list)
     return CommandStatusChoices.STATUS_SUCCEEDED
 
 
 @subcommand_of("meraki")
+@instrumented
 def get_neighbors(dispatcher, org_name=None, device_name=None):
     """Query Meraki for List of LLDP or CDP Neighbors."""
     LOGGER.info("ORG NAME: %s", org_name)
     LOGGER.info("DEVICE NAME: %s", device_name)
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki get-neighbors")
-    if not device_name:
-        return prompt_for_device(dispatcher, f"meraki get-neighbors '{org_name}'", org_name)
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    if not device_selected(org_name, device_name):
+        return prompt_for_device(dispatcher, f"meraki get-neighbors '{org_name}'", org_name, query=device_name)
+    client = get_client()
     neighbor_list = client.get_meraki_device_lldpcdp(org_name, device_name)
     if len(neighbor_list) == 0:
         dispatcher.send_markdown(f"NO LLDP/CDP neighbors for {device_name}!")
@@ -503,25 +540,6 @@ def get_neighbors(dispatcher, org_name=None, device_name=None):
             CommandStatusChoices.STATUS_SUCCEEDED,
             f"NO LLDP/CDP neighbors for {device_name}!",
         )
-    table_data = []
-    for key, vals in neighbor_list["ports"].items():
-        for dp_type, dp_vals in vals.items():
-            if dp_type == "cdp":
-                table_data.append(
-                    (key, dp_type, dp_vals.get("deviceId"), dp_vals.get("portId"), dp_vals.get("address"))
-                )
-            elif dp_type == "lldp":
-                table_data.append(
-                    (
-                        key,
-                        dp_type,
-                        dp_vals.get("systemName"),
-                        dp_vals.get("portId"),
-                        dp_vals.get("managementAddress"),
-                    )
-                )
-            else:
-                LOGGER.debug(dp_type)
     blocks = [
         *dispatcher.command_response_header(
             "meraki",
@@ -534,21 +552,26 @@ def get_neighbors(dispatcher, org_name=None, device_name=None):
     dispatcher.send_blocks(blocks)
     dispatcher.send_large_table(
         ["Local Port", "Type", "Remote Device", "Remote Port", "Remote Address"],
-        table_data,
+        list(neighbor_entries(neighbor_list)),
     )
     return CommandStatusChoices.STATUS_SUCCEEDED
 
 
 @subcommand_of("meraki")
+@instrumented
 def configure_basic_access_port(  # pylint: disable=too-many-arguments
     dispatcher, org_name=None, device_name=None, port_number=None, enabled=None, vlan=None, port_desc=None
 ):
     """Configure an access port with description, VLAN and state."""
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki configure-basic-access-port")
-    if not device_name:
+    if not device_selected(org_name, device_name, "switches"):
         return prompt_for_device(
-            dispatcher, f"meraki configure-basic-access-port {org_name}", org_name, dev_type="switches"
+            dispatcher,
+            f"meraki configure-basic-access-port {org_name}",
+            org_name,
+            dev_type="switches",
+            query=device_name,
         )
     if not port_number:
         return prompt_for_port(
@@ -574,7 +597,7 @@ def configure_basic_access_port(  # pylint: disable=too-many-arguments
         return False
     port_params = dict(name=port_desc, enabled=bool(enabled), type="access", vlan=vlan)
     LOGGER.info("PORT PARMS: %s", port_params)
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
+    client = get_client()
     result = client.update_meraki_switch_port(org_name, device_name, port_number, **port_params)
     blocks = [
         *dispatcher.command_response_header(
@@ -595,18 +618,26 @@ def configure_basic_access_port(  # pylint: disable=too-many-arguments
 
 
 @subcommand_of("meraki")
+@instrumented
 def cycle_port(dispatcher, org_name=None, device_name=None, port_number=None):
     """Cycle a port on a switch."""
     LOGGER.info("ORG NAME: %s", org_name)
     if not org_name:
         return prompt_for_organization(dispatcher, "meraki cycle-port")
-    if not device_name:
-        return prompt_for_device(dispatcher, f"meraki cycle-port {org_name}", org_name, dev_type="switches")
+    if not device_selected(org_name, device_name, "switches"):
+        return prompt_for_device(
+            dispatcher, f"meraki cycle-port {org_name}", org_name, dev_type="switches", query=device_name
+        )
     if not port_number:
         return prompt_for_port(dispatcher, f"meraki cycle-port {org_name} {device_name}", org_name, device_name)
 
-    client = MerakiClient(api_key=MERAKI_DASHBOARD_API_KEY)
-    cycled_port = client.port_cycle(org_name, device_name, port_number)
+    try:
+        ports = expand_ports(port_number)
+    except ValueError as error:
+        dispatcher.send_warning(str(error))
+        return CommandStatusChoices.STATUS_FAILED, str(error)
+    client = get_client()
+    cycled_port = client.port_cycle(org_name, device_name, ports)
     blocks = [
         *dispatcher.command_response_header(
             "meraki",
@@ -615,7 +646,10 @@ def cycle_port(dispatcher, org_name=None, device_name=None, port_number=None):
             "cycled port",
             meraki_logo(dispatcher),
         ),
-        dispatcher.markdown_block(f"Port {cycled_port['ports'][0]} cycled successfully!"),
+        dispatcher.markdown_block(
+            f"{'Ports' if len(cycled_port['ports']) > 1 else 'Port'} {', '.join(cycled_port['ports'])} "
+            "cycled successfully!"
+        ),
     ]
     dispatcher.send_blocks(blocks)
     return CommandStatusChoices.STATUS_SUCCEEDED
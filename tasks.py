@@ -358,6 +358,26 @@ def unittest_coverage(context):
     run_command(context, command)
 
 
+@task(
+    help={
+        "devices": "comma separated inventory sizes to benchmark (default: 100,10000,100000)",
+        "repeat": "runs reusing a warm client per scenario (default: 5)",
+        "latency": "mean latency added by the mock dashboard to each request, in ms (default: 0)",
+        "throttle": "share of requests the mock dashboard answers with HTTP 429 (default: 0)",
+        "only": "comma separated scenarios or subcommands to run (default: all)",
+    }
+)
+def benchmark(context, devices="100,10000,100000", repeat=5, latency=0, throttle=0, only=""):
+    """Benchmark the Meraki subcommands against a local mock Meraki Dashboard."""
+    command = (
+        f"nautobot-server meraki_benchmark --devices {devices.replace(',', ' ')} --repeat {repeat}"
+        f" --latency {latency} --throttle {throttle}"
+    )
+    if only:
+        command += f" --only {only.replace(',', ' ')}"
+    run_command(context, command)
+
+
 @task(
     help={
         "failfast": "fail as soon as a single test fails don't run the entire test suite",